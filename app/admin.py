@@ -9,10 +9,12 @@ from .models import (
     Project,
     Task,
     Memo,
+    MemoMention,
     Checklist,
     ChecklistItem,
     Invitation,
     Customer,
+    PdfJob,
 )
 
 
@@ -133,13 +135,22 @@ class TaskAdmin(admin.ModelAdmin):
 # ==========================
 # Memo
 # ==========================
+class MemoMentionInline(admin.TabularInline):
+    # mentions は中間テーブルを明示しているので、インラインで編集する
+    model = MemoMention
+    extra = 0
+    autocomplete_fields = ("user",)
+    readonly_fields = ("read_at",)
+
+
 @admin.register(Memo)
 class MemoAdmin(admin.ModelAdmin):
     list_display = ("id", "project", "author", "created_at", "updated_at")
     list_filter = ("project", "author")
     search_fields = ("content",)
     ordering = ("-id",)
-    autocomplete_fields = ("project", "author", "mentions")
+    autocomplete_fields = ("project", "author")
+    inlines = (MemoMentionInline,)
 
 
 # ==========================
@@ -147,7 +158,7 @@ class MemoAdmin(admin.ModelAdmin):
 # ==========================
 @admin.register(Checklist)
 class ChecklistAdmin(admin.ModelAdmin):
-    list_display = ("id", "project", "title", "created_at")
+    list_display = ("id", "project", "title", "items_done", "items_total", "created_at")
     list_filter = ("project",)
     search_fields = ("title",)
     ordering = ("-id",)
@@ -173,4 +184,17 @@ class InvitationAdmin(admin.ModelAdmin):
     search_fields = ("email", "token")
     ordering = ("-id",)
     autocomplete_fields = ("company",)
-    readonly_fields = ("token", "created_at")
\ No newline at end of file
+    readonly_fields = ("token", "created_at")
+
+
+# ==========================
+# PdfJob
+# ==========================
+@admin.register(PdfJob)
+class PdfJobAdmin(admin.ModelAdmin):
+    list_display = ("id", "project", "kind", "status", "attempts", "created_at", "finished_at")
+    list_filter = ("status", "kind", "company")
+    search_fields = ("project__name", "error")
+    ordering = ("-id",)
+    autocomplete_fields = ("project",)
+    readonly_fields = ("created_at", "started_at", "heartbeat_at", "finished_at", "worker", "error")
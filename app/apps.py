@@ -4,4 +4,8 @@ from django.apps import AppConfig
 
 class AppConfig(AppConfig): # ← このクラス名を使います
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'app'
\ No newline at end of file
+    name = 'app'
+
+    def ready(self):
+        # モデル変更に連動する処理（版数更新など）を登録
+        from . import signals  # noqa: F401
\ No newline at end of file
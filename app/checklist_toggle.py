@@ -0,0 +1,127 @@
+# app/checklist_toggle.py
+"""
+チェック項目の完了/未完了の切り替え（1 件・まとめて）
+
+現場では項目を続けて何十件もチェックするので、画面は 1 件ずつページを読み直さず、
+JSON のエンドポイントで切り替えて、返ってきた状態と件数だけを書き換える。
+
+- 切り替えは条件付き UPDATE … RETURNING で行う（完了にする分・戻す分・反転する分で 1 回ずつ）。
+  「まだ完了でない行だけ完了にする」ので、同時に押されても状態が変わるのは片方だけ
+- 件数の足し引きは、先に読んだ状態ではなく UPDATE が実際に書き換えて返した行から求める
+  （SQLite では行ロックが効かないので、読んでから決めると同時押しで二重に数えてしまう。
+  RETURNING は PostgreSQL と SQLite 3.35 以降で使える）
+- UPDATE はシグナルを送らないので、チェックリストの項目数・完了数と案件の集計はここで足し引きする
+- まとめての切り替えは 1 トランザクション。1 件でも見つからない項目があれば何も変えない
+"""
+
+from __future__ import annotations
+
+from collections import Counter
+from dataclasses import dataclass, field
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import Checklist, ChecklistItem, Project
+from . import project_rollup
+
+
+MAX_BATCH_ITEMS = 200
+
+
+class ItemNotFound(LookupError):
+    """自社の案件に無い（または存在しない）チェック項目が含まれていた"""
+
+    def __init__(self, ids):
+        self.ids = sorted(ids)
+        super().__init__(f"チェック項目が見つかりません: {', '.join(map(str, self.ids))}")
+
+
+@dataclass
+class ToggleResult:
+    # 項目ID → 切り替え後の完了状態
+    items: dict[int, bool] = field(default_factory=dict)
+    # 実際に状態が変わった項目ID
+    changed: set[int] = field(default_factory=set)
+    checklists: list[dict] = field(default_factory=list)
+    projects: list[dict] = field(default_factory=list)
+
+    def to_json(self) -> dict:
+        return {
+            "items": [{"id": pk, "done": done, "changed": pk in self.changed} for pk, done in self.items.items()],
+            "checklists": self.checklists,
+            "projects": self.projects,
+        }
+
+
+def toggle_items(company_id: int, changes: dict[int, bool | None]) -> ToggleResult:
+    """
+    チェック項目の完了状態を変える（changes: 項目ID → 完了にするなら True、戻すなら False、反転なら None）。
+    クエリは 自社の項目かの確認 1 回 + UPDATE 最大 3 回 + チェックリストごとの件数の更新 + 読み込み 3 回。
+    """
+    if len(changes) > MAX_BATCH_ITEMS:
+        raise ValueError(f"一度に切り替えられるのは {MAX_BATCH_ITEMS} 件までです")
+    result = ToggleResult()
+    if not changes:
+        return result
+
+    with transaction.atomic():
+        # 項目ID → チェックリストID（返す件数の対象。状態はここでは決めない）
+        found = dict(
+            ChecklistItem.objects.filter(pk__in=list(changes), checklist__project__company_id=company_id)
+            .values_list("pk", "checklist_id")
+        )
+        missing = set(changes) - set(found)
+        if missing:
+            raise ItemNotFound(missing)
+
+        now = connection.ops.adapt_datetimefield_value(timezone.now())
+        changed_rows = []  # (項目ID, チェックリストID, 切り替え後の完了状態)
+        for target in (True, False, None):
+            pks = sorted(pk for pk in found if changes[pk] is target)
+            if pks:
+                changed_rows += _update(pks, target, now)
+
+        for pk in sorted(found):
+            if changes[pk] is not None:
+                result.items[pk] = changes[pk]  # 書き換わらなかった行は既にその状態
+        delta: Counter = Counter()
+        for pk, checklist_id, is_done in changed_rows:
+            is_done = bool(is_done)
+            result.items[pk] = is_done
+            result.changed.add(pk)
+            delta[checklist_id] += 1 if is_done else -1
+
+        checklist_ids = set(found.values()) | set(delta)
+        projects = dict(Checklist.objects.filter(pk__in=checklist_ids).values_list("pk", "project_id"))
+        for checklist_id, done in sorted(delta.items()):
+            if done:
+                project_rollup.checklist_items_changed(checklist_id, projects.get(checklist_id), done=done)
+
+        result.checklists = list(
+            Checklist.objects.filter(pk__in=checklist_ids).order_by("pk").values("id", "items_done", "items_total")
+        )
+        result.projects = list(
+            Project.objects.filter(pk__in=set(projects.values()))
+            .order_by("pk")
+            .values("id", "checklist_items_done", "checklist_items_total")
+        )
+    return result
+
+
+def _update(pks: list[int], target: bool | None, now) -> list[tuple]:
+    """
+    pks を完了（True）/ 未完了（False）にする、または反転（None）し、実際に書き換えた行を返す。
+    完了・未完了の指定は状態が違う行だけを書き換えるので、既にその状態の行は返らない。
+    """
+    table = connection.ops.quote_name(ChecklistItem._meta.db_table)
+    placeholders = ", ".join(["%s"] * len(pks))
+    if target is None:
+        sql = f"UPDATE {table} SET is_done = NOT is_done, updated_at = %s WHERE id IN ({placeholders})"
+        params = [now, *pks]
+    else:
+        sql = f"UPDATE {table} SET is_done = %s, updated_at = %s WHERE id IN ({placeholders}) AND is_done = %s"
+        params = [target, now, *pks, not target]
+    with connection.cursor() as cursor:
+        cursor.execute(sql + " RETURNING id, checklist_id, is_done", params)
+        return cursor.fetchall()
@@ -0,0 +1,112 @@
+# app/company_stats.py
+"""
+ダッシュボード用の会社ごとの集計（CompanyStats）
+
+ホーム画面を開くたびに案件・タスクを数え直さないよう、会社ごとに 1 行の集計を持ち、
+案件・タスクの保存/削除のシグナルで差分だけを足し引きする（F 式の UPDATE 1 回）。
+
+  - 進行中の案件数
+  - 未完了タスク数（進捗 100% 未満）
+  - 期限が 7 日以内の未完了タスク数（今日〜7 日後）
+  - 期限切れの未完了タスク数（今日より前）
+
+期限の 2 つは「今日」によって変わるので、行には集計した日（as_of）を持たせる。
+日付が変わった行は差分を足さずに数え直す（読み込み時も同じ）。日付の切り替わりや、
+シグナルを通らない更新（bulk_update・QuerySet.update・同時編集の取りこぼし）のずれは
+`python manage.py reconcile_company_stats` を毎日深夜に cron で実行して直す。
+"""
+
+from __future__ import annotations
+
+from collections import Counter
+from datetime import date, timedelta
+from typing import Iterable
+
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from .models import CompanyStats, Project, Task
+
+
+IN_PROGRESS_STATUS = "進行中"
+DUE_SOON_DAYS = 7
+
+TaskState = tuple[date | None, int]  # (終了日, 進捗)
+
+
+# ------------------------------------------------------------
+# 数え直し
+# ------------------------------------------------------------
+def refresh(company_id: int, today: date | None = None) -> CompanyStats:
+    """会社の集計を数え直して保存する（クエリは集計 2 回 + 保存）"""
+    today = today or timezone.localdate()
+    tasks = Task.objects.filter(project__company_id=company_id, progress__lt=100).aggregate(
+        open=Count("id"),
+        due_soon=Count("id", filter=Q(end_date__gte=today, end_date__lte=today + timedelta(days=DUE_SOON_DAYS))),
+        overdue=Count("id", filter=Q(end_date__lt=today)),
+    )
+    stats, _ = CompanyStats.objects.update_or_create(
+        company_id=company_id,
+        defaults={
+            "in_progress_projects": Project.objects.filter(company_id=company_id, status=IN_PROGRESS_STATUS).count(),
+            "open_tasks": tasks["open"],
+            "due_soon_tasks": tasks["due_soon"],
+            "overdue_tasks": tasks["overdue"],
+            "as_of": today,
+        },
+    )
+    return stats
+
+
+def get_stats(company_id: int | None) -> CompanyStats:
+    """ダッシュボード用。今日の集計があれば 1 行読むだけ、なければ数え直す"""
+    if company_id is None:
+        return CompanyStats()
+    today = timezone.localdate()
+    stats = CompanyStats.objects.filter(company_id=company_id, as_of=today).first()
+    return stats or refresh(company_id, today)
+
+
+# ------------------------------------------------------------
+# 差分の反映（signals から呼ぶ）
+# ------------------------------------------------------------
+def task_counts(states: Iterable[TaskState], today: date) -> Counter:
+    """タスクの (終了日, 進捗) の並びが各集計にいくつ数えられるか"""
+    counts: Counter = Counter()
+    for end_date, progress in states:
+        if progress >= 100:
+            continue
+        counts["open_tasks"] += 1
+        if end_date is None:
+            continue
+        if end_date < today:
+            counts["overdue_tasks"] += 1
+        elif end_date <= today + timedelta(days=DUE_SOON_DAYS):
+            counts["due_soon_tasks"] += 1
+    return counts
+
+
+def tasks_changed(company_id: int, before: Iterable[TaskState] = (), after: Iterable[TaskState] = ()) -> None:
+    """会社のタスクが before の状態から after の状態に変わった（追加なら before は空、削除なら after は空）"""
+    today = timezone.localdate()
+    delta = Counter(task_counts(after, today))
+    delta.subtract(task_counts(before, today))
+    _apply(company_id, delta, today)
+
+
+def project_status_changed(company_id: int, old_status: str | None, new_status: str | None) -> None:
+    delta = Counter()
+    delta["in_progress_projects"] = (new_status == IN_PROGRESS_STATUS) - (old_status == IN_PROGRESS_STATUS)
+    _apply(company_id, delta, timezone.localdate())
+
+
+def _apply(company_id: int, delta: Counter, today: date) -> None:
+    delta = {field: n for field, n in delta.items() if n}
+    if company_id is None or not delta:
+        return
+    updated = CompanyStats.objects.filter(company_id=company_id, as_of=today).update(
+        **{field: F(field) + n for field, n in delta.items()}, updated_at=timezone.now()
+    )
+    if not updated:
+        # 行がない・日付が変わった → 差分では直せないので数え直す（今回の変更も含まれる）
+        refresh(company_id, today)
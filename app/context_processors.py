@@ -0,0 +1,18 @@
+# app/context_processors.py
+"""
+全ページのテンプレートに渡す値（settings.TEMPLATES の context_processors に登録）
+"""
+
+from __future__ import annotations
+
+from django.utils.functional import SimpleLazyObject
+
+from . import mentions
+
+
+def mentions_badge(request):
+    """ナビゲーションの未読メンション数（テンプレートで使われたときだけ 1 行読む）"""
+    user = getattr(request, "user", None)
+    if user is None or not user.is_authenticated:
+        return {}
+    return {"unread_mentions": SimpleLazyObject(lambda: mentions.unread_count(user))}
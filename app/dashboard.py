@@ -0,0 +1,170 @@
+# app/dashboard.py
+"""
+ダッシュボード（HomeView）の表示内容を会社ごとにキャッシュする
+
+「期限が近いタスク」（先頭 DUE_TASKS_LIMIT 件。全件は期限一覧ページでキーセットページング）と
+「最近の共有メモ」は同じ会社の利用者なら誰が見ても同じなので、
+会社ごとに 1 回だけ組み立てて、テンプレートが参照する形（dict のリスト）でキャッシュする。
+
+キーは「会社 ID・集計日・版数」。版数は CompanyStats.version（DB）に持ち、案件・タスク・メモの
+保存/削除のシグナルで +1 する（invalidate）。ローカルメモリキャッシュはプロセスごとに別物なので、
+キャッシュ側に版数を持つと他のワーカーのキャッシュを無効にできない。DB の版数をキーにすれば、
+どのプロセスでも変更後は新しいキーを引くことになる（古いキーは期限切れで消える）。
+版数はダッシュボードの件数と同じ行にあるので、余計なクエリは増えない。
+
+キャッシュが無いときに同時にアクセスが来ても組み立ては 1 回で済むよう、cache.add による
+ロックを取った 1 リクエストだけが組み立て、ほかは直前の内容を返す（なければ少し待つ）。
+ロックはローカルメモリならプロセス内、ファイルキャッシュならプロセス間で効く。
+"""
+
+from __future__ import annotations
+
+import time
+from datetime import date, timedelta
+from typing import Callable
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import CompanyStats, Memo, Task
+from . import company_stats
+
+
+DASHBOARD_CACHE_TIMEOUT = 60 * 60
+RECENT_MEMOS = 5
+DUE_TASKS_LIMIT = 10
+DUE_TASKS_PAGE_SIZE = 50
+
+# 組み立て中のロック（組み立てが異常終了しても、この秒数で外れる）
+LOCK_TIMEOUT = 30
+# ロックが取れず、直前の内容も無いときに待つ時間
+LOCK_WAIT = 5.0
+LOCK_POLL = 0.05
+
+
+# ------------------------------------------------------------
+# 無効化（signals から呼ぶ）
+# ------------------------------------------------------------
+def invalidate(company_id: int | None) -> None:
+    """会社のダッシュボードのキャッシュを無効にする（コミット後に版数を +1）"""
+    if company_id is None:
+        return
+    transaction.on_commit(
+        lambda: CompanyStats.objects.filter(company_id=company_id).update(version=F("version") + 1)
+    )
+
+
+# ------------------------------------------------------------
+# 組み立て
+# ------------------------------------------------------------
+def dashboard_cache_key(stats: CompanyStats) -> str:
+    return f"dashboard:{stats.company_id}:{stats.as_of}:{stats.version}"
+
+
+def encode_due_cursor(end_date: date, pk: int) -> str:
+    """並び順 (終了日, ID) 上の位置を表すカーソル"""
+    return f"{end_date.isoformat()}_{pk}"
+
+
+def decode_due_cursor(value: str) -> tuple[date, int]:
+    """encode_due_cursor() の逆（不正なら ValueError）"""
+    end_date, pk = value.split("_")
+    return date.fromisoformat(end_date), int(pk)
+
+
+def due_tasks_page(company_id: int, today: date, after: tuple[date, int] | None = None,
+                   limit: int = DUE_TASKS_PAGE_SIZE) -> tuple[list[dict], str | None]:
+    """
+    期限切れ・期限が近い未完了タスクを (終了日, ID) 順に limit 件と、次ページのカーソル。
+    部分インデックス task_open_due_idx（progress < 100 のみ）を順に読むので、完了済みの履歴は読まない。
+    """
+    due_date_limit = today + timedelta(days=company_stats.DUE_SOON_DAYS)
+    qs = Task.objects.filter(project__company_id=company_id, end_date__lte=due_date_limit, progress__lt=100)
+    if after is not None:
+        end_date, pk = after
+        qs = qs.filter(Q(end_date__gt=end_date) | Q(end_date=end_date, id__gt=pk))
+    fields = ("id", "name", "end_date", "progress", "project_id", "project__name")
+    rows = list(qs.order_by("end_date", "id").values_list(*fields)[: limit + 1])
+    next_cursor = encode_due_cursor(rows[limit - 1][2], rows[limit - 1][0]) if len(rows) > limit else None
+    tasks = [
+        {
+            "pk": pk,
+            "name": name,
+            "end_date": end_date,
+            "progress": progress,
+            "project": {"pk": project_id, "name": project_name},
+        }
+        for pk, name, end_date, progress, project_id, project_name in rows[:limit]
+    ]
+    return tasks, next_cursor
+
+
+def build_lists(company_id: int, today: date) -> dict:
+    """会社の「期限が近いタスク」（先頭のみ）「最近の共有メモ」（テンプレートが参照する形の dict）"""
+    tasks, next_cursor = due_tasks_page(company_id, today, limit=DUE_TASKS_LIMIT)
+    memos = (
+        Memo.objects.filter(project__company_id=company_id)
+        .order_by("-id")
+        .values_list("content", "created_at", "project_id", "project__name", "author__username")[:RECENT_MEMOS]
+    )
+    return {
+        "overdue_tasks": tasks,
+        "overdue_tasks_more": next_cursor is not None,
+        "recent_memos": [
+            {
+                "content": content,
+                "created_at": created_at,
+                "project": {"pk": project_id, "name": project_name},
+                "author": {"username": username} if username else None,
+            }
+            for content, created_at, project_id, project_name, username in memos
+        ],
+    }
+
+
+def get_context(company_id: int | None) -> dict:
+    """
+    HomeView のコンテキスト（件数・期限が近いタスク・最近のメモ）。
+    キャッシュが当たれば、クエリは集計行の 1 回だけ。
+    """
+    stats = company_stats.get_stats(company_id)
+    today = stats.as_of or timezone.localdate()
+    context = {"stats": stats, "today": today}
+    if company_id is None:
+        return context | {"overdue_tasks": [], "overdue_tasks_more": False, "recent_memos": []}
+    lists = _get_or_build(
+        dashboard_cache_key(stats),
+        f"dashboard:{company_id}:last",
+        lambda: build_lists(company_id, today),
+    )
+    return context | lists
+
+
+def _get_or_build(key: str, last_key: str, build: Callable[[], dict]) -> dict:
+    data = cache.get(key)
+    if data is not None:
+        return data
+
+    lock_key = f"{key}:lock"
+    if cache.add(lock_key, 1, LOCK_TIMEOUT):
+        try:
+            data = build()
+            cache.set_many({key: data, last_key: data}, DASHBOARD_CACHE_TIMEOUT)
+        finally:
+            cache.delete(lock_key)
+        return data
+
+    # ほかのリクエストが組み立て中：直前の内容で返す（数秒だけ古い表示になる）
+    data = cache.get(last_key)
+    if data is not None:
+        return data
+    deadline = time.monotonic() + LOCK_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(LOCK_POLL)
+        data = cache.get(key)
+        if data is not None:
+            return data
+    # 組み立てが終わらない（ロックを持ったまま落ちたなど）ときは自分で組み立てる
+    return build()
@@ -7,6 +7,7 @@ from django.contrib.auth.forms import AuthenticationForm
 from .models import (
     CustomUser,
     Company,
+    Customer,
     Project,
     Memo,
     Checklist,
@@ -14,6 +15,7 @@ from .models import (
     Invitation,
     Task,
 )
+from . import task_closure
 
 
 # =========================
@@ -117,6 +119,57 @@ class ProjectCreateForm(ProjectForm):
     pass
 
 
+class ProjectFilterForm(forms.Form):
+    """案件一覧の絞り込み・並び替え（GET パラメータ。誤った項目は無視する）"""
+    SORT_CHOICES = [
+        ("new", "新しい順"),
+        ("old", "古い順"),
+        ("end", "終了予定日が近い順"),
+        ("-end", "終了予定日が遠い順"),
+        ("name", "案件名順"),
+    ]
+
+    status = forms.ChoiceField(
+        choices=[("", "すべてのステータス")] + ProjectForm.STATUS_CHOICES[1:],
+        label="ステータス",
+        required=False,
+        widget=forms.Select(attrs={"class": "form-select form-select-sm"}),
+    )
+    customer = forms.ModelChoiceField(
+        queryset=Customer.objects.none(),
+        label="顧客",
+        required=False,
+        empty_label="すべての顧客",
+        widget=forms.Select(attrs={"class": "form-select form-select-sm"}),
+    )
+    end_from = forms.DateField(
+        label="終了予定日（から）",
+        required=False,
+        widget=forms.DateInput(attrs={"class": "form-control form-control-sm", "type": "date"}),
+    )
+    end_to = forms.DateField(
+        label="終了予定日（まで）",
+        required=False,
+        widget=forms.DateInput(attrs={"class": "form-control form-control-sm", "type": "date"}),
+    )
+    sort = forms.ChoiceField(
+        choices=SORT_CHOICES,
+        label="並び順",
+        required=False,
+        widget=forms.Select(attrs={"class": "form-select form-select-sm"}),
+    )
+
+    def __init__(self, *args, company=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        # 顧客は自社の分だけ選べる
+        self.fields["customer"].queryset = Customer.objects.filter(company=company).order_by("name")
+
+    def filters(self) -> dict:
+        """正しく入力された項目だけを返す（誤った項目は絞り込まない）"""
+        self.is_valid()
+        return {k: v for k, v in self.cleaned_data.items() if v not in (None, "")}
+
+
 # =========================
 # 共有メモ
 # =========================
@@ -242,7 +295,41 @@ class TaskForm(forms.ModelForm):
                 qs = qs.exclude(pk=self.instance.pk)
             self.fields["dependencies"].queryset = qs
 
+    def clean_dependencies(self):
+        deps = self.cleaned_data.get("dependencies")
+        # 新規タスクには後続がまだ無いので循環は起こらない
+        if not deps or not (self.instance and self.instance.pk):
+            return deps
+        # 自分の下流（閉包テーブル）を先行に選んでいないかを 1 クエリで確認
+        cyclic = task_closure.cyclic_dependencies(self.instance.pk, [d.pk for d in deps])
+        if cyclic:
+            names = "、".join(d.name for d in deps if d.pk in cyclic)
+            raise forms.ValidationError(f"依存関係が循環するため選択できません: {names}")
+        return deps
+
 
 class TaskUpdateForm(TaskForm):
     """旧ビュー互換：更新用フォーム"""
-    pass
\ No newline at end of file
+    pass
+
+class TaskImportForm(forms.Form):
+    """工程表（CSV / TSV）の一括取り込み"""
+    ENCODING_CHOICES = [
+        ("utf-8-sig", "UTF-8"),
+        ("cp932", "Shift_JIS（Excel 既定の CSV）"),
+    ]
+    file = forms.FileField(
+        label="工程表ファイル（CSV / TSV）",
+        widget=forms.ClearableFileInput(attrs={"class": "form-control", "accept": ".csv,.tsv,.txt"}),
+    )
+    encoding = forms.ChoiceField(
+        label="文字コード",
+        choices=ENCODING_CHOICES,
+        initial="utf-8-sig",
+        widget=forms.Select(attrs={"class": "form-select"}),
+    )
+    dry_run = forms.BooleanField(
+        label="確認のみ（登録しない）",
+        required=False,
+        widget=forms.CheckboxInput(attrs={"class": "form-check-input"}),
+    )
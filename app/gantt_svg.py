@@ -0,0 +1,316 @@
+# app/gantt_svg.py
+"""
+工程表（ガントチャート）の SVG をサーバー側で描画する
+
+ブラウザの Frappe Gantt が描いた SVG を送り返してもらう代わりに、Task の行から直接
+  - 月/日（週・月）の目盛り、行の縞
+  - 週末の帯、月初の線、今日の線
+  - 工程ごとに色分けしたバーと進捗、開始日/終了日の DD ラベル
+  - 左側のタスク名列
+  - 依存関係の矢印
+を描く。出力は入力データ・表示モード・当日の日付だけで決まるので、
+それらのハッシュをキーにしてキャッシュする。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+from dataclasses import dataclass
+from datetime import date, timedelta
+from xml.sax.saxutils import escape
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import Project, Task
+
+
+# ------------------------------------------------------------
+# 表示設定
+# ------------------------------------------------------------
+# 表示モードごとの 1 日あたりの幅(px)
+VIEW_MODES = {
+    "Day": 30,
+    "Week": 12,
+    "Month": 4,
+    "Year": 2,
+}
+DEFAULT_VIEW_MODE = "Week"
+
+LEFT_WIDTH = 200     # タスク名列
+HEADER_HEIGHT = 50   # 目盛り（上段 20 + 下段 30）
+BAR_HEIGHT = 22
+ROW_HEIGHT = BAR_HEIGHT + 18
+FONT = "'Noto Sans JP', sans-serif"
+
+# 工程色（project_detail.html の COLOR_MAP / KEYWORDS と同じ）
+COLOR_MAP = {
+    "基礎": ("#e53935", "#c62828"),
+    "解体": ("#8d6e63", "#6d4c41"),
+    "電気": ("#fbc02d", "#f9a825"),
+    "水道": ("#29b6f6", "#0288d1"),
+    "塗装": ("#8e24aa", "#6a1b9a"),
+    "外構": ("#43a047", "#2e7d32"),
+    "クロス": ("#7cb342", "#558b2f"),
+    "大工": ("#3949ab", "#283593"),
+    "設置": ("#ff9800", "#ef6c00"),
+    "クリーニング": ("#00acc1", "#00838f"),
+    "屋根": ("#607d8b", "#455a64"),
+    "その他": ("#00acc1", "#00838f"),
+}
+
+KEYWORDS = {
+    "基礎": ["基礎", "土間", "砕石", "配筋", "コンクリート"],
+    "解体": ["解体", "撤去"],
+    "電気": ["電気", "電設", "配線", "照明", "分電盤", "コンセント"],
+    "水道": ["水道", "給水", "給湯", "排水", "配管", "衛生", "設備"],
+    "塗装": ["塗装", "ペンキ"],
+    "外構": ["外構", "エクステリア", "フェンス", "カーポート", "土留め"],
+    "クロス": ["クロス", "壁紙", "内装仕上", "貼替"],
+    "大工": ["大工", "造作", "下地", "木工", "フローリング", "建具"],
+    "設置": ["設置", "据付", "取り付け", "機器", "設備据付"],
+    "クリーニング": ["クリーニング", "清掃", "美装"],
+    "屋根": ["屋根", "瓦", "板金", "ルーフ", "防水"],
+}
+
+# 全角英数 → 半角
+_FULLWIDTH = str.maketrans(
+    {chr(c): chr(c - 0xFEE0) for r in ("ＡＺ", "ａｚ", "０９") for c in range(ord(r[0]), ord(r[1]) + 1)}
+)
+
+
+def _norm(s: str) -> str:
+    # 全角英数を半角に、空白を除去、小文字化（JS 版の norm() と同じ）
+    return "".join((s or "").translate(_FULLWIDTH).split()).lower()
+
+
+def task_type(name: str) -> str:
+    """タスク名から工程種別を推定する（JS 版の getTaskType() と同じ）"""
+    name_n = _norm(name)
+    parts = [p for p in re.split(r"[・/／,、]", name_n) if p] or [name_n]
+    for typ, keys in KEYWORDS.items():
+        keys_n = [_norm(k) for k in keys]
+        if any(k in chunk for chunk in parts for k in keys_n):
+            return typ
+    return "その他"
+
+
+# ------------------------------------------------------------
+# 入力データ
+# ------------------------------------------------------------
+@dataclass(frozen=True)
+class GanttRow:
+    id: int
+    name: str
+    start: date
+    end: date
+    progress: int
+
+
+def load_rows(project: Project) -> tuple[list[GanttRow], list[tuple[int, int]]]:
+    """日付の揃ったタスクと、その間の依存（先行, 後続）を 2 クエリで読む"""
+    rows = [
+        GanttRow(pk, name or "", start, end, int(progress or 0))
+        for pk, name, start, end, progress in Task.objects.filter(
+            project=project, start_date__isnull=False, end_date__isnull=False
+        )
+        .order_by("start_date", "end_date", "id")
+        .values_list("id", "name", "start_date", "end_date", "progress")
+    ]
+    edges = list(
+        Task.dependencies.through.objects.filter(from_task__project=project)
+        .order_by("from_task_id", "to_task_id")
+        .values_list("to_task_id", "from_task_id")
+    )
+    return rows, edges
+
+
+def data_hash(rows: list[GanttRow], edges: list[tuple[int, int]], view_mode: str, today: date) -> str:
+    payload = json.dumps(
+        [
+            [(r.id, r.name, r.start.isoformat(), r.end.isoformat(), r.progress) for r in rows],
+            edges,
+            view_mode,
+            today.isoformat(),
+        ],
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+# ------------------------------------------------------------
+# 描画
+# ------------------------------------------------------------
+def _month_start(d: date) -> date:
+    return d.replace(day=1)
+
+
+def _next_month(d: date) -> date:
+    return (d.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def _span(rows: list[GanttRow], view_mode: str) -> tuple[date, date]:
+    """描画範囲（開始日, 終了日の翌日）"""
+    lo = min(r.start for r in rows)
+    hi = max(r.end for r in rows)
+    if view_mode == "Day":
+        return lo - timedelta(days=2), hi + timedelta(days=3)
+    if view_mode == "Week":
+        lo -= timedelta(days=lo.weekday())  # 月曜始まり
+        return lo, hi + timedelta(days=7 - hi.weekday())
+    return _month_start(lo), _next_month(hi)
+
+
+def render_gantt_svg(
+    rows: list[GanttRow],
+    edges: list[tuple[int, int]],
+    view_mode: str = DEFAULT_VIEW_MODE,
+    today: date | None = None,
+) -> str:
+    if view_mode not in VIEW_MODES:
+        view_mode = DEFAULT_VIEW_MODE
+    today = today or timezone.localdate()
+    if not rows:
+        return (
+            '<svg xmlns="http://www.w3.org/2000/svg" width="400" height="40">'
+            f'<text x="10" y="24" font-family="{FONT}" font-size="12" fill="#6c757d">'
+            "工程タスクが登録されていません。</text></svg>"
+        )
+
+    px = VIEW_MODES[view_mode]
+    first, last = _span(rows, view_mode)
+    days = (last - first).days
+    width = LEFT_WIDTH + days * px
+    height = HEADER_HEIGHT + len(rows) * ROW_HEIGHT
+
+    def x_of(d: date) -> float:
+        return LEFT_WIDTH + (d - first).days * px
+
+    out: list[str] = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+        f'viewBox="0 0 {width} {height}" font-family="{FONT}">',
+        "<defs>"
+        '<marker id="arrowhead" markerWidth="8" markerHeight="8" refX="7" refY="4" orient="auto">'
+        '<path d="M0,0 L8,4 L0,8 z" fill="#495057"/></marker>'
+        "</defs>",
+        f'<rect x="0" y="0" width="{width}" height="{height}" fill="#ffffff"/>',
+    ]
+
+    # --- 行の縞 ---
+    for i in range(len(rows)):
+        y = HEADER_HEIGHT + i * ROW_HEIGHT
+        fill = "#f8f9fa" if i % 2 else "#ffffff"
+        out.append(f'<rect class="grid-row" x="{LEFT_WIDTH}" y="{y}" width="{days * px}" height="{ROW_HEIGHT}" fill="{fill}"/>')
+
+    # --- 週末の帯 / 月初の線 / 目盛り ---
+    body_h = height - HEADER_HEIGHT
+    out.append(f'<rect class="grid-header" x="0" y="0" width="{width}" height="{HEADER_HEIGHT}" fill="#f1f3f5"/>')
+    d = first
+    while d < last:
+        x = x_of(d)
+        if d.weekday() >= 5:
+            out.append(f'<rect class="weekend-rect" x="{x}" y="{HEADER_HEIGHT}" width="{px}" height="{body_h}" fill="rgba(33,37,41,0.06)"/>')
+        if d.day == 1:
+            out.append(f'<rect class="month-split" x="{x}" y="0" width="2" height="{height}" fill="#6c757d" opacity="0.8"/>')
+        out.extend(_ticks(d, x, view_mode, d == first))
+        d += timedelta(days=1)
+
+    # --- 今日の線 ---
+    if first <= today < last:
+        out.append(f'<rect class="today-marker" x="{x_of(today)}" y="0" width="2" height="{height}" fill="#ff3b30" opacity="0.95"/>')
+
+    # --- バー ---
+    index = {r.id: i for i, r in enumerate(rows)}
+    for i, r in enumerate(rows):
+        fill, stroke = COLOR_MAP[task_type(r.name)]
+        x = x_of(r.start)
+        w = max((r.end - r.start).days + 1, 1) * px
+        y = HEADER_HEIGHT + i * ROW_HEIGHT + (ROW_HEIGHT - BAR_HEIGHT) / 2
+        cy = y + BAR_HEIGHT / 2
+        prog = min(max(r.progress, 0), 100)
+        out.append(
+            f'<g class="bar-wrapper" data-id="{r.id}">'
+            f'<rect class="bar" x="{x}" y="{y}" width="{w}" height="{BAR_HEIGHT}" rx="4" ry="4" fill="{fill}" stroke="{stroke}"/>'
+            f'<rect class="bar-progress" x="{x}" y="{y}" width="{w * prog / 100:.1f}" height="{BAR_HEIGHT}" rx="4" ry="4" fill="{stroke}"/>'
+            f'<text class="left-date-label" x="{x - 4}" y="{cy}" font-size="11" font-weight="700" text-anchor="end" dominant-baseline="middle" fill="#2a2f36">{r.start.day:02d}</text>'
+            f'<text class="right-date-label" x="{x + w + 4}" y="{cy}" font-size="11" font-weight="700" dominant-baseline="middle" fill="#2a2f36">{r.end.day:02d}</text>'
+            "</g>"
+        )
+
+    # --- 依存の矢印（先行の終了 → 後続の開始） ---
+    for pred, succ in edges:
+        if pred not in index or succ not in index:
+            continue
+        p, s = rows[index[pred]], rows[index[succ]]
+        x1 = x_of(p.end + timedelta(days=1))
+        y1 = HEADER_HEIGHT + index[pred] * ROW_HEIGHT + ROW_HEIGHT / 2
+        x2 = x_of(s.start)
+        y2 = HEADER_HEIGHT + index[succ] * ROW_HEIGHT + ROW_HEIGHT / 2
+        out.append(
+            f'<path class="arrow" d="M{x1},{y1} H{x1 + 6} V{y2} H{x2 - 1}" fill="none" stroke="#495057" '
+            'stroke-width="1.2" marker-end="url(#arrowhead)"/>'
+        )
+
+    # --- 左のタスク名列 ---
+    out.append(f'<rect x="0" y="{HEADER_HEIGHT}" width="{LEFT_WIDTH}" height="{body_h}" fill="#ffffff"/>')
+    out.append(f'<line x1="{LEFT_WIDTH}" y1="0" x2="{LEFT_WIDTH}" y2="{height}" stroke="#dee2e6"/>')
+    for i, r in enumerate(rows):
+        cy = HEADER_HEIGHT + i * ROW_HEIGHT + ROW_HEIGHT / 2
+        out.append(
+            f'<text class="gantt-left-item" x="8" y="{cy}" font-size="12" font-weight="700" '
+            f'dominant-baseline="middle" fill="#212529">{escape(_clip(r.name or "(無題)"))}</text>'
+        )
+
+    out.append("</svg>")
+    return "".join(out)
+
+
+def _ticks(d: date, x: float, view_mode: str, is_first: bool) -> list[str]:
+    """上段（年月・年）と下段（日・月）の目盛り文字"""
+    upper = lower = None
+    if view_mode in ("Month", "Year"):
+        if d.day == 1:
+            lower = f"{d.month}月"
+        if (d.day == 1 and d.month == 1) or is_first:
+            upper = f"{d.year}年"
+    else:
+        if d.day == 1 or is_first:
+            upper = f"{d.year}年{d.month}月"
+        if view_mode == "Day" or d.weekday() == 0:
+            lower = f"{d.day}"
+    out = []
+    if upper:
+        out.append(f'<text class="upper-text" x="{x + 4}" y="15" font-size="12" font-weight="700" fill="#2a2f36">{upper}</text>')
+    if lower:
+        out.append(f'<text class="lower-text" x="{x + 2}" y="40" font-size="11" fill="#2a2f36">{lower}</text>')
+    return out
+
+
+def _clip(name: str, limit: int = 14) -> str:
+    return name if len(name) <= limit else name[: limit - 1] + "…"
+
+
+# ------------------------------------------------------------
+# キャッシュ付きの入口
+# ------------------------------------------------------------
+SVG_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def gantt_svg_for_project(project: Project, view_mode: str = DEFAULT_VIEW_MODE) -> str:
+    """
+    案件の工程表 SVG を返す。タスクデータ・表示モード・当日のハッシュでキャッシュするので、
+    同じ内容の再出力では描画をしない。
+    """
+    if view_mode not in VIEW_MODES:
+        view_mode = DEFAULT_VIEW_MODE
+    today = timezone.localdate()
+    rows, edges = load_rows(project)
+    key = f"gantt_svg:{data_hash(rows, edges, view_mode, today)}"
+    svg = cache.get(key)
+    if svg is None:
+        svg = render_gantt_svg(rows, edges, view_mode, today)
+        cache.set(key, svg, SVG_CACHE_TIMEOUT)
+    return svg
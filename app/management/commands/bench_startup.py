@@ -0,0 +1,117 @@
+# app/management/commands/bench_startup.py
+"""
+Web ワーカー 1 プロセスの起動コスト（import 時間・RSS）を計測するベンチマーク。
+
+    python manage.py bench_startup
+    python manage.py bench_startup --repeat 10 --max-import-ms 1500 --max-rss-mb 120
+
+gunicorn のワーカーと同じく、新しい Python プロセスで django.setup() → WSGI アプリ作成 →
+URLconf（全ビュー）の読み込みまでを行い、その時点の所要時間と最大 RSS を測る。
+起動時に WeasyPrint が読み込まれていたら失敗にする（PDF 描画時の遅延読み込みが崩れた回帰）。
+参考として、WeasyPrint を読み込んだ場合の追加コストも表示する。
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+# 子プロセスで実行するスクリプト（結果を JSON 1 行で出力する）
+CHILD_SCRIPT = r"""
+import json, sys, time
+t0 = time.perf_counter()
+import django
+django.setup()
+from django.core.wsgi import get_wsgi_application
+get_wsgi_application()
+from django.urls import get_resolver
+get_resolver().url_patterns  # ROOT_URLCONF とすべてのビューを読み込む
+t1 = time.perf_counter()
+
+def max_rss_kb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if sys.platform == "darwin" else rss  # macOS はバイト単位
+
+result = {
+    "import_ms": (t1 - t0) * 1000,
+    "max_rss_kb": max_rss_kb(),
+    "weasyprint_loaded": "weasyprint" in sys.modules,
+}
+if "--with-pdf" in sys.argv:
+    from app import pdf
+    t2 = time.perf_counter()
+    pdf.font_config()
+    pdf.stylesheets()
+    result["pdf_import_ms"] = (time.perf_counter() - t2) * 1000
+    result["max_rss_kb_with_pdf"] = max_rss_kb()
+print(json.dumps(result))
+"""
+
+
+class Command(BaseCommand):
+    help = "Web ワーカー起動時の import 時間と RSS を計測します（WeasyPrint が読み込まれていれば失敗）"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=5, help="計測回数（中央値を表示）")
+        parser.add_argument("--max-import-ms", type=float, help="起動時間の上限（超えたら失敗）")
+        parser.add_argument("--max-rss-mb", type=float, help="最大 RSS の上限（超えたら失敗）")
+        parser.add_argument("--skip-pdf", action="store_true", help="WeasyPrint 読み込み時の計測を省く")
+
+    def _run_child(self, *args: str) -> dict:
+        env = {**os.environ, "DJANGO_SETTINGS_MODULE": settings.SETTINGS_MODULE}
+        proc = subprocess.run(
+            [sys.executable, "-c", CHILD_SCRIPT, *args],
+            env=env,
+            capture_output=True,
+            text=True,
+            cwd=str(settings.BASE_DIR),
+        )
+        if proc.returncode != 0:
+            raise CommandError(f"計測用プロセスが失敗しました:\n{proc.stderr}")
+        return json.loads(proc.stdout.strip().splitlines()[-1])
+
+    def handle(self, *args, **opts):
+        runs = [self._run_child() for _ in range(max(1, opts["repeat"]))]
+        import_ms = statistics.median(r["import_ms"] for r in runs)
+        rss = [r["max_rss_kb"] for r in runs if r["max_rss_kb"] is not None]
+        rss_mb = statistics.median(rss) / 1024 if rss else None
+        loaded = any(r["weasyprint_loaded"] for r in runs)
+
+        self.stdout.write(f"startup    import={import_ms:8.1f}ms  rss={self._mb(rss_mb)}  weasyprint_loaded={loaded}")
+        if not opts["skip_pdf"]:
+            try:
+                with_pdf = self._run_child("--with-pdf")
+            except CommandError as e:
+                self.stdout.write(self.style.WARNING(f"WeasyPrint を読み込めないため PDF 時の計測は省略します\n{e}"))
+            else:
+                rss_pdf = with_pdf.get("max_rss_kb_with_pdf")
+                self.stdout.write(
+                    f"+weasyprint import={with_pdf['pdf_import_ms']:8.1f}ms  "
+                    f"rss={self._mb(rss_pdf / 1024 if rss_pdf is not None else None)}"
+                )
+
+        errors = []
+        if loaded:
+            errors.append("起動時に WeasyPrint が読み込まれています（PDF 描画時まで遅延させてください）")
+        if opts["max_import_ms"] is not None and import_ms > opts["max_import_ms"]:
+            errors.append(f"起動時間 {import_ms:.1f}ms が上限 {opts['max_import_ms']}ms を超えています")
+        if opts["max_rss_mb"] is not None and rss_mb is not None and rss_mb > opts["max_rss_mb"]:
+            errors.append(f"RSS {rss_mb:.1f}MiB が上限 {opts['max_rss_mb']}MiB を超えています")
+        if errors:
+            raise CommandError("\n".join(errors))
+        self.stdout.write(self.style.SUCCESS("OK"))
+
+    @staticmethod
+    def _mb(value: float | None) -> str:
+        return f"{value:7.1f}MiB" if value is not None else "    n/a"
@@ -0,0 +1,162 @@
+# app/management/commands/bench_tasks_json.py
+"""
+tasks.json のシリアライズ性能を、旧実装（モデル + prefetch + JsonResponse）と
+新実装（values_list + iterator + ストリーミング）で比較するベンチマーク。
+参考として列指向形式（?format=columnar）の所要時間と転送サイズも表示する。
+
+    python manage.py bench_tasks_json --tasks 10000 --deps 2
+
+ベンチ用のデータはトランザクション内で作成し、最後にロールバックする。
+"""
+
+from __future__ import annotations
+
+import gzip
+import json
+import random
+import time
+import tracemalloc
+import uuid
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.test.utils import CaptureQueriesContext
+
+from app.models import Company, Project, Task
+from app import task_feed
+
+
+class _Rollback(Exception):
+    pass
+
+
+def legacy_response(project: Project) -> JsonResponse:
+    """旧 ProjectTaskJSONView と同じ組み立て方（比較用）"""
+    tasks_qs = (
+        Task.objects.filter(project=project)
+        .prefetch_related("dependencies")
+        .order_by("start_date", "end_date", "id")
+    )
+    data = []
+    for t in tasks_qs:
+        deps = []
+        if hasattr(t, "dependencies"):
+            deps = [str(d.id) for d in t.dependencies.all()]
+        data.append(
+            {
+                "id": str(t.id),
+                "name": getattr(t, "name", "") or "",
+                "start": (t.start_date.isoformat() if getattr(t, "start_date", None) else None),
+                "end": (t.end_date.isoformat() if getattr(t, "end_date", None) else None),
+                "progress": int(getattr(t, "progress", 0) or 0),
+                "dependencies": ",".join(deps),
+            }
+        )
+    return JsonResponse(data, safe=False)
+
+
+def streaming_response(project: Project) -> StreamingHttpResponse:
+    return StreamingHttpResponse(task_feed.iter_task_json(project), content_type="application/json")
+
+
+def columnar_response(project: Project) -> HttpResponse:
+    """列指向形式（キャッシュを通さずに毎回組み立てる。bytes は非圧縮のサイズ）"""
+    body = json.dumps(task_feed.build_columnar(project), separators=(",", ":")).encode()
+    return HttpResponse(body, content_type=task_feed.COLUMNAR_MEDIA_TYPE)
+
+
+def _body_chunks(response):
+    return response.streaming_content if response.streaming else [response.content]
+
+
+def _normalized(response) -> list[dict]:
+    """比較用：依存先の並び順（旧実装は開始日順、新実装はID順）をそろえる"""
+    data = json.loads(b"".join(_body_chunks(response)))
+    for row in data:
+        row["dependencies"] = sorted(filter(None, row["dependencies"].split(",")), key=int)
+    return data
+
+
+class Command(BaseCommand):
+    help = "tasks.json の旧実装とストリーミング実装の速度・メモリ・クエリ数を比較します"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tasks", type=int, default=10000, help="タスク数")
+        parser.add_argument("--deps", type=int, default=2, help="1タスクあたりの依存数（最大）")
+        parser.add_argument("--repeat", type=int, default=3, help="計測回数（最良値を表示）")
+
+    def handle(self, *args, **opts):
+        try:
+            with transaction.atomic():
+                project = self._make_project(opts["tasks"], opts["deps"])
+                self._run(project, opts["repeat"])
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    # --------------------------------------------------------
+    def _make_project(self, n_tasks: int, n_deps: int) -> Project:
+        company = Company.objects.create(name=f"bench-{uuid.uuid4().hex[:8]}")
+        project = Project.objects.create(company=company, name="bench")
+        base = date.today()
+        tasks = Task.objects.bulk_create(
+            Task(
+                project=project,
+                name=f"工程 {i}",
+                start_date=base + timedelta(days=i % 365),
+                end_date=base + timedelta(days=i % 365 + 5),
+                progress=i % 101,
+            )
+            for i in range(n_tasks)
+        )
+        through = Task.dependencies.through
+        rnd = random.Random(0)
+        edges = []
+        for i, t in enumerate(tasks[1:], start=1):
+            for dep in rnd.sample(tasks[:i], min(i, rnd.randint(0, n_deps))):
+                edges.append(through(from_task_id=t.pk, to_task_id=dep.pk))
+        through.objects.bulk_create(edges, batch_size=5000)
+        self.stdout.write(f"tasks={n_tasks} edges={len(edges)}")
+        return project
+
+    def _measure(self, build, project: Project, repeat: int):
+        best_time = best_peak = None
+        size = queries = None
+        for _ in range(repeat):
+            tracemalloc.start()
+            with CaptureQueriesContext(connection) as ctx:
+                t0 = time.perf_counter()
+                response = build(project)
+                # 本文は保持しない（送出と同じくチャンクごとに捨てる）
+                size = 0
+                for chunk in _body_chunks(response):
+                    size += len(chunk)
+                elapsed = time.perf_counter() - t0
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            queries = len(ctx.captured_queries)
+            best_time = elapsed if best_time is None else min(best_time, elapsed)
+            best_peak = peak if best_peak is None else min(best_peak, peak)
+        return best_time, best_peak, queries, size
+
+    def _run(self, project: Project, repeat: int):
+        results = {}
+        for label, build in (("legacy", legacy_response), ("streaming", streaming_response)):
+            elapsed, peak, queries, size = self._measure(build, project, repeat)
+            results[label] = _normalized(build(project))
+            self.stdout.write(
+                f"{label:<10} time={elapsed * 1000:8.1f}ms  peak={peak / 1024 / 1024:7.2f}MiB  "
+                f"queries={queries}  bytes={size}"
+            )
+        elapsed, peak, queries, size = self._measure(columnar_response, project, repeat)
+        gz_size = len(gzip.compress(columnar_response(project).content))
+        self.stdout.write(
+            f"{'columnar':<10} time={elapsed * 1000:8.1f}ms  peak={peak / 1024 / 1024:7.2f}MiB  "
+            f"queries={queries}  bytes={size}  gzip={gz_size}"
+        )
+        if results["legacy"] == results["streaming"]:
+            self.stdout.write(self.style.SUCCESS("出力は一致しました"))
+        else:
+            self.stdout.write(self.style.ERROR("出力が一致しません"))
@@ -0,0 +1,46 @@
+# app/management/commands/export_project_pdfs.py
+"""
+会社の案件サマリー PDF をまとめて ZIP に書き出す（月末の一括出力用）
+
+    python manage.py export_project_pdfs --company 3 -o summaries.zip
+    python manage.py export_project_pdfs --company 3 --status 進行中 --processes 4 -o active.zip
+
+PDF は PDF_BATCH_MAX_PROCESSES（設定、既定は CPU コア数と 4 の小さい方）までのプロセスで並行して生成し、
+できた順に ZIP に書き込む。
+案件・顧客・タスクの読み込みは案件数にかかわらず 2 クエリ。
+"""
+
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app.models import Company
+from app import pdf
+
+
+class Command(BaseCommand):
+    help = "会社の案件サマリー PDF を並列で生成し、ZIP にまとめます"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--company", type=int, required=True, help="会社ID")
+        parser.add_argument("--status", default="", help="ステータスで絞り込む（例: 進行中）")
+        parser.add_argument(
+            "--processes", type=int, default=None, help="並列に生成するプロセス数（PDF_BATCH_MAX_PROCESSES まで）"
+        )
+        parser.add_argument("-o", "--output", required=True, help="出力する ZIP ファイル")
+
+    def handle(self, *args, **opts):
+        if not Company.objects.filter(pk=opts["company"]).exists():
+            raise CommandError(f"会社 {opts['company']} が見つかりません")
+
+        projects = pdf.batch_projects(opts["company"], opts["status"])
+        if not projects:
+            raise CommandError("対象の案件がありません")
+
+        def progress(done: int, total: int) -> None:
+            self.stdout.write(f"\r{done}/{total}", ending="")
+            self.stdout.flush()
+
+        count = pdf.export_batch(projects, opts["output"], processes=opts["processes"], progress=progress)
+        self.stdout.write("")
+        self.stdout.write(self.style.SUCCESS(f"{count} 件の PDF を {opts['output']} に書き出しました"))
@@ -0,0 +1,45 @@
+# app/management/commands/import_tasks.py
+"""
+工程表（CSV / TSV）を案件に一括登録する
+
+    python manage.py import_tasks 12 schedule.csv
+    python manage.py import_tasks 12 schedule.tsv --encoding cp932 --dry-run
+"""
+
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app.models import Project
+from app import task_import
+
+
+class Command(BaseCommand):
+    help = "CSV / TSV の工程表からタスクと依存関係を一括登録します"
+
+    def add_arguments(self, parser):
+        parser.add_argument("project", type=int, help="案件ID")
+        parser.add_argument("path", help="CSV / TSV ファイル")
+        parser.add_argument("--encoding", default="utf-8-sig", help="文字コード（既定: utf-8-sig。Excel の CSV は cp932）")
+        parser.add_argument("--delimiter", help="区切り文字（省略時は見出し行から判定）")
+        parser.add_argument("--dry-run", action="store_true", help="検証だけ行い登録しない")
+
+    def handle(self, *args, **opts):
+        try:
+            project = Project.objects.get(pk=opts["project"])
+        except Project.DoesNotExist:
+            raise CommandError(f"案件 {opts['project']} が見つかりません")
+
+        delimiter = opts["delimiter"]
+        if delimiter is None and opts["path"].lower().endswith(".tsv"):
+            delimiter = "\t"
+        try:
+            with open(opts["path"], "rb") as f:
+                result = task_import.import_tasks(
+                    project, f, encoding=opts["encoding"], delimiter=delimiter, dry_run=opts["dry_run"]
+                )
+        except task_import.TaskImportError as e:
+            raise CommandError("取り込めませんでした:\n" + "\n".join(e.errors))
+
+        verb = "登録できます（確認のみ）" if opts["dry_run"] else "登録しました"
+        self.stdout.write(self.style.SUCCESS(f"タスク {result.created} 件・依存 {result.dependencies} 件を{verb}"))
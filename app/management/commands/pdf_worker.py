@@ -0,0 +1,96 @@
+# app/management/commands/pdf_worker.py
+"""
+PDF 生成ジョブ（PdfJob）を処理するワーカー
+
+    python manage.py pdf_worker                  # 常駐（CPU 数までのプロセスで並行生成）
+    python manage.py pdf_worker --processes 2
+    python manage.py pdf_worker --once           # 待機中のジョブを処理したら終了（cron 用）
+
+キューはデータベースだけで、ほかのミドルウェアは不要。
+WeasyPrint の描画は CPU を使うので、スレッドではなくプロセスプールで並行させる。
+
+一括出力（案件サマリーの ZIP）は、子プロセスの中でさらに PDF_BATCH_MAX_PROCESSES 個までのプロセスを使う。
+同時に動くプロセスが --processes を大きく超えないよう、一括出力はワーカーが空いているときにだけ取り出し、
+それが終わるまでほかのジョブは取り出さない（一括出力 1 件がワーカー 1 台を占有する）。
+"""
+
+from __future__ import annotations
+
+import os
+import signal
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from app import pdf
+from app.models import PdfJob
+
+
+def _init_child():
+    # 親の DB 接続を子プロセスで使い回さない（fork 時も spawn 時も動くように初期化し直す）
+    django.setup()
+    connections.close_all()
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # 停止は親がまとめて行う
+    # WeasyPrint は遅延読み込みなので、最初のジョブが遅くならないよう子プロセスの起動時に読み込んでおく
+    pdf.font_config()
+    pdf.stylesheets()
+
+
+class Command(BaseCommand):
+    help = "PDF 生成ジョブを処理します（データベースをキューとして使用）"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--processes", type=int, default=min(4, os.cpu_count() or 1), help="同時に生成するプロセス数")
+        parser.add_argument("--poll", type=float, default=1.0, help="ジョブが無いときの確認間隔（秒）")
+        parser.add_argument("--once", action="store_true", help="待機中のジョブを処理し終えたら終了する")
+
+    def handle(self, *args, **opts):
+        processes = max(1, opts["processes"])
+        worker = pdf.worker_name()
+        self.stdout.write(f"pdf_worker {worker} processes={processes}")
+
+        # fork 前に親の接続を閉じておく
+        connections.close_all()
+        running = {}  # future → (ジョブID, 種別)
+        last_maintenance = last_heartbeat = 0.0
+        with ProcessPoolExecutor(max_workers=processes, initializer=_init_child) as pool:
+            try:
+                while True:
+                    if time.monotonic() - last_maintenance > 60:
+                        recovered = pdf.recover_stale_jobs()
+                        purged = pdf.purge_expired_jobs()
+                        if recovered or purged:
+                            self.stdout.write(f"再実行 {recovered} 件 / 期限切れ削除 {purged} 件")
+                        last_maintenance = time.monotonic()
+
+                    # 一括出力の実行中は、それだけでワーカーを使い切っている
+                    batch_running = any(kind == PdfJob.KIND_BATCH for _, kind in running.values())
+                    free = 0 if batch_running else processes - len(running)
+                    if free > 0:
+                        for job_id, kind in pdf.claim_jobs(free, worker, busy=bool(running)):
+                            running[pool.submit(pdf.run_job, job_id)] = (job_id, kind)
+
+                    # 描画に時間がかかっていても、このワーカーが生きている限り止まったジョブとみなされないように
+                    if running and time.monotonic() - last_heartbeat > pdf.JOB_HEARTBEAT_INTERVAL.total_seconds():
+                        pdf.heartbeat(job_id for job_id, _ in running.values())
+                        last_heartbeat = time.monotonic()
+
+                    if not running:
+                        if opts["once"]:
+                            break
+                        time.sleep(opts["poll"])
+                        continue
+
+                    done, _ = wait(running, timeout=opts["poll"], return_when=FIRST_COMPLETED)
+                    for future in done:
+                        job_id, _ = running.pop(future)
+                        try:
+                            status = future.result()
+                        except Exception as e:  # noqa: BLE001 — 子プロセスの異常終了など
+                            status = f"error ({type(e).__name__}: {e})"
+                        self.stdout.write(f"job {job_id}: {status}")
+            except KeyboardInterrupt:
+                self.stdout.write("停止します（生成中のジョブの完了を待ちます）")
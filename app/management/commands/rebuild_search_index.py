@@ -0,0 +1,46 @@
+# app/management/commands/rebuild_search_index.py
+"""
+全文検索の索引（SearchPosting）を作り直す
+
+    python manage.py rebuild_search_index            # 全社
+    python manage.py rebuild_search_index --company 3
+
+索引は保存/削除のシグナルで文書ごとに更新されるので、普段は不要。
+導入直後の既存データの投入と、シグナルを通らない更新（QuerySet.update など）で
+ずれたときの修復に使う。会社ごとに 1 トランザクションで入れ替える。
+"""
+
+from __future__ import annotations
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from app.models import Company
+from app import search
+
+
+class Command(BaseCommand):
+    help = "全文検索の索引を作り直します（既存データの投入・ずれの修復）"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--company", type=int, action="append", help="対象の会社ID（複数指定可）")
+
+    def handle(self, *args, **opts):
+        companies = Company.objects.order_by("id")
+        if opts["company"]:
+            companies = companies.filter(pk__in=opts["company"])
+        started = time.monotonic()
+        total = n_companies = 0
+        for company_id in companies.values_list("id", flat=True).iterator():
+            with transaction.atomic():
+                n = search.rebuild(company_id)
+            self.stdout.write(f"会社 {company_id}: {n} 行")
+            total += n
+            n_companies += 1
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{n_companies} 社の索引を作り直しました（{total} 行、{time.monotonic() - started:.1f} 秒）"
+            )
+        )
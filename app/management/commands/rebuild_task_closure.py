@@ -0,0 +1,30 @@
+# app/management/commands/rebuild_task_closure.py
+"""
+タスク依存の閉包テーブルを依存関係から作り直す（ずれの修復用）
+
+    python manage.py rebuild_task_closure            # 全案件
+    python manage.py rebuild_task_closure --project 12
+"""
+
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+
+from app.models import Project
+from app import task_closure
+
+
+class Command(BaseCommand):
+    help = "タスク依存の閉包テーブル（TaskClosure）を作り直します"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--project", type=int, action="append", help="対象の案件ID（複数指定可）")
+
+    def handle(self, *args, **opts):
+        projects = Project.objects.order_by("id")
+        if opts["project"]:
+            projects = projects.filter(pk__in=opts["project"])
+        total = 0
+        for project_id in projects.values_list("id", flat=True).iterator():
+            total += task_closure.rebuild_project(project_id)
+        self.stdout.write(self.style.SUCCESS(f"{total} 行を作成しました"))
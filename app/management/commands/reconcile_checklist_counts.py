@@ -0,0 +1,61 @@
+# app/management/commands/reconcile_checklist_counts.py
+"""
+チェックリストの項目数・完了数（Checklist.items_total / items_done）を検証して直す
+
+    python manage.py reconcile_checklist_counts              # 全チェックリスト
+    python manage.py reconcile_checklist_counts --project 12
+    python manage.py reconcile_checklist_counts --dry-run    # ずれを表示するだけ
+
+数は項目の追加・切り替え・削除のたびに F 式で足し引きしているので、普段は不要。
+シグナルを通らない更新（QuerySet.update など）や、手作業でのデータ修正でずれたときに直す。
+チェックリスト BATCH_SIZE 件ずつ、グループ化した集計クエリ 1 回で数え直す。
+"""
+
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Q
+
+from app.models import Checklist
+
+
+BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = "チェックリストの項目数・完了数を数え直し、ずれていれば直します"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--project", type=int, action="append", help="対象の案件ID（複数指定可）")
+        parser.add_argument("--dry-run", action="store_true", help="ずれを表示するだけで保存しない")
+
+    def handle(self, *args, **opts):
+        checklists = Checklist.objects.order_by("id")
+        if opts["project"]:
+            checklists = checklists.filter(project_id__in=opts["project"])
+        total = drifted = 0
+        last_id = 0
+        while True:
+            rows = list(
+                checklists.filter(id__gt=last_id)
+                .annotate(n_items=Count("items"), n_done=Count("items", filter=Q(items__is_done=True)))
+                .values_list("id", "items_total", "items_done", "n_items", "n_done")[:BATCH_SIZE]
+            )
+            if not rows:
+                break
+            fixes = []
+            for pk, items_total, items_done, n_items, n_done in rows:
+                if (items_total, items_done) != (n_items, n_done):
+                    self.stdout.write(
+                        f"チェックリスト {pk}: {items_done}/{items_total} → {n_done}/{n_items}"
+                    )
+                    fixes.append(Checklist(pk=pk, items_total=n_items, items_done=n_done))
+            if fixes and not opts["dry_run"]:
+                with transaction.atomic():
+                    Checklist.objects.bulk_update(fixes, ["items_total", "items_done"])
+            total += len(rows)
+            drifted += len(fixes)
+            last_id = rows[-1][0]
+        action = "見つけました" if opts["dry_run"] else "修正しました"
+        self.stdout.write(self.style.SUCCESS(f"{total} 件のチェックリストを検証し、ずれを {drifted} 件{action}"))
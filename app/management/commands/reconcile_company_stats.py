@@ -0,0 +1,45 @@
+# app/management/commands/reconcile_company_stats.py
+"""
+ダッシュボード用の会社ごとの集計（CompanyStats）を数え直す
+
+    python manage.py reconcile_company_stats            # 全社
+    python manage.py reconcile_company_stats --company 3
+
+期限切れ・期限が 7 日以内の件数は日付が変わると動くので、毎日 0 時過ぎに cron で実行する。
+シグナルを通らない更新などで差分がずれた行もここで直る。
+"""
+
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from app.models import Company, CompanyStats
+from app import company_stats
+
+
+COUNTER_FIELDS = ("in_progress_projects", "open_tasks", "due_soon_tasks", "overdue_tasks")
+
+
+class Command(BaseCommand):
+    help = "ダッシュボード用の会社ごとの集計を数え直します（日付による期限の区分とずれの修復）"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--company", type=int, action="append", help="対象の会社ID（複数指定可）")
+
+    def handle(self, *args, **opts):
+        companies = Company.objects.order_by("id")
+        if opts["company"]:
+            companies = companies.filter(pk__in=opts["company"])
+        today = timezone.localdate()
+        current = {s.company_id: s for s in CompanyStats.objects.filter(company__in=companies)}
+        total = drifted = 0
+        for company_id in companies.values_list("id", flat=True).iterator():
+            stats = company_stats.refresh(company_id, today)
+            old = current.get(company_id)
+            # 同じ日付の集計が数え直しと違っていたら、差分の反映がずれていた
+            if old and old.as_of == today and any(getattr(old, f) != getattr(stats, f) for f in COUNTER_FIELDS):
+                drifted += 1
+                self.stdout.write(f"会社 {company_id}: ずれを修正しました")
+            total += 1
+        self.stdout.write(self.style.SUCCESS(f"{total} 社を数え直しました（ずれ {drifted} 社）"))
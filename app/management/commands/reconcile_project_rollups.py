@@ -0,0 +1,54 @@
+# app/management/commands/reconcile_project_rollups.py
+"""
+案件一覧用の案件ごとの集計（タスク数・進捗・チェック項目の完了数・最終更新日時）を数え直す
+
+    python manage.py reconcile_project_rollups            # 全案件
+    python manage.py reconcile_project_rollups --company 3
+
+集計はタスク・チェック項目の保存/削除で差分を足し引きしているので、普段は不要。
+シグナルを通らない更新（QuerySet.update など）や、手作業でのデータ修正でずれたときに直す。
+案件 BATCH_SIZE 件ずつ、グループ化した集計クエリでまとめて数え直す。
+"""
+
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from app.models import Project
+from app import project_rollup
+
+
+BATCH_SIZE = 500
+COUNTER_FIELDS = project_rollup.ROLLUP_FIELDS[:-1]  # 最終更新日時はずれとして数えない
+
+
+class Command(BaseCommand):
+    help = "案件一覧用の案件ごとの集計を数え直します（ずれの修復）"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--company", type=int, action="append", help="対象の会社ID（複数指定可）")
+
+    def handle(self, *args, **opts):
+        projects = Project.objects.order_by("id")
+        if opts["company"]:
+            projects = projects.filter(company_id__in=opts["company"])
+        total = drifted = 0
+        last_id = 0
+        while True:
+            current = {
+                row[0]: row[1:]
+                for row in projects.filter(id__gt=last_id).values_list("id", *COUNTER_FIELDS)[:BATCH_SIZE]
+            }
+            if not current:
+                break
+            with transaction.atomic():
+                rows = project_rollup.compute(current)
+                project_rollup.refresh_rows(rows)
+            for pk, values in rows.items():
+                if current[pk] != tuple(values[f] for f in COUNTER_FIELDS):
+                    drifted += 1
+                    self.stdout.write(f"案件 {pk}: ずれを修正しました")
+            total += len(current)
+            last_id = max(current)
+        self.stdout.write(self.style.SUCCESS(f"{total} 件の案件を数え直しました（ずれ {drifted} 件）"))
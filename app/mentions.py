@@ -0,0 +1,96 @@
+# app/mentions.py
+"""
+共有メモのメンション（@ユーザー名）と受信箱
+
+- メモの本文に書かれた @ユーザー名（同じ会社の利用者）を Memo.mentions に登録する
+- 受信箱は中間テーブル MemoMention を (宛先, メモID 降順) の索引で読み、メモ ID のカーソルで次ページへ進む
+- 未読数は MentionCounter に持ち、メンションの追加・既読・削除のたびに足し引きする
+  （画面のバッジは 1 行読むだけ。ずれたときは recount で数え直す）
+"""
+
+from __future__ import annotations
+
+import re
+
+from django.contrib.auth import get_user_model
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Memo, MemoMention, MentionCounter
+
+
+INBOX_PAGE_SIZE = 30
+
+# Django のユーザー名に使える文字（@ は区切りとして扱う）
+MENTION_PATTERN = re.compile(r"@([\w.+-]+)")
+
+
+# ------------------------------------------------------------
+# メンションの登録
+# ------------------------------------------------------------
+def mentioned_usernames(content: str) -> set[str]:
+    return set(MENTION_PATTERN.findall(content or ""))
+
+
+def sync_mentions(memo: Memo) -> None:
+    """本文の @ユーザー名 に合わせて memo.mentions を更新する（書いた本人と他社の利用者は除く）"""
+    names = mentioned_usernames(memo.content)
+    users = []
+    if names:
+        users = get_user_model().objects.filter(company_id=memo.project.company_id, username__in=names)
+        users = list(users.exclude(pk=memo.author_id))
+    memo.mentions.set(users)
+
+
+# ------------------------------------------------------------
+# 未読数（signals から呼ぶ）
+# ------------------------------------------------------------
+def add_unread(user_id: int, n: int) -> None:
+    if not n:
+        return
+    updated = MentionCounter.objects.filter(user_id=user_id).update(unread=F("unread") + n)
+    if not updated:
+        recount(user_id)
+
+
+def recount(user_id: int) -> int:
+    """未読数を数え直して保存する"""
+    unread = MemoMention.objects.filter(user_id=user_id, read_at__isnull=True).count()
+    MentionCounter.objects.update_or_create(user_id=user_id, defaults={"unread": unread})
+    return unread
+
+
+def unread_count(user) -> int:
+    """画面のバッジ用（1 行読むだけ）"""
+    if not user.is_authenticated:
+        return 0
+    return MentionCounter.objects.filter(user_id=user.pk).values_list("unread", flat=True).first() or 0
+
+
+# ------------------------------------------------------------
+# 受信箱
+# ------------------------------------------------------------
+def inbox_page(user, before: int | None = None, *, unread_only: bool = False,
+               limit: int = INBOX_PAGE_SIZE) -> tuple[list[MemoMention], int | None]:
+    """
+    自分宛てのメンションを新しいメモ順に limit 件と、次ページのカーソル（最後のメモ ID）。
+    索引 memomention_inbox_idx (宛先, メモID 降順) を順に読む。
+    """
+    qs = MemoMention.objects.filter(user=user)
+    if unread_only:
+        qs = qs.filter(read_at__isnull=True)
+    if before is not None:
+        qs = qs.filter(memo_id__lt=before)
+    rows = list(qs.select_related("memo__project", "memo__author").order_by("-memo_id")[: limit + 1])
+    next_cursor = rows[limit - 1].memo_id if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+
+def mark_read(user, memo_ids=None) -> int:
+    """自分宛てのメンションを既読にする（memo_ids を省略するとすべて）。既読にした件数を返す"""
+    qs = MemoMention.objects.filter(user=user, read_at__isnull=True)
+    if memo_ids is not None:
+        qs = qs.filter(memo_id__in=memo_ids)
+    n = qs.update(read_at=timezone.now())
+    add_unread(user.pk, -n)
+    return n
@@ -0,0 +1,62 @@
+# Generated by Django 4.2.16 on 2026-10-16 23:37
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0006_alter_checklist_options_alter_checklistitem_options_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task_id', models.BigIntegerField(verbose_name='タスクID')),
+                ('version', models.PositiveBigIntegerField(verbose_name='版数')),
+                ('deleted_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='削除日時')),
+            ],
+            options={
+                'verbose_name': '削除済みタスク',
+                'verbose_name_plural': '削除済みタスク',
+                'ordering': ('version', 'id'),
+            },
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='task_version',
+            field=models.PositiveBigIntegerField(default=0, editable=False, verbose_name='工程データ版数'),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='tasks_modified_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='工程データ更新日時'),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='更新日時'),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='version',
+            field=models.PositiveBigIntegerField(default=0, editable=False, verbose_name='版数'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['project', 'version'], name='task_project_version_idx'),
+        ),
+        migrations.AddField(
+            model_name='tasktombstone',
+            name='project',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='task_tombstones', to='app.project', verbose_name='案件'),
+        ),
+        migrations.AddIndex(
+            model_name='tasktombstone',
+            index=models.Index(fields=['project', 'version'], name='tombstone_project_version_idx'),
+        ),
+    ]
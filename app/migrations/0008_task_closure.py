@@ -0,0 +1,63 @@
+# Generated by Django 4.2.16 on 2026-10-16 23:41
+
+from django.db import migrations, models
+import django.db.models.deletion
+from collections import defaultdict, deque
+
+
+def build_closure(apps, schema_editor):
+    """既存の依存関係から閉包テーブルを初期投入する"""
+    Task = apps.get_model("app", "Task")
+    TaskClosure = apps.get_model("app", "TaskClosure")
+    through = Task.dependencies.through
+
+    project_of = dict(Task.objects.values_list("id", "project_id"))
+    succs = defaultdict(list)
+    for succ, pred in through.objects.values_list("from_task_id", "to_task_id"):
+        if project_of.get(succ) == project_of.get(pred):
+            succs[pred].append(succ)
+
+    rows = []
+    for start in list(succs):
+        depths = {}
+        queue = deque((s, 1) for s in succs[start])
+        while queue:
+            cur, depth = queue.popleft()
+            if cur in depths:
+                continue
+            depths[cur] = depth
+            queue.extend((s, depth + 1) for s in succs.get(cur, ()))
+        for d, depth in depths.items():
+            if d != start:
+                rows.append(TaskClosure(project_id=project_of[start], ancestor_id=start, descendant_id=d, depth=depth))
+    TaskClosure.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0007_task_change_feed'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskClosure',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('depth', models.PositiveIntegerField(verbose_name='段数')),
+                ('ancestor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='closure_descendants', to='app.task', verbose_name='上流タスク')),
+                ('descendant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='closure_ancestors', to='app.task', verbose_name='下流タスク')),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='task_closures', to='app.project', verbose_name='案件')),
+            ],
+            options={
+                'verbose_name': 'タスク依存閉包',
+                'verbose_name_plural': 'タスク依存閉包',
+                'indexes': [models.Index(fields=['descendant', 'ancestor'], name='task_closure_desc_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='taskclosure',
+            constraint=models.UniqueConstraint(fields=('ancestor', 'descendant'), name='task_closure_unique_pair'),
+        ),
+        migrations.RunPython(build_closure, migrations.RunPython.noop),
+    ]
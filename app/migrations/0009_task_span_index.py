@@ -0,0 +1,17 @@
+# Generated by Django 4.2.16 on 2026-10-16 23:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0008_task_closure'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['project', 'start_date', 'end_date', 'id'], name='task_project_span_idx'),
+        ),
+    ]
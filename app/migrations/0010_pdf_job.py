@@ -0,0 +1,43 @@
+# Generated by Django 4.2.16 on 2026-10-16 23:52
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0009_task_span_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PdfJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('project', '案件サマリー'), ('gantt', '工程表')], max_length=20, verbose_name='種別')),
+                ('params', models.JSONField(blank=True, default=dict, verbose_name='条件')),
+                ('base_url', models.CharField(blank=True, default='', max_length=500, verbose_name='基準URL')),
+                ('status', models.CharField(choices=[('queued', '待機中'), ('running', '生成中'), ('done', '完了'), ('failed', '失敗')], default='queued', max_length=20, verbose_name='状態')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='再実行回数')),
+                ('worker', models.CharField(blank=True, default='', max_length=100, verbose_name='処理ワーカー')),
+                ('error', models.TextField(blank=True, default='', verbose_name='エラー')),
+                ('file', models.FileField(blank=True, upload_to='pdf_jobs/%Y/%m/', verbose_name='PDF')),
+                ('filename', models.CharField(blank=True, default='', max_length=300, verbose_name='ファイル名')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='登録日時')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='開始日時')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='終了日時')),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pdf_jobs', to='app.company', verbose_name='会社')),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pdf_jobs', to='app.project', verbose_name='案件')),
+                ('requested_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='pdf_jobs', to=settings.AUTH_USER_MODEL, verbose_name='依頼者')),
+            ],
+            options={
+                'verbose_name': 'PDF生成ジョブ',
+                'verbose_name_plural': 'PDF生成ジョブ',
+                'ordering': ('-id',),
+                'indexes': [models.Index(fields=['status', 'id'], name='pdfjob_status_idx')],
+            },
+        ),
+    ]
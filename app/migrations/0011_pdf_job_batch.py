@@ -0,0 +1,34 @@
+# Generated by Django 4.2.16 on 2026-10-16 23:56
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0010_pdf_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pdfjob',
+            name='progress_done',
+            field=models.PositiveIntegerField(default=0, verbose_name='処理済み件数'),
+        ),
+        migrations.AddField(
+            model_name='pdfjob',
+            name='progress_total',
+            field=models.PositiveIntegerField(default=0, verbose_name='全件数'),
+        ),
+        migrations.AlterField(
+            model_name='pdfjob',
+            name='kind',
+            field=models.CharField(choices=[('project', '案件サマリー'), ('gantt', '工程表'), ('batch', '案件サマリー一括（ZIP）')], max_length=20, verbose_name='種別'),
+        ),
+        migrations.AlterField(
+            model_name='pdfjob',
+            name='project',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='pdf_jobs', to='app.project', verbose_name='案件'),
+        ),
+    ]
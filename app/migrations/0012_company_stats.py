@@ -0,0 +1,30 @@
+# Generated by Django 4.2.16 on 2026-10-17 00:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0011_pdf_job_batch'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CompanyStats',
+            fields=[
+                ('company', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='app.company', verbose_name='会社')),
+                ('in_progress_projects', models.IntegerField(default=0, verbose_name='進行中の案件数')),
+                ('open_tasks', models.IntegerField(default=0, verbose_name='未完了タスク数')),
+                ('due_soon_tasks', models.IntegerField(default=0, verbose_name='期限が7日以内のタスク数')),
+                ('overdue_tasks', models.IntegerField(default=0, verbose_name='期限切れタスク数')),
+                ('as_of', models.DateField(blank=True, null=True, verbose_name='集計日')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新日時')),
+            ],
+            options={
+                'verbose_name': '会社の集計',
+                'verbose_name_plural': '会社の集計',
+            },
+        ),
+    ]
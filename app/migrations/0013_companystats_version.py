@@ -0,0 +1,18 @@
+# Generated by Django 4.2.16 on 2026-10-17 00:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0012_company_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='companystats',
+            name='version',
+            field=models.PositiveBigIntegerField(default=0, editable=False, verbose_name='版数'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.16 on 2026-10-17 00:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0013_companystats_version'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('progress__lt', 100)), fields=['end_date', 'id'], name='task_open_due_idx'),
+        ),
+    ]
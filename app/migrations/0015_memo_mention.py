@@ -0,0 +1,74 @@
+# Generated by Django 4.2.16 on 2026-10-17 00:04
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def count_unread(apps, schema_editor):
+    # 既存のメンションはこれまで画面に出ていなかったので、すべて未読として数える
+    MemoMention = apps.get_model("app", "MemoMention")
+    MentionCounter = apps.get_model("app", "MentionCounter")
+    counts = (
+        MemoMention.objects.filter(read_at__isnull=True)
+        .values("user_id")
+        .annotate(n=models.Count("id"))
+        .values_list("user_id", "n")
+    )
+    MentionCounter.objects.bulk_create(MentionCounter(user_id=user_id, unread=n) for user_id, n in counts)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0014_task_open_due_idx'),
+    ]
+
+    operations = [
+        # 自動生成の中間テーブル app_memo_mentions を、そのまま明示的なモデルとして扱う（DB は変更しない）
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='MemoMention',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('memo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='mention_links', to='app.memo', verbose_name='メモ')),
+                        ('user', models.ForeignKey(db_column='customuser_id', on_delete=django.db.models.deletion.CASCADE, related_name='memo_mentions', to=settings.AUTH_USER_MODEL, verbose_name='宛先')),
+                    ],
+                    options={
+                        'verbose_name': 'メンション',
+                        'verbose_name_plural': 'メンション',
+                        'db_table': 'app_memo_mentions',
+                        'unique_together': {('memo', 'user')},
+                    },
+                ),
+                migrations.AlterField(
+                    model_name='memo',
+                    name='mentions',
+                    field=models.ManyToManyField(blank=True, related_name='mentioned_in', through='app.MemoMention', to=settings.AUTH_USER_MODEL, verbose_name='メンション'),
+                ),
+            ],
+            database_operations=[],
+        ),
+        migrations.AddField(
+            model_name='memomention',
+            name='read_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='既読日時'),
+        ),
+        migrations.AddIndex(
+            model_name='memomention',
+            index=models.Index(fields=['user', '-memo'], name='memomention_inbox_idx'),
+        ),
+        migrations.CreateModel(
+            name='MentionCounter',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='mention_counter', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='利用者')),
+                ('unread', models.IntegerField(default=0, verbose_name='未読数')),
+            ],
+            options={
+                'verbose_name': '未読メンション数',
+                'verbose_name_plural': '未読メンション数',
+            },
+        ),
+        migrations.RunPython(count_unread, migrations.RunPython.noop),
+    ]
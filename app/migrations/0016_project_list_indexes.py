@@ -0,0 +1,21 @@
+# Generated by Django 4.2.16 on 2026-10-17 00:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0015_memo_mention'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['company', 'status', 'id'], name='project_company_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['company', 'end_date'], name='project_company_end_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.16 on 2026-10-17 00:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0016_project_list_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchPosting',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('project', '案件'), ('task', 'タスク'), ('memo', '共有メモ'), ('checklist_item', 'チェック項目')], max_length=20, verbose_name='種類')),
+                ('object_id', models.PositiveBigIntegerField(verbose_name='文書ID')),
+                ('term', models.CharField(max_length=64, verbose_name='語')),
+                ('weight', models.PositiveIntegerField(default=1, verbose_name='重み')),
+                ('company', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='app.company', verbose_name='会社')),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='app.project', verbose_name='案件')),
+            ],
+            options={
+                'verbose_name': '検索索引',
+                'verbose_name_plural': '検索索引',
+                'indexes': [models.Index(fields=['company', 'term', 'kind', 'object_id'], name='searchposting_term_idx'), models.Index(fields=['kind', 'object_id'], name='searchposting_doc_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 4.2.16 on 2026-10-17 00:12
+
+from collections import defaultdict
+
+from django.db import migrations, models
+
+
+def fill_rollups(apps, schema_editor):
+    # 既存の案件の集計を入れる（app.project_rollup.compute と同じ数え方。最終更新日時は次の reconcile で入る）
+    Project = apps.get_model("app", "Project")
+    Task = apps.get_model("app", "Task")
+    ChecklistItem = apps.get_model("app", "ChecklistItem")
+    rows = defaultdict(lambda: defaultdict(int))
+    for project_id, start, end, progress in Task.objects.values_list("project_id", "start_date", "end_date", "progress").iterator():
+        days = (end - start).days + 1 if start and end and end >= start else 1
+        rows[project_id]["task_count"] += 1
+        rows[project_id]["task_days_total"] += days
+        rows[project_id]["task_progress_total"] += days * (progress or 0)
+    items = (
+        ChecklistItem.objects.values_list("checklist__project_id")
+        .annotate(total=models.Count("id"), done=models.Count("id", filter=models.Q(is_done=True)))
+        .order_by()
+    )
+    for project_id, total, done in items:
+        rows[project_id].update(checklist_items_total=total, checklist_items_done=done)
+    for project_id, values in rows.items():
+        Project.objects.filter(pk=project_id).update(**values)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0017_search_posting'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='checklist_items_done',
+            field=models.IntegerField(default=0, editable=False, verbose_name='完了チェック項目数'),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='checklist_items_total',
+            field=models.IntegerField(default=0, editable=False, verbose_name='チェック項目数'),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='last_activity_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='最終更新日時'),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='task_count',
+            field=models.IntegerField(default=0, editable=False, verbose_name='タスク数'),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='task_days_total',
+            field=models.IntegerField(default=0, editable=False, verbose_name='工期日数の合計'),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='task_progress_total',
+            field=models.BigIntegerField(default=0, editable=False, verbose_name='進捗×工期日数の合計'),
+        ),
+        migrations.RunPython(fill_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.16 on 2026-10-17 00:15
+
+from django.db import migrations, models
+
+
+def count_items(apps, schema_editor):
+    Checklist = apps.get_model("app", "Checklist")
+    counts = (
+        Checklist.objects.annotate(
+            n_items=models.Count("items"), n_done=models.Count("items", filter=models.Q(items__is_done=True))
+        )
+        .filter(n_items__gt=0)
+        .values_list("id", "n_items", "n_done")
+    )
+    Checklist.objects.bulk_update(
+        [Checklist(pk=pk, items_total=total, items_done=done) for pk, total, done in counts],
+        ["items_total", "items_done"],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0018_project_rollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='checklist',
+            name='items_done',
+            field=models.IntegerField(default=0, editable=False, verbose_name='完了項目数'),
+        ),
+        migrations.AddField(
+            model_name='checklist',
+            name='items_total',
+            field=models.IntegerField(default=0, editable=False, verbose_name='項目数'),
+        ),
+        migrations.RunPython(count_items, migrations.RunPython.noop),
+    ]
@@ -7,6 +7,31 @@ from django.db import models
 from django.utils import timezone
 
 
+# =========================================
+# 共通: 集計列を通常の保存で上書きしない
+# =========================================
+class MaintainedFieldsMixin:
+    """
+    F 式の足し引きで保守している列（MAINTAINED_FIELDS）を、既存行の save() では書かない。
+    編集画面などで読み込んだ時点の値をそのまま書き戻すと、その間に足された差分が消えるため。
+    update_fields を指定した保存と新規作成はそのまま通す。
+    """
+    MAINTAINED_FIELDS: tuple[str, ...] = ()
+
+    def save(self, *args, **kwargs):
+        if (
+            kwargs.get("update_fields") is None
+            and not kwargs.get("force_insert")
+            and not self._state.adding
+            and self.pk is not None
+        ):
+            kwargs["update_fields"] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name not in self.MAINTAINED_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
+
 # =========================================
 # 会社
 # =========================================
@@ -84,7 +109,7 @@ class Invitation(models.Model):
 # =========================================
 # 案件（Project）
 # =========================================
-class Project(models.Model):
+class Project(MaintainedFieldsMixin, models.Model):
     company = models.ForeignKey(Company, verbose_name="会社", on_delete=models.CASCADE, related_name="projects")
     
     # ★★★★★ ここに customer フィールドを追加 ★★★★★
@@ -104,14 +129,58 @@ class Project(models.Model):
     description = models.TextField("説明", blank=True, default="")
     created_at = models.DateTimeField("作成日時", auto_now_add=True)
 
+    # ガント用タスクデータの版数（タスク・依存関係が変わるたびに +1。ETag / 差分取得に使う）
+    task_version = models.PositiveBigIntegerField("工程データ版数", default=0, editable=False)
+    tasks_modified_at = models.DateTimeField("工程データ更新日時", null=True, blank=True, editable=False)
+
+    # 案件一覧用の集計（タスク・チェック項目の保存/削除で差分を足し引きする。app.project_rollup を参照）
+    # 差分の足し引きで一時的に負になっても保存が失敗しないよう、符号付きにしている
+    task_count = models.IntegerField("タスク数", default=0, editable=False)
+    task_days_total = models.IntegerField("工期日数の合計", default=0, editable=False)
+    task_progress_total = models.BigIntegerField("進捗×工期日数の合計", default=0, editable=False)
+    checklist_items_total = models.IntegerField("チェック項目数", default=0, editable=False)
+    checklist_items_done = models.IntegerField("完了チェック項目数", default=0, editable=False)
+    last_activity_at = models.DateTimeField("最終更新日時", null=True, blank=True, editable=False)
+
+    MAINTAINED_FIELDS = (
+        "task_version",
+        "tasks_modified_at",
+        "task_count",
+        "task_days_total",
+        "task_progress_total",
+        "checklist_items_total",
+        "checklist_items_done",
+        "last_activity_at",
+    )
+
     class Meta:
         ordering = ("-id",)
         verbose_name = "案件"
         verbose_name_plural = "案件"
+        indexes = [
+            # 案件一覧（会社 + ステータスで絞り込み、ID 順のキーセット）
+            models.Index(fields=["company", "status", "id"], name="project_company_status_idx"),
+            # 案件一覧（終了予定日の範囲・並び替え）
+            models.Index(fields=["company", "end_date"], name="project_company_end_idx"),
+        ]
 
     def __str__(self) -> str:
         return self.name
 
+    @property
+    def task_progress(self) -> int | None:
+        """工期で重み付けしたタスクの平均進捗（%。タスクがなければ None）"""
+        if self.task_count <= 0 or self.task_days_total <= 0:
+            return None
+        return round(self.task_progress_total / self.task_days_total)
+
+    @property
+    def checklist_rate(self) -> int | None:
+        """チェック項目の完了率（%。項目がなければ None）"""
+        if self.checklist_items_total <= 0:
+            return None
+        return round(100 * self.checklist_items_done / self.checklist_items_total)
+
 
 # =========================================
 # タスク（ガント用）
@@ -133,16 +202,71 @@ class Task(models.Model):
 
     # 既存行に入るよう default を付与
     created_at = models.DateTimeField("作成日時", default=timezone.now, editable=False)
+    updated_at = models.DateTimeField("更新日時", auto_now=True)
+
+    # 最後に変更されたときの Project.task_version（差分取得 ?since= 用）
+    version = models.PositiveBigIntegerField("版数", default=0, editable=False)
 
     class Meta:
         ordering = ("start_date", "end_date", "id")
         verbose_name = "タスク"
         verbose_name_plural = "タスク"
+        indexes = [
+            models.Index(fields=["project", "version"], name="task_project_version_idx"),
+            # 期間窓 (from/to) とキーセットページング (開始日, 終了日, ID) 用
+            models.Index(fields=["project", "start_date", "end_date", "id"], name="task_project_span_idx"),
+            # 期限が近い未完了タスク（ダッシュボード / 期限一覧の (終了日, ID) キーセット）。完了済みは索引に入れない
+            models.Index(fields=["end_date", "id"], condition=models.Q(progress__lt=100), name="task_open_due_idx"),
+        ]
 
     def __str__(self) -> str:
         return f"{self.project.name} / {self.name}"
 
 
+class TaskTombstone(models.Model):
+    """削除されたタスクの墓標（差分取得で「消えた」ことをクライアントに伝えるため）"""
+    project = models.ForeignKey(Project, verbose_name="案件", on_delete=models.CASCADE, related_name="task_tombstones")
+    task_id = models.BigIntegerField("タスクID")
+    version = models.PositiveBigIntegerField("版数")
+    deleted_at = models.DateTimeField("削除日時", default=timezone.now)
+
+    class Meta:
+        ordering = ("version", "id")
+        verbose_name = "削除済みタスク"
+        verbose_name_plural = "削除済みタスク"
+        indexes = [
+            models.Index(fields=["project", "version"], name="tombstone_project_version_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"Tombstone(task={self.task_id}, v{self.version})"
+
+
+class TaskClosure(models.Model):
+    """
+    タスク依存の推移閉包（先行側 ancestor から後続側 descendant へ depth 段でつながる）
+    「このタスクの下流すべて」「A から B に到達できるか」を 1 回の索引検索で引くための表。
+    depth は最短の段数。自分自身への行は持たない。
+    """
+    project = models.ForeignKey(Project, verbose_name="案件", on_delete=models.CASCADE, related_name="task_closures")
+    ancestor = models.ForeignKey(Task, verbose_name="上流タスク", on_delete=models.CASCADE, related_name="closure_descendants")
+    descendant = models.ForeignKey(Task, verbose_name="下流タスク", on_delete=models.CASCADE, related_name="closure_ancestors")
+    depth = models.PositiveIntegerField("段数")
+
+    class Meta:
+        verbose_name = "タスク依存閉包"
+        verbose_name_plural = "タスク依存閉包"
+        constraints = [
+            models.UniqueConstraint(fields=["ancestor", "descendant"], name="task_closure_unique_pair"),
+        ]
+        indexes = [
+            models.Index(fields=["descendant", "ancestor"], name="task_closure_desc_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.ancestor_id} -> {self.descendant_id} ({self.depth})"
+
+
 # =========================================
 # 共有メモ
 # =========================================
@@ -162,6 +286,7 @@ class Memo(models.Model):
         verbose_name="メンション",
         blank=True,
         related_name="mentioned_in",
+        through="MemoMention",  # 既読管理のため中間テーブルを明示（テーブルは自動生成時のまま）
     )
 
     created_at = models.DateTimeField("作成日時", auto_now_add=True)
@@ -176,15 +301,69 @@ class Memo(models.Model):
         return f"Memo({self.project.name})"
 
 
+class MemoMention(models.Model):
+    """
+    メモのメンション（Memo.mentions の中間テーブル）。
+    自動生成されていた app_memo_mentions をそのまま使い、既読日時を足している。
+    """
+    memo = models.ForeignKey(Memo, verbose_name="メモ", on_delete=models.CASCADE, related_name="mention_links")
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        verbose_name="宛先",
+        on_delete=models.CASCADE,
+        db_column="customuser_id",
+        related_name="memo_mentions",
+    )
+    read_at = models.DateTimeField("既読日時", null=True, blank=True)
+
+    class Meta:
+        db_table = "app_memo_mentions"
+        unique_together = (("memo", "user"),)
+        verbose_name = "メンション"
+        verbose_name_plural = "メンション"
+        indexes = [
+            # 受信箱（自分宛てを新しいメモ順にキーセットページング）用
+            models.Index(fields=["user", "-memo"], name="memomention_inbox_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"MemoMention({self.memo_id} → {self.user_id})"
+
+
+class MentionCounter(models.Model):
+    """利用者ごとの未読メンション数（app.mentions が書き込み時に足し引きする。画面のバッジ用）"""
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        verbose_name="利用者",
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="mention_counter",
+    )
+    unread = models.IntegerField("未読数", default=0)
+
+    class Meta:
+        verbose_name = "未読メンション数"
+        verbose_name_plural = "未読メンション数"
+
+    def __str__(self) -> str:
+        return f"MentionCounter({self.user_id}, {self.unread})"
+
+
 # =========================================
 # チェックリスト
 # =========================================
-class Checklist(models.Model):
+class Checklist(MaintainedFieldsMixin, models.Model):
     project = models.ForeignKey(Project, verbose_name="案件", on_delete=models.CASCADE, related_name="checklists")
     # 既存行配慮のため空文字を許容
     title = models.CharField("タイトル", max_length=255, blank=True, default="")
     created_at = models.DateTimeField("作成日時", auto_now_add=True)
 
+    # 項目数・完了数（項目の追加・切り替え・削除で F 式で足し引きする。app.project_rollup を参照）
+    items_total = models.IntegerField("項目数", default=0, editable=False)
+    items_done = models.IntegerField("完了項目数", default=0, editable=False)
+
+    MAINTAINED_FIELDS = ("items_total", "items_done")
+
     class Meta:
         ordering = ("-id",)
         verbose_name = "チェックリスト"
@@ -193,6 +372,11 @@ class Checklist(models.Model):
     def __str__(self) -> str:
         return f"{self.project.name} / {self.title}"
 
+    @property
+    def done_rate(self) -> int:
+        """完了率（%。項目がなければ 0）"""
+        return round(self.items_done * 100 / self.items_total) if self.items_total > 0 else 0
+
 
 class ChecklistItem(models.Model):
     checklist = models.ForeignKey(Checklist, verbose_name="チェックリスト", on_delete=models.CASCADE, related_name="items")
@@ -207,4 +391,147 @@ class ChecklistItem(models.Model):
         verbose_name_plural = "チェック項目"
 
     def __str__(self) -> str:
-        return self.title
\ No newline at end of file
+        return self.title
+
+# =========================================
+# PDF 生成ジョブ（pdf_worker コマンドが処理する）
+# =========================================
+class PdfJob(models.Model):
+    KIND_PROJECT = "project"
+    KIND_GANTT = "gantt"
+    KIND_BATCH = "batch"
+    KIND_CHOICES = [
+        (KIND_PROJECT, "案件サマリー"),
+        (KIND_GANTT, "工程表"),
+        (KIND_BATCH, "案件サマリー一括（ZIP）"),
+    ]
+
+    STATUS_QUEUED = "queued"
+    STATUS_RUNNING = "running"
+    STATUS_DONE = "done"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, "待機中"),
+        (STATUS_RUNNING, "生成中"),
+        (STATUS_DONE, "完了"),
+        (STATUS_FAILED, "失敗"),
+    ]
+
+    company = models.ForeignKey(Company, verbose_name="会社", on_delete=models.CASCADE, related_name="pdf_jobs")
+    # 一括出力（KIND_BATCH）は会社単位なので案件なし
+    project = models.ForeignKey(
+        Project, verbose_name="案件", on_delete=models.CASCADE, null=True, blank=True, related_name="pdf_jobs"
+    )
+    requested_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        verbose_name="依頼者",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="pdf_jobs",
+    )
+    kind = models.CharField("種別", max_length=20, choices=KIND_CHOICES)
+    params = models.JSONField("条件", default=dict, blank=True)  # 例: {"view": "Week"} / {"status": "進行中"}
+    base_url = models.CharField("基準URL", max_length=500, blank=True, default="")
+
+    status = models.CharField("状態", max_length=20, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    attempts = models.PositiveSmallIntegerField("再実行回数", default=0)
+    worker = models.CharField("処理ワーカー", max_length=100, blank=True, default="")
+    error = models.TextField("エラー", blank=True, default="")
+    progress_done = models.PositiveIntegerField("処理済み件数", default=0)
+    progress_total = models.PositiveIntegerField("全件数", default=0)
+    file = models.FileField("PDF", upload_to="pdf_jobs/%Y/%m/", blank=True)
+    filename = models.CharField("ファイル名", max_length=300, blank=True, default="")
+
+    created_at = models.DateTimeField("登録日時", default=timezone.now)
+    started_at = models.DateTimeField("開始日時", null=True, blank=True)
+    # 実行中のジョブが生きていることを示す時刻（ワーカーと進捗の更新で進める。止まったジョブの判定に使う）
+    heartbeat_at = models.DateTimeField("最終応答日時", null=True, blank=True)
+    finished_at = models.DateTimeField("終了日時", null=True, blank=True)
+
+    class Meta:
+        ordering = ("-id",)
+        verbose_name = "PDF生成ジョブ"
+        verbose_name_plural = "PDF生成ジョブ"
+        indexes = [
+            # ワーカーの取り出し（status=queued を古い順）用
+            models.Index(fields=["status", "id"], name="pdfjob_status_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"PdfJob({self.pk}, {self.kind}, {self.status})"
+
+
+# =========================================
+# ダッシュボード用の会社ごとの集計（app.company_stats が保守する）
+# =========================================
+class CompanyStats(models.Model):
+    company = models.OneToOneField(
+        Company, verbose_name="会社", on_delete=models.CASCADE, primary_key=True, related_name="stats"
+    )
+    # 差分の足し引きで一時的に負になっても保存が失敗しないよう、符号付きにしている
+    in_progress_projects = models.IntegerField("進行中の案件数", default=0)
+    open_tasks = models.IntegerField("未完了タスク数", default=0)
+    due_soon_tasks = models.IntegerField("期限が7日以内のタスク数", default=0)
+    overdue_tasks = models.IntegerField("期限切れタスク数", default=0)
+    # 期限の集計の基準日（日付が変わったら数え直す）
+    as_of = models.DateField("集計日", null=True, blank=True)
+    # ダッシュボードのキャッシュの版数（案件・タスク・メモが変わるたびに +1。app.dashboard を参照）
+    version = models.PositiveBigIntegerField("版数", default=0, editable=False)
+    updated_at = models.DateTimeField("更新日時", auto_now=True)
+
+    class Meta:
+        verbose_name = "会社の集計"
+        verbose_name_plural = "会社の集計"
+
+    def __str__(self) -> str:
+        return f"CompanyStats({self.company_id}, {self.as_of})"
+
+    @property
+    def due_tasks(self) -> int:
+        """期限切れ + 期限が7日以内（ダッシュボードの「期限が近いタスク」）"""
+        return self.due_soon_tasks + self.overdue_tasks
+
+
+# =========================================
+# 全文検索の転置索引（app.search が保守する）
+# =========================================
+class SearchPosting(models.Model):
+    """
+    「語 → 文書」の 1 行。文書は (種類, ID) で表し、案件・タスク・共有メモ・チェック項目を同じ表に持つ。
+    会社と案件は絞り込みと削除のために持たせている（案件の削除で行ごと消える）。
+    """
+    KIND_PROJECT = "project"
+    KIND_TASK = "task"
+    KIND_MEMO = "memo"
+    KIND_CHECKLIST_ITEM = "checklist_item"
+    KIND_CHOICES = [
+        (KIND_PROJECT, "案件"),
+        (KIND_TASK, "タスク"),
+        (KIND_MEMO, "共有メモ"),
+        (KIND_CHECKLIST_ITEM, "チェック項目"),
+    ]
+
+    # 会社の単独の索引は searchposting_term_idx の先頭列で足りる
+    company = models.ForeignKey(
+        Company, verbose_name="会社", on_delete=models.CASCADE, related_name="+", db_index=False
+    )
+    project = models.ForeignKey(Project, verbose_name="案件", on_delete=models.CASCADE, related_name="+")
+    kind = models.CharField("種類", max_length=20, choices=KIND_CHOICES)
+    object_id = models.PositiveBigIntegerField("文書ID")
+    term = models.CharField("語", max_length=64)
+    # 語の出現回数（件名などの重い項目は数倍して数える）
+    weight = models.PositiveIntegerField("重み", default=1)
+
+    class Meta:
+        verbose_name = "検索索引"
+        verbose_name_plural = "検索索引"
+        indexes = [
+            # 検索（会社 + 語 → 文書）。文書の列まで含めて、索引だけで集計できるようにする
+            models.Index(fields=["company", "term", "kind", "object_id"], name="searchposting_term_idx"),
+            # 文書を保存・削除したときの入れ替え
+            models.Index(fields=["kind", "object_id"], name="searchposting_doc_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"SearchPosting({self.term} → {self.kind}:{self.object_id})"
@@ -0,0 +1,445 @@
+# app/pdf.py
+"""
+PDF 出力（案件サマリー / 工程表）とバックグラウンド生成ジョブ
+
+WeasyPrint の描画は数秒かかることがあるので、画面からはジョブとして登録し
+（PdfJob、キューはデータベースそのもの）、`python manage.py pdf_worker` が
+プロセスプールで順に生成する。ワーカーが動いていない環境向けに、
+従来どおりリクエスト内で生成するビュー（ProjectPDFView / GanttPDFView）も残している。
+会社の案件サマリーをまとめて ZIP にする一括出力（export_batch）もジョブとして動く。
+
+ジョブの取り出しは「status=queued の行を running に UPDATE できたら自分のもの」という
+条件付き UPDATE で行うので、ワーカーを複数起動しても二重に処理しない。
+
+フォントは外部に取りに行かず、同梱の @font-face（pdf_assets/pdf_fonts.css）を使う。
+FontConfiguration と共通スタイルシートは 1 プロセスにつき 1 回だけ用意して使い回す。
+
+WeasyPrint（cairo/pango・fonttools を含む）は読み込みが重いので、モジュールの import 時には
+読み込まず、最初に PDF を描画するときに読み込む。Web ワーカーや管理コマンドの起動では
+読み込まれないこと（bench_startup コマンドで確認できる）。
+
+生成した PDF は「描画した HTML（と共通スタイルシート・同梱フォント）の SHA-256」をキーに MEDIA_ROOT/pdf_cache に保存する。
+HTML が同じなら PDF も同じなので、2 回目以降は WeasyPrint を呼ばずにファイルを返す
+（容量が PDF_CACHE_MAX_BYTES を超えたら最後に使われたのが古いものから消す）。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import tempfile
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import timedelta
+from functools import lru_cache
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections
+from django.db.models import F, Q
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from .models import PdfJob, Project
+from .project_report import ProjectReport
+from . import gantt_svg, project_report
+
+if TYPE_CHECKING:
+    from weasyprint import CSS
+    from weasyprint.text.fonts import FontConfiguration
+
+
+# 実行中のまま止まったジョブ（ワーカーの強制終了など）を再実行するまでの時間（最後の応答から数える）
+JOB_STALE_AFTER = timedelta(minutes=10)
+# 実行中のジョブの応答（heartbeat_at）を進める間隔
+JOB_HEARTBEAT_INTERVAL = timedelta(seconds=30)
+JOB_MAX_ATTEMPTS = 3
+# 生成済みファイルを残しておく期間
+JOB_RETENTION = timedelta(days=1)
+
+
+# 一括出力（export_batch）が同時に使うプロセス数の上限。
+# pdf_worker では一括出力ジョブがワーカー 1 台を占有し、その間ほかのジョブは取り出さない
+PDF_BATCH_MAX_PROCESSES = getattr(settings, "PDF_BATCH_MAX_PROCESSES", min(4, os.cpu_count() or 1))
+
+# 生成済み PDF のキャッシュ（MEDIA_ROOT 配下。公開はしない）
+PDF_CACHE_DIR = Path(getattr(settings, "PDF_CACHE_DIR", Path(settings.MEDIA_ROOT) / "pdf_cache"))
+PDF_CACHE_MAX_BYTES = getattr(settings, "PDF_CACHE_MAX_BYTES", 200 * 1024 * 1024)
+
+# すべての PDF に適用する共通スタイルシート（@font-face など）。フォント本体は pdf_assets/fonts/
+PDF_ASSETS_DIR = Path(__file__).resolve().parent / "pdf_assets"
+PDF_STYLESHEETS = (PDF_ASSETS_DIR / "pdf_fonts.css",)
+PDF_FONT_SUFFIXES = (".otf", ".ttf", ".woff", ".woff2")
+
+
+# ------------------------------------------------------------
+# 生成（同期）
+# ------------------------------------------------------------
+def render_project_html(project: Project | ProjectReport) -> str:
+    """案件サマリーの HTML（テンプレートは集計済みの ProjectReport だけを描画し、クエリを発行しない）"""
+    report = project if isinstance(project, ProjectReport) else project_report.build_report(project)
+    return render_to_string("app/project_pdf.html", {"report": report})
+
+
+def render_gantt_html(project: Project, view_mode: str) -> str:
+    context = {
+        "project": project,
+        "svg_data": gantt_svg.gantt_svg_for_project(project, view_mode),  # サーバー側で描画したSVG
+    }
+    return render_to_string("app/gantt_pdf.html", context)
+
+
+@lru_cache(maxsize=None)
+def font_config() -> FontConfiguration:
+    """プロセス共通の FontConfiguration（読み込んだフォントを描画のたびに探し直さない）"""
+    from weasyprint.text.fonts import FontConfiguration
+
+    return FontConfiguration()
+
+
+@lru_cache(maxsize=None)
+def stylesheets() -> tuple[CSS, ...]:
+    """共通スタイルシートを一度だけ解析して使い回す（@font-face の url() はファイル位置から解決）"""
+    from weasyprint import CSS
+
+    return tuple(CSS(filename=str(path), font_config=font_config()) for path in PDF_STYLESHEETS)
+
+
+def font_files() -> list[Path]:
+    """同梱のフォントファイル（pdf_assets/fonts/）"""
+    return sorted(p for p in (PDF_ASSETS_DIR / "fonts").iterdir() if p.suffix.lower() in PDF_FONT_SUFFIXES)
+
+
+@lru_cache(maxsize=None)
+def stylesheet_fingerprint() -> str:
+    """共通スタイルシートと同梱フォントの内容のハッシュ（どちらかが変わったらキャッシュ済み PDF を使わない）"""
+    digest = hashlib.sha256()
+    for path in PDF_STYLESHEETS:
+        digest.update(path.read_bytes())
+    for path in font_files():
+        with path.open("rb") as f:
+            digest.update(path.name.encode() + b"\0" + hashlib.file_digest(f, "sha256").digest())
+    return digest.hexdigest()
+
+
+def write_pdf(html_string: str, base_url: str | None = None) -> bytes:
+    """WeasyPrint を使ってHTMLからPDFを生成（WeasyPrint はここで初めて読み込まれる）"""
+    from weasyprint import HTML
+
+    return HTML(string=html_string, base_url=base_url).write_pdf(
+        stylesheets=stylesheets(), font_config=font_config()
+    )
+
+
+# ------------------------------------------------------------
+# 生成済み PDF のキャッシュ（描画した HTML の内容でアドレスする）
+# ------------------------------------------------------------
+def html_digest(html_string: str) -> str:
+    return hashlib.sha256(stylesheet_fingerprint().encode() + html_string.encode()).hexdigest()
+
+
+def pdf_etag(digest: str) -> str:
+    return f'"pdf-{digest}"'
+
+
+def cache_path(digest: str) -> Path:
+    return PDF_CACHE_DIR / digest[:2] / f"{digest}.pdf"
+
+
+def cached_pdf_path(html_string: str, base_url: str | None = None) -> Path:
+    """
+    HTML に対応する PDF のパスを返す。無ければ WeasyPrint で生成して保存する。
+    参照のたびに更新日時を進め、追い出しの順番（LRU）に使う。
+    """
+    path = cache_path(html_digest(html_string))
+    try:
+        os.utime(path)
+        return path
+    except FileNotFoundError:
+        pass
+
+    data = write_pdf(html_string, base_url)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # 書きかけのファイルを読まれないよう、一時ファイルに書いてから置き換える
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+    evict_pdf_cache(keep=path)
+    return path
+
+
+def evict_pdf_cache(max_bytes: int | None = None, keep: Path | None = None) -> int:
+    """合計が max_bytes 以下になるまで、最後に使われたのが古い PDF から消す。消した件数を返す"""
+    max_bytes = PDF_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    entries = []
+    total = 0
+    for path in PDF_CACHE_DIR.glob("*/*.pdf"):
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            continue
+        entries.append((st.st_mtime, st.st_size, path))
+        total += st.st_size
+    removed = 0
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        if path == keep:
+            continue
+        path.unlink(missing_ok=True)
+        total -= size
+        removed += 1
+    return removed
+
+
+def project_filename(project: Project | ProjectReport) -> str:
+    return f"project_{project.id}_{project.name}.pdf"
+
+
+def gantt_filename(project: Project) -> str:
+    return f"gantt_{project.pk}_{project.name}.pdf"
+
+
+def build_pdf(kind: str, project: Project, params: dict, base_url: str | None = None) -> tuple[bytes, str]:
+    """ジョブ種別に応じて (PDF本体, ダウンロード時のファイル名) を返す"""
+    if kind == PdfJob.KIND_GANTT:
+        view_mode = params.get("view", gantt_svg.DEFAULT_VIEW_MODE)
+        html_string, filename = render_gantt_html(project, view_mode), gantt_filename(project)
+    elif kind == PdfJob.KIND_PROJECT:
+        html_string, filename = render_project_html(project), project_filename(project)
+    else:
+        raise ValueError(f"unknown pdf kind: {kind}")
+    return cached_pdf_path(html_string, base_url).read_bytes(), filename
+
+
+# ------------------------------------------------------------
+# ジョブ
+# ------------------------------------------------------------
+def enqueue(project: Project, kind: str, params: dict | None = None, *, user=None, base_url: str = "") -> PdfJob:
+    """
+    PDF 生成ジョブを登録する。
+    同じ案件・種別・条件のジョブが待機中/実行中なら、新しく作らずにそれを返す（連打対策）。
+    """
+    params = params or {}
+    pending = (
+        PdfJob.objects.filter(project=project, kind=kind, params=params)
+        .filter(status__in=(PdfJob.STATUS_QUEUED, PdfJob.STATUS_RUNNING))
+        .order_by("id")
+        .first()
+    )
+    if pending is not None:
+        return pending
+    return PdfJob.objects.create(
+        company_id=project.company_id,
+        project=project,
+        requested_by=user,
+        kind=kind,
+        params=params,
+        base_url=base_url,
+    )
+
+
+def enqueue_batch(company, status: str = "", *, user=None, base_url: str = "") -> PdfJob:
+    """会社の案件サマリーをまとめて ZIP にするジョブを登録する（status で絞り込み可）"""
+    params = {"status": status} if status else {}
+    pending = (
+        PdfJob.objects.filter(company=company, kind=PdfJob.KIND_BATCH, params=params)
+        .filter(status__in=(PdfJob.STATUS_QUEUED, PdfJob.STATUS_RUNNING))
+        .order_by("id")
+        .first()
+    )
+    if pending is not None:
+        return pending
+    return PdfJob.objects.create(
+        company=company, kind=PdfJob.KIND_BATCH, params=params, requested_by=user, base_url=base_url
+    )
+
+
+def claim_jobs(limit: int, worker: str = "", *, busy: bool = False) -> list[tuple[int, str]]:
+    """
+    待機中のジョブを古い順に最大 limit 件取り出して running にし、(ID, 種別) を返す。
+    一括出力は自分でプロセスプールを使ってワーカーを占有するので、ワーカーが空いているとき（busy=False）に
+    それ 1 件だけを取り出す。先頭に一括出力があれば、後ろのジョブを先に取らずに手持ちが終わるのを待つ。
+    """
+    claimed: list[tuple[int, str]] = []
+    candidates = (
+        PdfJob.objects.filter(status=PdfJob.STATUS_QUEUED)
+        .order_by("id")
+        .values_list("id", "kind")[: limit * 2]
+    )
+    for pk, kind in candidates:
+        if kind == PdfJob.KIND_BATCH and (busy or claimed):
+            break
+        now = timezone.now()
+        won = PdfJob.objects.filter(pk=pk, status=PdfJob.STATUS_QUEUED).update(
+            status=PdfJob.STATUS_RUNNING,
+            started_at=now,
+            heartbeat_at=now,
+            worker=worker[:100],
+        )
+        if won:
+            claimed.append((pk, kind))
+            if kind == PdfJob.KIND_BATCH or len(claimed) >= limit:
+                break
+    return claimed
+
+
+def heartbeat(job_ids, **fields) -> int:
+    """実行中のジョブの応答日時を進める（fields があれば進捗なども一緒に書く）。更新した件数を返す"""
+    return PdfJob.objects.filter(pk__in=list(job_ids), status=PdfJob.STATUS_RUNNING).update(
+        heartbeat_at=timezone.now(), **fields
+    )
+
+
+def run_job(job_id: int) -> str:
+    """
+    running のジョブを 1 件処理する（プロセスプールの子プロセスで呼ばれる）。
+    結果は PdfJob に書き込み、最終的な status を返す。
+    """
+    close_old_connections()
+    # 取り出してからプールの空きを待っていた分を数えないよう、処理の開始でも応答を記録する
+    heartbeat([job_id])
+    try:
+        job = PdfJob.objects.select_related("project").get(pk=job_id)
+    except PdfJob.DoesNotExist:  # 実行待ちの間に案件ごと削除された
+        return "missing"
+    try:
+        if job.kind == PdfJob.KIND_BATCH:
+            _run_batch_job(job)
+            return job.status
+        data, filename = build_pdf(job.kind, job.project, job.params, job.base_url or None)
+    except Exception as e:  # noqa: BLE001 — 失敗はジョブに記録して画面に伝える
+        job.status = PdfJob.STATUS_FAILED
+        job.error = f"{type(e).__name__}: {e}"[:2000]
+        job.finished_at = timezone.now()
+        job.save(update_fields=["status", "error", "finished_at"])
+    else:
+        job.filename = filename
+        job.file.save(f"{job.pk}.pdf", ContentFile(data), save=False)
+        job.status = PdfJob.STATUS_DONE
+        job.finished_at = timezone.now()
+        job.save(update_fields=["file", "filename", "status", "finished_at"])
+    finally:
+        close_old_connections()
+    return job.status
+
+
+# ------------------------------------------------------------
+# 一括出力（案件サマリーを ZIP にまとめる）
+# ------------------------------------------------------------
+def batch_projects(company_id: int, status: str = "") -> list[ProjectReport]:
+    """
+    一括出力の対象案件のレポートをまとめて集計する。
+    案件数にかかわらずクエリは一定（project_report.build_reports を参照）。
+    """
+    qs = Project.objects.filter(company_id=company_id)
+    if status:
+        qs = qs.filter(status=status)
+    return project_report.build_reports(qs)
+
+
+def _render_cached(html_string: str, base_url: str | None) -> bytes:
+    # プロセスプールの子で実行する。DB は使わず、HTML → PDF（キャッシュ経由）だけを行う
+    return cached_pdf_path(html_string, base_url).read_bytes()
+
+
+def export_batch(projects: list[ProjectReport], dest, *, processes: int | None = None,
+                 base_url: str | None = None, progress=None) -> int:
+    """
+    案件サマリー PDF を processes 個（省略時・上限とも PDF_BATCH_MAX_PROCESSES）までのプロセスで並行して生成し、
+    できた順に dest（パスまたはファイル）の ZIP に書き込む。HTML はこのプロセスで描画し、子プロセスには文字列だけを渡す。
+    progress(処理済み, 全件) を 1 件ごとに呼ぶ。ZIP に入れた件数を返す。
+    """
+    total = len(projects)
+    if progress:
+        progress(0, total)
+    jobs = [(render_project_html(p), project_filename(p)) for p in projects]
+    names: set[str] = set()
+    done = 0
+    with zipfile.ZipFile(dest, "w", compression=zipfile.ZIP_STORED) as zf:  # PDF は圧縮済みなので STORED
+        if not jobs:
+            return 0
+        workers = min(processes or PDF_BATCH_MAX_PROCESSES, PDF_BATCH_MAX_PROCESSES, total)
+        with ProcessPoolExecutor(max_workers=max(1, workers)) as pool:
+            futures = {pool.submit(_render_cached, html, base_url): filename for html, filename in jobs}
+            for future in as_completed(futures):
+                filename = _unique_name(futures[future], names)
+                zf.writestr(filename, future.result())
+                done += 1
+                if progress:
+                    progress(done, total)
+    return done
+
+
+def _unique_name(filename: str, taken: set[str]) -> str:
+    stem, ext = os.path.splitext(filename)
+    candidate, n = filename, 2
+    while candidate in taken:
+        candidate = f"{stem}_{n}{ext}"
+        n += 1
+    taken.add(candidate)
+    return candidate
+
+
+def _run_batch_job(job: PdfJob) -> None:
+    """
+    一括出力ジョブ：ZIP を MEDIA_ROOT に直接書き出し、進捗をジョブに記録する。
+    pdf_worker の子プロセスの中からさらに PDF_BATCH_MAX_PROCESSES 個までのプロセスを起こすので、
+    このジョブはワーカーを占有する（claim_jobs はワーカーが空いているときだけ一括出力を取り出す）。
+    """
+    status = job.params.get("status", "")
+    projects = batch_projects(job.company_id, status)
+
+    def progress(done: int, total: int) -> None:
+        heartbeat([job.pk], progress_done=done, progress_total=total)
+
+    name = job.file.field.generate_filename(job, f"{job.pk}.zip")
+    path = Path(job.file.storage.path(name))
+    path.parent.mkdir(parents=True, exist_ok=True)
+    export_batch(projects, path, base_url=job.base_url or None, progress=progress)
+
+    job.file.name = name
+    job.filename = f"project_summaries_{timezone.localdate():%Y%m%d}{'_' + status if status else ''}.zip"
+    job.status = PdfJob.STATUS_DONE
+    job.progress_done = job.progress_total = len(projects)
+    job.finished_at = timezone.now()
+    job.save(update_fields=["file", "filename", "status", "progress_done", "progress_total", "finished_at"])
+
+
+def recover_stale_jobs() -> int:
+    """
+    実行中のまま JOB_STALE_AFTER のあいだ応答（heartbeat_at）が無いジョブを待機中に戻す
+    （JOB_MAX_ATTEMPTS 回目なら失敗にする）。戻した件数を返す。
+    時間のかかる一括出力でも、ワーカーが生きていれば応答が進むので二重に実行しない。
+    """
+    limit = timezone.now() - JOB_STALE_AFTER
+    stale = Q(status=PdfJob.STATUS_RUNNING) & (
+        Q(heartbeat_at__lt=limit) | Q(heartbeat_at__isnull=True, started_at__lt=limit)
+    )
+    failed = PdfJob.objects.filter(stale, attempts__gte=JOB_MAX_ATTEMPTS - 1).update(
+        status=PdfJob.STATUS_FAILED, error="生成が時間内に終わりませんでした", finished_at=timezone.now()
+    )
+    requeued = PdfJob.objects.filter(stale).update(status=PdfJob.STATUS_QUEUED, attempts=F("attempts") + 1)
+    return failed + requeued
+
+
+def purge_expired_jobs() -> int:
+    """JOB_RETENTION を過ぎた完了・失敗ジョブをファイルごと削除する。削除件数を返す"""
+    expired = PdfJob.objects.filter(
+        status__in=(PdfJob.STATUS_DONE, PdfJob.STATUS_FAILED),
+        finished_at__lt=timezone.now() - JOB_RETENTION,
+    )
+    count = 0
+    for job in expired.iterator():
+        if job.file:
+            job.file.delete(save=False)
+        job.delete()
+        count += 1
+    return count
+
+
+def worker_name() -> str:
+    return f"{os.uname().nodename}:{os.getpid()}" if hasattr(os, "uname") else str(os.getpid())
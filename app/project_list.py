@@ -0,0 +1,111 @@
+# app/project_list.py
+"""
+案件一覧の絞り込み・並び替え・キーセットページング
+
+過去の案件が数千件ある会社でも一覧が重くならないよう、OFFSET や件数の COUNT は使わず、
+「前ページの最後の行の (並び替えキー, ID)」より後ろを PAGE_SIZE 件だけ読む。
+並び替えキーが NULL の行（終了予定日が未設定など）は、昇順・降順どちらでも最後に並べる。
+
+カーソルは (並び替えキーの値, ID) を JSON にして URL 用の base64 にしたもの。
+索引は (会社, ステータス, ID) と (会社, 終了予定日)（Project.Meta.indexes）。
+"""
+
+from __future__ import annotations
+
+import base64
+import json
+from datetime import date
+
+from django.db.models import F, Q, QuerySet
+
+from .models import Project
+
+
+PAGE_SIZE = 50
+
+# 並び順 → (並び替えキーの項目（None なら ID のみ）, 降順か)
+SORTS = {
+    "new": (None, True),
+    "old": (None, False),
+    "end": ("end_date", False),
+    "-end": ("end_date", True),
+    "name": ("name", False),
+}
+DEFAULT_SORT = "new"
+
+
+def filter_projects(qs: QuerySet[Project], filters: dict) -> QuerySet[Project]:
+    """ProjectFilterForm.filters() の内容で絞り込む"""
+    if "status" in filters:
+        qs = qs.filter(status=filters["status"])
+    if "customer" in filters:
+        qs = qs.filter(customer=filters["customer"])
+    if "end_from" in filters:
+        qs = qs.filter(end_date__gte=filters["end_from"])
+    if "end_to" in filters:
+        qs = qs.filter(end_date__lte=filters["end_to"])
+    return qs
+
+
+# ------------------------------------------------------------
+# カーソル
+# ------------------------------------------------------------
+def encode_cursor(value, pk: int) -> str:
+    if isinstance(value, date):
+        value = value.isoformat()
+    raw = json.dumps([value, pk], ensure_ascii=False, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(value: str, sort: str) -> tuple:
+    """encode_cursor() の逆（不正なら ValueError）"""
+    field, _ = SORTS[sort]
+    try:
+        key, pk = json.loads(base64.urlsafe_b64decode(value + "=" * (-len(value) % 4)))
+        if field == "end_date" and key is not None:
+            key = date.fromisoformat(key)
+        elif field == "name" and not isinstance(key, str):
+            raise ValueError("name cursor must be a string")
+        return key, int(pk)
+    except (TypeError, ValueError) as e:  # JSONDecodeError / binascii.Error も ValueError
+        raise ValueError(f"invalid cursor: {value}") from e
+
+
+# ------------------------------------------------------------
+# ページ
+# ------------------------------------------------------------
+def _order(field: str | None, desc: bool) -> list:
+    id_order = "-id" if desc else "id"
+    if field is None:
+        return [id_order]
+    key = F(field).desc(nulls_last=True) if desc else F(field).asc(nulls_last=True)
+    return [key, id_order]
+
+
+def _after(field: str | None, desc: bool, key, pk: int) -> Q:
+    # 並び順で (key, pk) より後ろ。NULL は最後に並ぶ
+    cmp = "lt" if desc else "gt"
+    id_after = Q(**{f"id__{cmp}": pk})
+    if field is None:
+        return id_after
+    if key is None:
+        return Q(**{f"{field}__isnull": True}) & id_after
+    return (
+        Q(**{f"{field}__{cmp}": key})
+        | (Q(**{field: key}) & id_after)
+        | Q(**{f"{field}__isnull": True})
+    )
+
+
+def page(qs: QuerySet[Project], sort: str = DEFAULT_SORT, cursor: str | None = None,
+         limit: int = PAGE_SIZE) -> tuple[list[Project], str | None]:
+    """並び順 sort で cursor の次から limit 件と、次ページのカーソル（不正なカーソルは ValueError）"""
+    sort = sort if sort in SORTS else DEFAULT_SORT
+    field, desc = SORTS[sort]
+    if cursor:
+        qs = qs.filter(_after(field, desc, *decode_cursor(cursor, sort)))
+    rows = list(qs.select_related("customer").order_by(*_order(field, desc))[: limit + 1])
+    if len(rows) <= limit:
+        return rows, None
+    last = rows[limit - 1]
+    return rows[:limit], encode_cursor(getattr(last, field) if field else None, last.pk)
@@ -0,0 +1,192 @@
+# app/project_report.py
+"""
+案件サマリー（レポート）のデータをまとめて集める
+
+PDF テンプレートが project.tasks.all や project.customer をたどると、案件の大きさや件数に
+応じてクエリが増える。ここでは必要なものを先にまとめて読み、テンプレートはその
+スナップショット（ProjectReport）だけを描画する。
+
+クエリは案件数にかかわらず 4 回で一定:
+  1. 案件 + 顧客（JOIN）
+  2. タスク（values で読む。モデルインスタンスは作らない）
+  3. チェックリスト（項目数・完了数は Checklist に持っている値。項目は読まない）
+  4. 最近のメモ（案件ごとに RECENT_MEMOS 件。ウィンドウ関数で絞り込む）
+
+スナップショットは to_dict() で JSON にできる値だけの dict になり、from_dict() で戻せるので、
+PDF 以外の出力形式（CSV・JSON など）や、ジョブへの受け渡しにもそのまま使える。
+"""
+
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass, field
+from datetime import date, datetime
+from typing import Iterable
+
+from django.db.models import F, QuerySet, Window
+from django.db.models.functions import RowNumber
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import Checklist, Memo, Project, Task
+
+
+# レポートに載せるメモの件数（新しいものから）
+RECENT_MEMOS = 10
+
+
+@dataclass
+class ReportTask:
+    id: int
+    name: str
+    start_date: date | None
+    end_date: date | None
+    progress: int
+
+
+@dataclass
+class ReportChecklist:
+    id: int
+    title: str
+    total: int
+    done: int
+
+    @property
+    def rate(self) -> int:
+        return round(self.done * 100 / self.total) if self.total else 0
+
+
+@dataclass
+class ReportMemo:
+    id: int
+    author: str
+    content: str
+    created_at: datetime | None
+
+
+@dataclass
+class ProjectReport:
+    id: int
+    name: str
+    customer: str
+    status: str
+    start_date: date | None
+    end_date: date | None
+    description: str
+    created_at: datetime | None
+    tasks: list[ReportTask] = field(default_factory=list)
+    checklists: list[ReportChecklist] = field(default_factory=list)
+    memos: list[ReportMemo] = field(default_factory=list)
+
+    @property
+    def task_progress(self) -> int:
+        """タスクの平均進捗（%）"""
+        return round(sum(t.progress for t in self.tasks) / len(self.tasks)) if self.tasks else 0
+
+    @property
+    def checklist_total(self) -> int:
+        return sum(c.total for c in self.checklists)
+
+    @property
+    def checklist_done(self) -> int:
+        return sum(c.done for c in self.checklists)
+
+    def to_dict(self) -> dict:
+        """JSON にできる dict（日付は ISO 8601 の文字列）"""
+        return _jsonable(asdict(self))
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ProjectReport":
+        """to_dict() の結果から戻す"""
+        return cls(**{
+            **data,
+            "start_date": _date(data.get("start_date")),
+            "end_date": _date(data.get("end_date")),
+            "created_at": _datetime(data.get("created_at")),
+            "tasks": [
+                ReportTask(**{**t, "start_date": _date(t.get("start_date")), "end_date": _date(t.get("end_date"))})
+                for t in data.get("tasks", ())
+            ],
+            "checklists": [ReportChecklist(**c) for c in data.get("checklists", ())],
+            "memos": [ReportMemo(**{**m, "created_at": _datetime(m.get("created_at"))}) for m in data.get("memos", ())],
+        })
+
+
+def _date(value: str | None) -> date | None:
+    return parse_date(value) if value else None
+
+
+def _datetime(value: str | None) -> datetime | None:
+    return parse_datetime(value) if value else None
+
+
+def _jsonable(value):
+    if isinstance(value, dict):
+        return {k: _jsonable(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_jsonable(v) for v in value]
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+# ------------------------------------------------------------
+# 集計
+# ------------------------------------------------------------
+def build_reports(projects: QuerySet[Project] | Iterable[int]) -> list[ProjectReport]:
+    """
+    案件のクエリセット（または ID の並び）からレポートを ID 順に作る。
+    案件数にかかわらずクエリは 4 回。
+    """
+    qs = projects if isinstance(projects, QuerySet) else Project.objects.filter(pk__in=list(projects))
+    reports = {
+        p.pk: ProjectReport(
+            id=p.pk,
+            name=p.name,
+            customer=p.customer.name if p.customer else "",
+            status=p.status,
+            start_date=p.start_date,
+            end_date=p.end_date,
+            description=p.description,
+            created_at=p.created_at,
+        )
+        for p in qs.select_related("customer").order_by("id")
+    }
+    if not reports:
+        return []
+    ids = list(reports)
+
+    tasks = (
+        Task.objects.filter(project_id__in=ids)
+        .order_by("start_date", "end_date", "id")
+        .values_list("project_id", "id", "name", "start_date", "end_date", "progress")
+    )
+    for project_id, *values in tasks.iterator():
+        reports[project_id].tasks.append(ReportTask(*values))
+
+    checklists = (
+        Checklist.objects.filter(project_id__in=ids)
+        .order_by("id")
+        .values_list("project_id", "id", "title", "items_total", "items_done")
+    )
+    for project_id, *values in checklists:
+        reports[project_id].checklists.append(ReportChecklist(*values))
+
+    memos = (
+        Memo.objects.filter(project_id__in=ids)
+        .annotate(rank=Window(RowNumber(), partition_by=F("project_id"), order_by=F("id").desc()))
+        .filter(rank__lte=RECENT_MEMOS)
+        .order_by("project_id", "-id")
+        .values_list("project_id", "id", "author__username", "content", "created_at")
+    )
+    for project_id, pk, author, content, created_at in memos:
+        reports[project_id].memos.append(ReportMemo(pk, author or "", content, created_at))
+
+    return list(reports.values())
+
+
+def build_report(project: Project | int) -> ProjectReport:
+    """1 案件分のレポート（クエリ 4 回）"""
+    pk = project.pk if isinstance(project, Project) else project
+    reports = build_reports(Project.objects.filter(pk=pk))
+    if not reports:
+        raise Project.DoesNotExist(pk)
+    return reports[0]
@@ -0,0 +1,152 @@
+# app/project_rollup.py
+"""
+案件一覧に出す案件ごとの集計（Project の rollup 項目）
+
+  - タスク数
+  - 工期で重み付けした進捗（タスクごとの 進捗 × 工期日数 の合計 ÷ 工期日数の合計）
+  - チェック項目の完了数 / 総数（チェックリストごとの項目数・完了数も Checklist に持つ）
+  - 最終更新日時（タスク・チェック項目・共有メモのいずれかが変わった日時）
+
+一覧の行ごとに集計クエリを出さないよう、案件の行に合計値を持たせ、
+タスク・チェック項目の保存/削除のシグナルで差分だけを F 式で足し引きする（案件ごとに UPDATE 1 回）。
+差分の反映は書き込みと同じトランザクションで行う（ビュー側で transaction.atomic に入れている）。
+シグナルを通らない一括更新（task_import・scheduling）はここを直接呼ぶ。
+ずれは `python manage.py reconcile_project_rollups`（チェックリストは reconcile_checklist_counts）でまとめて数え直す。
+"""
+
+from __future__ import annotations
+
+from collections import defaultdict
+from datetime import date
+from itertools import groupby
+from typing import Iterable
+
+from django.db.models import Count, F, Max, Q
+from django.utils import timezone
+
+from .models import Checklist, ChecklistItem, Memo, Project, Task
+
+
+TaskState = tuple[date | None, date | None, int]  # (開始日, 終了日, 進捗)
+
+ROLLUP_FIELDS = (
+    "task_count",
+    "task_days_total",
+    "task_progress_total",
+    "checklist_items_total",
+    "checklist_items_done",
+    "last_activity_at",
+)
+
+
+def task_days(start: date | None, end: date | None) -> int:
+    """進捗の重みにする工期日数（両端を含む。日付が未設定・逆転していれば 1 日として数える）"""
+    if start is None or end is None or end < start:
+        return 1
+    return (end - start).days + 1
+
+
+def _task_delta(states: Iterable[TaskState], sign: int, delta: dict) -> None:
+    for start, end, progress in states:
+        days = task_days(start, end)
+        delta["task_count"] += sign
+        delta["task_days_total"] += sign * days
+        delta["task_progress_total"] += sign * days * (progress or 0)
+
+
+# ------------------------------------------------------------
+# 差分の反映（signals から呼ぶ）
+# ------------------------------------------------------------
+def tasks_changed(project_id: int | None, before: Iterable[TaskState] = (), after: Iterable[TaskState] = ()) -> None:
+    """案件のタスクが before の状態から after の状態に変わった（追加なら before は空、削除なら after は空）"""
+    delta: dict = defaultdict(int)
+    _task_delta(before, -1, delta)
+    _task_delta(after, 1, delta)
+    _apply(project_id, delta)
+
+
+def checklist_items_changed(checklist_id: int | None, project_id: int | None, total: int = 0, done: int = 0) -> None:
+    """
+    チェックリストの項目が total 件・完了が done 件増えた（減ったなら負数）。
+    チェックリストの項目数・完了数と、案件の集計の両方に足す（チェックリストの削除なら checklist_id は None）
+    """
+    if checklist_id is not None and (total or done):
+        Checklist.objects.filter(pk=checklist_id).update(
+            items_total=F("items_total") + total, items_done=F("items_done") + done
+        )
+    _apply(project_id, {"checklist_items_total": total, "checklist_items_done": done})
+
+
+def touch(project_id: int | None) -> None:
+    """集計は変わらないが、案件に動きがあった（メモの投稿など）"""
+    _apply(project_id, {})
+
+
+def _apply(project_id: int | None, delta: dict) -> None:
+    if project_id is None:
+        return
+    Project.objects.filter(pk=project_id).update(
+        **{field: F(field) + n for field, n in delta.items() if n}, last_activity_at=timezone.now()
+    )
+
+
+# ------------------------------------------------------------
+# 数え直し
+# ------------------------------------------------------------
+def compute(project_ids: Iterable[int]) -> dict[int, dict]:
+    """
+    案件ごとの集計を数え直す（案件 ID → {項目: 値}）。
+    クエリはタスク 2 回・チェック項目 1 回・メモ 1 回（案件数にかかわらず一定）。
+    """
+    project_ids = list(project_ids)
+    rows = {pk: dict.fromkeys(ROLLUP_FIELDS, 0) | {"last_activity_at": None} for pk in project_ids}
+    if not rows:
+        return rows
+
+    def latest(pk, value):
+        if value is not None and (rows[pk]["last_activity_at"] is None or value > rows[pk]["last_activity_at"]):
+            rows[pk]["last_activity_at"] = value
+
+    # 工期日数は DB ごとに日付の引き算の書き方が違うので、(開始日, 終了日, 進捗) を案件順に流し読みして足す
+    tasks = (
+        Task.objects.filter(project_id__in=project_ids)
+        .order_by("project_id")
+        .values_list("project_id", "start_date", "end_date", "progress")
+    )
+    for project_id, states in groupby(tasks.iterator(chunk_size=2000), key=lambda r: r[0]):
+        delta: dict = defaultdict(int)
+        _task_delta((r[1:] for r in states), 1, delta)
+        rows[project_id].update(delta)
+    for project_id, updated_at in (
+        Task.objects.filter(project_id__in=project_ids).values_list("project_id").annotate(Max("updated_at")).order_by()
+    ):
+        latest(project_id, updated_at)
+
+    items = (
+        ChecklistItem.objects.filter(checklist__project_id__in=project_ids)
+        .values_list("checklist__project_id")
+        .annotate(total=Count("id"), done=Count("id", filter=Q(is_done=True)), last=Max("updated_at"))
+        .order_by()
+    )
+    for project_id, total, done, last in items:
+        rows[project_id].update(checklist_items_total=total, checklist_items_done=done)
+        latest(project_id, last)
+
+    memos = Memo.objects.filter(project_id__in=project_ids).values_list("project_id").annotate(Max("updated_at"))
+    for project_id, last in memos.order_by():
+        latest(project_id, last)
+    return rows
+
+
+def refresh_rows(rows: dict[int, dict]) -> None:
+    """compute() の結果を保存する（bulk_update）"""
+    Project.objects.bulk_update(
+        [Project(pk=pk, **values) for pk, values in rows.items()], ROLLUP_FIELDS, batch_size=500
+    )
+
+
+def refresh(project_ids: Iterable[int]) -> int:
+    """案件の集計を数え直して保存する。数え直した案件数を返す"""
+    rows = compute(project_ids)
+    refresh_rows(rows)
+    return len(rows)
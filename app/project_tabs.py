@@ -0,0 +1,41 @@
+# app/project_tabs.py
+"""
+案件詳細のタブ（チェックリスト・共有メモ）の中身をページ単位で読む
+
+案件詳細ページは最初に見える工程表だけを描き、チェックリストと共有メモはタブを開いたときに
+断片（HTML）を取りに来る。長く続いている案件でもページが重くならないよう、どちらも新しい順に
+ID のカーソルで PAGE_SIZE 件ずつ読む（「もっと見る」で次のページを足す）。
+"""
+
+from __future__ import annotations
+
+from django.db.models import Prefetch
+
+from .models import Checklist, ChecklistItem, Memo, Project
+
+
+MEMO_PAGE_SIZE = 20
+CHECKLIST_PAGE_SIZE = 10
+
+
+def memo_page(project: Project, before: int | None = None,
+              limit: int = MEMO_PAGE_SIZE) -> tuple[list[Memo], int | None]:
+    """案件の共有メモを新しい順に limit 件と、次ページのカーソル（最後のメモ ID）"""
+    qs = Memo.objects.filter(project=project)
+    if before is not None:
+        qs = qs.filter(id__lt=before)
+    rows = list(qs.select_related("author").order_by("-id")[: limit + 1])
+    next_cursor = rows[limit - 1].pk if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+
+def checklist_page(project: Project, before: int | None = None,
+                   limit: int = CHECKLIST_PAGE_SIZE) -> tuple[list[Checklist], int | None]:
+    """案件のチェックリストを新しい順に limit 件（項目つき）と、次ページのカーソル（最後のチェックリスト ID）"""
+    qs = Checklist.objects.filter(project=project)
+    if before is not None:
+        qs = qs.filter(id__lt=before)
+    qs = qs.prefetch_related(Prefetch("items", queryset=ChecklistItem.objects.order_by("id")))
+    rows = list(qs.order_by("-id")[: limit + 1])
+    next_cursor = rows[limit - 1].pk if len(rows) > limit else None
+    return rows[:limit], next_cursor
@@ -0,0 +1,383 @@
+# app/scheduling.py
+"""
+工程スケジュール計算（クリティカルパス法 / CPM）
+
+Task.dependencies（先行タスク）を「先行 → 後続」の有向グラフとみなし、
+  - トポロジカルソート（Kahn 法）と循環検出
+  - 最早開始/最早終了・最遅開始/最遅終了・余裕日数
+  - クリティカルパス
+をすべて O(V+E) で計算する。グラフの読み込みはタスク行と中間テーブルの 2 クエリだけ。
+
+日付は「案件の基準日からの日数」で扱い、終了日は当日を含む（開始=終了なら 1 日）。
+後続タスクは先行タスクの終了翌日以降に開始できる（終了→開始 / FS 関係）。
+"""
+
+from __future__ import annotations
+
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Project, Task
+from . import company_stats, dashboard, project_rollup, task_feed
+
+
+class ScheduleCycleError(ValueError):
+    """依存関係に循環がある（cycle に循環に含まれるタスクIDを持つ）"""
+
+    def __init__(self, cycle: list[int]):
+        self.cycle = cycle
+        super().__init__(f"依存関係が循環しています: {cycle}")
+
+
+# ------------------------------------------------------------
+# グラフ
+# ------------------------------------------------------------
+@dataclass
+class TaskGraph:
+    """案件内タスクの依存グラフ（隣接リスト）"""
+    names: dict[int, str] = field(default_factory=dict)
+    starts: dict[int, date | None] = field(default_factory=dict)
+    ends: dict[int, date | None] = field(default_factory=dict)
+    preds: dict[int, list[int]] = field(default_factory=dict)  # 先行タスク
+    succs: dict[int, list[int]] = field(default_factory=dict)  # 後続タスク
+
+    def add_task(self, pk: int, name: str, start: date | None, end: date | None) -> None:
+        self.names[pk] = name
+        self.starts[pk] = start
+        self.ends[pk] = end
+        self.preds.setdefault(pk, [])
+        self.succs.setdefault(pk, [])
+
+    def add_edge(self, pred: int, succ: int) -> None:
+        if pred not in self.names or succ not in self.names:
+            return  # 他案件への依存など、グラフ外の辺は無視
+        self.preds[succ].append(pred)
+        self.succs[pred].append(succ)
+
+    def duration(self, pk: int) -> int:
+        """工期（日数）。片方の日付だけのタスクはその 1 日、日付の無いタスクは 0 日として扱う"""
+        start, end = self.starts[pk], self.ends[pk]
+        if start is None and end is None:
+            return 0
+        if start is None or end is None:
+            return 1
+        return max((end - start).days + 1, 1)
+
+    def first_day(self, pk: int) -> date | None:
+        """予定の初日（終了日だけのタスクはその日）"""
+        return self.starts[pk] or self.ends[pk]
+
+    def downstream(self, pk: int) -> set[int]:
+        """pk の後ろに連なる全タスク（pk 自身は含まない）"""
+        seen: set[int] = set()
+        queue = deque(self.succs.get(pk, ()))
+        while queue:
+            cur = queue.popleft()
+            if cur in seen:
+                continue
+            seen.add(cur)
+            queue.extend(self.succs[cur])
+        return seen
+
+
+def load_graph(project: Project | int) -> TaskGraph:
+    """案件のタスクと依存関係を 2 クエリで読み込む"""
+    project_id = getattr(project, "pk", project)
+    graph = TaskGraph()
+    rows = (
+        Task.objects.filter(project_id=project_id)
+        .order_by("start_date", "end_date", "id")
+        .values_list("id", "name", "start_date", "end_date")
+    )
+    for pk, name, start, end in rows:
+        graph.add_task(pk, name, start, end)
+    edges = (
+        Task.dependencies.through.objects.filter(from_task__project_id=project_id)
+        .order_by("from_task_id", "to_task_id")
+        .values_list("to_task_id", "from_task_id")
+    )
+    for pred, succ in edges:
+        graph.add_edge(pred, succ)
+    return graph
+
+
+def topological_order(graph: TaskGraph) -> list[int]:
+    """Kahn 法でトポロジカル順を返す。循環があれば ScheduleCycleError"""
+    indegree = {pk: len(p) for pk, p in graph.preds.items()}
+    queue = deque(pk for pk in graph.names if indegree[pk] == 0)
+    order: list[int] = []
+    while queue:
+        cur = queue.popleft()
+        order.append(cur)
+        for nxt in graph.succs[cur]:
+            indegree[nxt] -= 1
+            if indegree[nxt] == 0:
+                queue.append(nxt)
+    if len(order) < len(graph.names):
+        raise ScheduleCycleError(_find_cycle(graph, {pk for pk, d in indegree.items() if d > 0}))
+    return order
+
+
+def _find_cycle(graph: TaskGraph, remaining: set[int]) -> list[int]:
+    """
+    Kahn 法で残ったノードから循環を 1 つ取り出す。
+    残ったノードは必ず残ったノードを先行に持つので、先行をたどれば必ず一周する。
+    """
+    cur = next(iter(remaining))
+    seen: dict[int, int] = {}
+    path: list[int] = []
+    while cur not in seen:
+        seen[cur] = len(path)
+        path.append(cur)
+        cur = next(p for p in graph.preds[cur] if p in remaining)
+    return list(reversed(path[seen[cur]:]))
+
+
+# ------------------------------------------------------------
+# CPM 計算
+# ------------------------------------------------------------
+@dataclass
+class ScheduledTask:
+    id: int
+    name: str
+    duration: int
+    es: int  # 最早開始（基準日からの日数）
+    ef: int  # 最早終了（翌日の日数 = 排他的）
+    ls: int  # 最遅開始
+    lf: int  # 最遅終了（排他的）
+
+    @property
+    def slack(self) -> int:
+        return self.ls - self.es
+
+    @property
+    def critical(self) -> bool:
+        return self.slack == 0
+
+
+@dataclass
+class Schedule:
+    epoch: date
+    order: list[int]
+    tasks: dict[int, ScheduledTask]
+    critical_path: list[int]
+
+    @property
+    def finish(self) -> int:
+        return max((t.ef for t in self.tasks.values()), default=0)
+
+    def _day(self, offset: int) -> str:
+        return (self.epoch + timedelta(days=offset)).isoformat()
+
+    @staticmethod
+    def _last_offset(start: int, end_exclusive: int) -> int:
+        # 0 日のタスクは開始日と同じ日を終了日として表示する
+        return max(start, end_exclusive - 1)
+
+    def _last_day(self, start: int, end_exclusive: int) -> str:
+        return self._day(self._last_offset(start, end_exclusive))
+
+    def to_dict(self) -> dict:
+        return {
+            "epoch": self.epoch.isoformat(),
+            # 各タスクの最早終了日と同じ決め方で、いちばん遅いもの
+            "finish": self._day(max((self._last_offset(t.es, t.ef) for t in self.tasks.values()), default=0)),
+            "duration": self.finish,
+            "critical_path": [str(pk) for pk in self.critical_path],
+            "tasks": [
+                {
+                    "id": str(t.id),
+                    "name": t.name,
+                    "duration": t.duration,
+                    "earliest_start": self._day(t.es),
+                    "earliest_finish": self._last_day(t.es, t.ef),
+                    "latest_start": self._day(t.ls),
+                    "latest_finish": self._last_day(t.ls, t.lf),
+                    "slack": t.slack,
+                    "critical": t.critical,
+                }
+                for t in (self.tasks[pk] for pk in self.order)
+            ],
+        }
+
+
+def _epoch(graph: TaskGraph, project: Project | None) -> date:
+    starts = [d for d in map(graph.first_day, graph.names) if d is not None]
+    if starts:
+        return min(starts)
+    if project is not None and project.start_date:
+        return project.start_date
+    return date.today()
+
+
+def compute_schedule(graph: TaskGraph, project: Project | None = None) -> Schedule:
+    """
+    前進計算で最早日程、後退計算で最遅日程を求める。
+    各タスクの予定開始日は「これより早くは始めない」制約として扱う。
+    """
+    order = topological_order(graph)
+    epoch = _epoch(graph, project)
+
+    es: dict[int, int] = {}
+    ef: dict[int, int] = {}
+    for pk in order:
+        planned = graph.first_day(pk)
+        start = (planned - epoch).days if planned else 0
+        for pred in graph.preds[pk]:
+            start = max(start, ef[pred])
+        es[pk] = start
+        ef[pk] = start + graph.duration(pk)
+
+    finish = max(ef.values(), default=0)
+    ls: dict[int, int] = {}
+    lf: dict[int, int] = {}
+    for pk in reversed(order):
+        latest = min((ls[s] for s in graph.succs[pk]), default=finish)
+        lf[pk] = latest
+        ls[pk] = latest - graph.duration(pk)
+
+    tasks = {
+        pk: ScheduledTask(pk, graph.names[pk], graph.duration(pk), es[pk], ef[pk], ls[pk], lf[pk])
+        for pk in order
+    }
+    return Schedule(epoch=epoch, order=order, tasks=tasks, critical_path=_critical_path(graph, order, tasks))
+
+
+def _critical_path(graph: TaskGraph, order: list[int], tasks: dict[int, ScheduledTask]) -> list[int]:
+    """
+    余裕 0 のタスクを、終了と開始が隙間なくつながる先行関係でたどった最長の鎖。
+    （最終完了日を決めている一連の工程）
+    """
+    best_len: dict[int, int] = {}
+    best_prev: dict[int, int | None] = {}
+    for pk in order:
+        t = tasks[pk]
+        if not t.critical:
+            continue
+        best_len[pk], best_prev[pk] = t.duration, None
+        for pred in graph.preds[pk]:
+            if pred in best_len and tasks[pred].ef == t.es and best_len[pred] + t.duration > best_len[pk]:
+                best_len[pk], best_prev[pk] = best_len[pred] + t.duration, pred
+    finish = max((t.ef for t in tasks.values()), default=0)
+    ends = [pk for pk in best_len if tasks[pk].ef == finish]
+    if not ends:
+        return []
+    cur: int | None = max(ends, key=lambda pk: best_len[pk])
+    path: list[int] = []
+    while cur is not None:
+        path.append(cur)
+        cur = best_prev[cur]
+    return list(reversed(path))
+
+
+# ------------------------------------------------------------
+# 一括リスケジュール（依存先への波及）
+# ------------------------------------------------------------
+# 一度にずらせる日数（前後とも）
+MAX_RESCHEDULE_DAYS = 3650
+
+
+def plan_reschedule(graph: TaskGraph, task_id: int, days: int) -> dict[int, tuple[date, date]]:
+    """
+    task_id を days 日ずらし、終了→開始の制約を満たすよう後続タスクを後ろへ送る。
+    変更のあるタスクだけ {タスクID: (新開始日, 新終了日)} で返す（DB には触れない）。
+    後続は「遅れた分だけ後ろへ」動かすだけで、前倒しはしない。工期は保たれる。
+    """
+    if abs(days) > MAX_RESCHEDULE_DAYS:
+        raise ValueError(f"ずらせる日数は前後 {MAX_RESCHEDULE_DAYS} 日までです")
+    starts = dict(graph.starts)
+    ends = dict(graph.ends)
+    if starts.get(task_id) is None or ends.get(task_id) is None:
+        raise ValueError("開始日・終了日が未設定のタスクは移動できません")
+    try:
+        return _shift_downstream(graph, task_id, days, starts, ends)
+    except OverflowError:  # 西暦 1〜9999 年の外に出る
+        raise ValueError("移動後の日付が扱える範囲を超えます")
+
+
+def _shift_downstream(graph: TaskGraph, task_id: int, days: int,
+                      starts: dict, ends: dict) -> dict[int, tuple[date, date]]:
+    starts[task_id] += timedelta(days=days)
+    ends[task_id] += timedelta(days=days)
+    moved = {task_id}
+
+    affected = graph.downstream(task_id)
+    for pk in topological_order(graph):
+        if pk not in affected or starts[pk] is None or ends[pk] is None:
+            continue
+        pred_ends = [ends[p] for p in graph.preds[pk] if ends[p] is not None]
+        if not pred_ends:
+            continue
+        shift = (max(pred_ends) + timedelta(days=1) - starts[pk]).days
+        if shift > 0:
+            starts[pk] += timedelta(days=shift)
+            ends[pk] += timedelta(days=shift)
+            moved.add(pk)
+    return {pk: (starts[pk], ends[pk]) for pk in moved if days or pk != task_id}
+
+
+def reschedule_task(task: Task, days: int, *, dry_run: bool = False) -> dict:
+    """
+    タスクを days 日ずらして後続へ波及させる。
+    保存は 1 トランザクション内の bulk_update 1 回。dry_run なら差分だけ返して保存しない。
+    """
+    with transaction.atomic():
+        # 同じ案件の同時リスケジュールを直列化する
+        project = Project.objects.select_for_update().get(pk=task.project_id)
+        graph = load_graph(project)
+        plan = plan_reschedule(graph, task.pk, days)
+        changes = [
+            {
+                "id": str(pk),
+                "name": graph.names[pk],
+                "old_start": graph.starts[pk].isoformat(),
+                "old_end": graph.ends[pk].isoformat(),
+                "new_start": new_start.isoformat(),
+                "new_end": new_end.isoformat(),
+                "shift": (new_start - graph.starts[pk]).days,
+            }
+            for pk, (new_start, new_end) in sorted(plan.items(), key=lambda kv: (kv[1][0], kv[0]))
+        ]
+        version = project.task_version
+        if plan and not dry_run:
+            now = timezone.now()
+            rows = [
+                Task(pk=pk, start_date=new_start, end_date=new_end, updated_at=now)
+                for pk, (new_start, new_end) in plan.items()
+            ]
+            Task.objects.bulk_update(rows, ["start_date", "end_date", "updated_at"])
+            # bulk_update はシグナルを送らないので、版数・会社と案件の集計・ダッシュボードはここでまとめて更新する
+            version = task_feed.bump_task_version(project.pk, plan.keys())
+            company_stats.refresh(project.company_id)
+            project_rollup.refresh([project.pk])
+            dashboard.invalidate(project.company_id)
+    return {"dry_run": dry_run, "days": days, "version": version, "changes": changes}
+
+
+# ------------------------------------------------------------
+# キャッシュ付きの入口
+# ------------------------------------------------------------
+SCHEDULE_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def schedule_cache_key(project: Project) -> str:
+    return f"schedule:{project.pk}:{project.task_version}"
+
+
+def get_schedule_data(project: Project) -> dict:
+    """
+    案件のスケジュール計算結果（to_dict 済み）を返す。
+    工程データ版数ごとにキャッシュするので、タスクが変わらない限り再計算しない。
+    循環がある場合は ScheduleCycleError。
+    """
+    key = schedule_cache_key(project)
+    data = cache.get(key)
+    if data is None:
+        data = compute_schedule(load_graph(project), project).to_dict()
+        cache.set(key, data, SCHEDULE_CACHE_TIMEOUT)
+    return data
@@ -0,0 +1,353 @@
+# app/search.py
+"""
+案件・タスク・共有メモ・チェック項目の全文検索（会社ごと）
+
+本文を Janome で形態素に分け、語ごとに「どの文書に何回出たか」を転置索引 SearchPosting に持つ。
+検索は索引だけを読み（LIKE で本文を走査しない）、すべての語を含む文書を
+「重み × 語の珍しさ」の合計が大きい順に並べて、PAGE_SIZE 件ずつ返す。
+
+語の取り出し方
+  - 全角英数・半角カナは NFKC で揃え、英字は小文字にする
+  - 名詞・動詞・形容詞だけを使う（助詞・助動詞・記号は捨てる。動詞・形容詞は基本形）
+  - Janome は「分電盤」を 分 / 電 / 盤 のように細かく分けるので、続いた名詞は
+    MAX_NGRAM 個までつないだものも語として索引に入れる（「2階分電盤交換」→ 分電盤・2階・分電盤交換 など）。
+    検索語の側は続いた名詞をつないだ 1 語として引くので、「分電盤」で「2階分電盤交換」が見つかる
+
+索引は案件・タスク・メモ・チェック項目の保存/削除のシグナルで文書ごとに入れ替える
+（案件の削除では索引の行もカスケードで消える）。シグナルを通らない一括登録（task_import）は
+index_documents() を直接呼ぶ。既存データの投入やずれの修復は
+`python manage.py rebuild_search_index` で行う。
+
+Janome の辞書の読み込み（0.3 秒ほど）は起動時ではなく、最初に文書を索引するか検索したときに行う。
+"""
+
+from __future__ import annotations
+
+import math
+import unicodedata
+from collections import Counter
+from dataclasses import dataclass, field
+from functools import lru_cache
+from itertools import islice
+from typing import TYPE_CHECKING, Iterable, Iterator
+
+from django.db.models import Case, Count, ExpressionWrapper, F, FloatField, Sum, Value, When
+from django.urls import reverse
+
+from .models import ChecklistItem, Memo, Project, SearchPosting, Task
+
+if TYPE_CHECKING:
+    from janome.tokenizer import Tokenizer
+
+
+PAGE_SIZE = 20
+MAX_PAGES = 50
+# 続いた名詞をいくつまでつないで語にするか
+MAX_NGRAM = 4
+MAX_QUERY_TERMS = 8
+TERM_MAX_LENGTH = 64
+# 件名・項目名など、短くて内容を言い表す項目の重み
+TITLE_WEIGHT = 3
+SNIPPET_CHARS = 80
+BATCH_SIZE = 1000
+
+# 種類 → (モデル, 会社IDへのパス, 案件IDへのパス, {本文の項目: 重み})
+SOURCES = {
+    SearchPosting.KIND_PROJECT: (Project, "company_id", "id", {"name": TITLE_WEIGHT, "description": 1}),
+    SearchPosting.KIND_TASK: (Task, "project__company_id", "project_id", {"name": TITLE_WEIGHT}),
+    SearchPosting.KIND_MEMO: (Memo, "project__company_id", "project_id", {"content": 1}),
+    SearchPosting.KIND_CHECKLIST_ITEM: (
+        ChecklistItem, "checklist__project__company_id", "checklist__project_id", {"title": TITLE_WEIGHT},
+    ),
+}
+KIND_OF_MODEL = {model: kind for kind, (model, *_) in SOURCES.items()}
+# 保存時にこの項目が変わっていなければ索引し直さない（update_fields で判定）
+INDEXED_FIELDS = {
+    SearchPosting.KIND_PROJECT: {"name", "description", "company", "company_id"},
+    SearchPosting.KIND_TASK: {"name", "project", "project_id"},
+    SearchPosting.KIND_MEMO: {"content", "project", "project_id"},
+    SearchPosting.KIND_CHECKLIST_ITEM: {"title", "checklist", "checklist_id"},
+}
+
+NOUN_SKIP = ("非自立", "代名詞")
+WORD_POS = ("動詞", "形容詞")
+# どの文書にも出てくる動詞・形容詞（「交換する」の「する」など）
+STOP_WORDS = frozenset({"する", "ある", "いる", "なる", "できる", "れる", "られる", "ない", "いい", "よい"})
+
+
+# ------------------------------------------------------------
+# 語の取り出し
+# ------------------------------------------------------------
+@lru_cache(maxsize=None)
+def _tokenizer() -> Tokenizer:
+    from janome.tokenizer import Tokenizer
+
+    return Tokenizer()
+
+
+def normalize(text: str) -> str:
+    return unicodedata.normalize("NFKC", text or "").lower()
+
+
+def _chunks(text: str) -> Iterator[list[str]]:
+    """続いた名詞のまとまり（形態素のリスト）と、動詞・形容詞の基本形（1 要素のリスト）を順に返す"""
+    run: list[str] = []
+    for token in _tokenizer().tokenize(normalize(text)):
+        pos = token.part_of_speech.split(",")
+        if pos[0] == "名詞" and pos[1] not in NOUN_SKIP:
+            run.append(token.surface)
+            continue
+        if run:
+            yield run
+            run = []
+        if pos[0] in WORD_POS and pos[1] == "自立" and token.base_form not in STOP_WORDS:
+            yield [token.base_form]
+    if run:
+        yield run
+
+
+def _is_term(term: str) -> bool:
+    # 1 文字の語は漢字だけ残す（かな・英数字・記号 1 文字では絞り込めない）
+    if not term or len(term) > TERM_MAX_LENGTH:
+        return False
+    return len(term) > 1 or "一" <= term <= "鿿" or term == "々"
+
+
+def document_terms(text: str) -> Counter:
+    """文書に入れる語と出現回数（続いた名詞は MAX_NGRAM 個までのつなぎ方をすべて入れる）"""
+    terms: Counter = Counter()
+    for run in _chunks(text):
+        for i in range(len(run)):
+            for j in range(i + 1, min(len(run), i + MAX_NGRAM) + 1):
+                term = "".join(run[i:j])
+                if _is_term(term):
+                    terms[term] += 1
+    return terms
+
+
+def query_terms(text: str) -> list[str]:
+    """検索語（続いた名詞は MAX_NGRAM 個ずつつないで 1 語にする。重複なし）"""
+    terms: dict[str, None] = {}
+    for run in _chunks(text):
+        for i in range(0, len(run), MAX_NGRAM):
+            term = "".join(run[i:i + MAX_NGRAM])
+            if _is_term(term):
+                terms[term] = None
+    return list(terms)[:MAX_QUERY_TERMS]
+
+
+# ------------------------------------------------------------
+# 索引の更新
+# ------------------------------------------------------------
+def _postings(kind: str, qs) -> Iterator[SearchPosting]:
+    _, company_path, project_path, fields = SOURCES[kind]
+    values = qs.order_by().values_list("id", company_path, project_path, *fields)
+    for pk, company_id, project_id, *texts in values.iterator(chunk_size=BATCH_SIZE):
+        weights: Counter = Counter()
+        for text, weight in zip(texts, fields.values()):
+            for term, n in document_terms(text).items():
+                weights[term] += n * weight
+        for term, weight in weights.items():
+            yield SearchPosting(
+                company_id=company_id, project_id=project_id, kind=kind, object_id=pk, term=term, weight=weight,
+            )
+
+
+def _bulk_create(postings: Iterable[SearchPosting]) -> int:
+    postings = iter(postings)
+    total = 0
+    while batch := list(islice(postings, BATCH_SIZE)):
+        SearchPosting.objects.bulk_create(batch)
+        total += len(batch)
+    return total
+
+
+def index_documents(kind: str, pks: Iterable[int]) -> None:
+    """文書の索引を入れ替える（削除 1 回 + 読み込み 1 回 + 登録）"""
+    pks = list(pks)
+    if not pks:
+        return
+    model = SOURCES[kind][0]
+    SearchPosting.objects.filter(kind=kind, object_id__in=pks).delete()
+    _bulk_create(_postings(kind, model.objects.filter(pk__in=pks)))
+
+
+def index_object(instance) -> None:
+    """保存されたモデルの索引を入れ替える（signals から呼ぶ）"""
+    kind = KIND_OF_MODEL[type(instance)]
+    index_documents(kind, [instance.pk])
+    if kind == SearchPosting.KIND_PROJECT:
+        # 会社を移した案件は、タスク・メモなどの行も移す
+        SearchPosting.objects.filter(project_id=instance.pk).exclude(company_id=instance.company_id).update(
+            company_id=instance.company_id
+        )
+
+
+def remove_documents(kind: str, pks: Iterable[int]) -> None:
+    SearchPosting.objects.filter(kind=kind, object_id__in=list(pks)).delete()
+
+
+def rebuild(company_id: int | None = None) -> int:
+    """会社（省略時は全社）の索引を作り直す。登録した行数を返す"""
+    stale = SearchPosting.objects.all()
+    if company_id is not None:
+        stale = stale.filter(company_id=company_id)
+    stale.delete()
+    total = 0
+    for kind, (model, company_path, _, _) in SOURCES.items():
+        qs = model.objects.all()
+        if company_id is not None:
+            qs = qs.filter(**{company_path: company_id})
+        total += _bulk_create(_postings(kind, qs))
+    return total
+
+
+# ------------------------------------------------------------
+# 検索
+# ------------------------------------------------------------
+@dataclass
+class SearchHit:
+    kind: str
+    kind_label: str
+    object_id: int
+    project_id: int
+    project_name: str
+    title: str
+    # (一致箇所の前, 一致箇所, 後ろ)。一致箇所が見つからなければ先頭から
+    snippet: tuple[str, str, str]
+    url: str
+    score: float
+
+
+@dataclass
+class SearchPage:
+    query: str
+    terms: list[str]
+    page: int = 1
+    hits: list[SearchHit] = field(default_factory=list)
+    has_next: bool = False
+
+
+def search(company_id: int, query: str, page: int = 1, per_page: int = PAGE_SIZE) -> SearchPage:
+    """
+    すべての検索語を含む文書を、語ごとの (重み × 珍しさ) の合計が大きい順に per_page 件。
+    クエリは語ごとの文書数 1 回 + 順位付け 1 回 + 表示内容の読み込み（種類ごとに 1 回）。
+    """
+    terms = query_terms(query)
+    page = min(max(page, 1), MAX_PAGES)
+    result = SearchPage(query=query, terms=terms, page=page)
+    if not terms or company_id is None:
+        return result
+
+    postings = SearchPosting.objects.filter(company_id=company_id, term__in=terms)
+    df = dict(postings.order_by().values_list("term").annotate(n=Count("id")))
+    if len(df) < len(terms):
+        return result  # 1 語でも索引に無ければ該当なし
+
+    # 多くの文書に出てくる語ほど軽くする
+    idf = {term: 1.0 / (1.0 + math.log(n)) for term, n in df.items()}
+    score = Sum(
+        ExpressionWrapper(
+            F("weight") * Case(*(When(term=t, then=Value(w)) for t, w in idf.items()), output_field=FloatField()),
+            output_field=FloatField(),
+        )
+    )
+    offset = (page - 1) * per_page
+    rows = list(
+        postings.values("kind", "object_id")
+        .annotate(matched=Count("id"), score=score)
+        .filter(matched=len(terms))
+        .order_by("-score", "kind", "-object_id")
+        .values_list("kind", "object_id", "score")[offset:offset + per_page + 1]
+    )
+    result.has_next = len(rows) > per_page and page < MAX_PAGES
+    result.hits = _hits(company_id, rows[:per_page], terms)
+    return result
+
+
+def _hits(company_id: int, rows: list[tuple[str, int, float]], terms: list[str]) -> list[SearchHit]:
+    by_kind: dict[str, list[int]] = {}
+    for kind, pk, _ in rows:
+        by_kind.setdefault(kind, []).append(pk)
+    docs = {}
+    for kind, pks in by_kind.items():
+        for pk, doc in _load(kind, company_id, pks).items():
+            docs[kind, pk] = doc
+    labels = dict(SearchPosting.KIND_CHOICES)
+    hits = []
+    for kind, pk, score in rows:
+        doc = docs.get((kind, pk))
+        if doc is None:
+            continue  # 索引が古い（文書が消えた・他社へ移った）
+        title, body, project_id, project_name, url = doc
+        hits.append(
+            SearchHit(
+                kind=kind,
+                kind_label=labels[kind],
+                object_id=pk,
+                project_id=project_id,
+                project_name=project_name,
+                title=title,
+                snippet=snippet(body or title, terms),
+                url=url,
+                score=score,
+            )
+        )
+    return hits
+
+
+def _load(kind: str, company_id: int, pks: list[int]) -> dict[int, tuple]:
+    """種類ごとに表示内容を読む → {ID: (見出し, 本文, 案件ID, 案件名, URL)}"""
+    if kind == SearchPosting.KIND_PROJECT:
+        rows = Project.objects.filter(pk__in=pks, company_id=company_id).values_list("id", "name", "description")
+        return {
+            pk: (name, description, pk, name, reverse("project_detail", args=[pk]))
+            for pk, name, description in rows
+        }
+    if kind == SearchPosting.KIND_TASK:
+        rows = Task.objects.filter(pk__in=pks, project__company_id=company_id).values_list(
+            "id", "name", "project_id", "project__name"
+        )
+        return {
+            pk: (name, "", project_id, project_name, reverse("project_detail", args=[project_id]))
+            for pk, name, project_id, project_name in rows
+        }
+    if kind == SearchPosting.KIND_MEMO:
+        rows = Memo.objects.filter(pk__in=pks, project__company_id=company_id).values_list(
+            "id", "content", "project_id", "project__name"
+        )
+        return {
+            pk: (
+                "共有メモ", content, project_id, project_name,
+                reverse("project_detail", args=[project_id]) + f"#memo-{pk}",
+            )
+            for pk, content, project_id, project_name in rows
+        }
+    rows = ChecklistItem.objects.filter(pk__in=pks, checklist__project__company_id=company_id).values_list(
+        "id", "title", "checklist__title", "checklist__project_id", "checklist__project__name"
+    )
+    return {
+        pk: (
+            f"{checklist_title} / {title}" if checklist_title else title, title, project_id, project_name,
+            reverse("project_detail", args=[project_id]),
+        )
+        for pk, title, checklist_title, project_id, project_name in rows
+    }
+
+
+def snippet(text: str, terms: list[str], width: int = SNIPPET_CHARS) -> tuple[str, str, str]:
+    """本文のうち最初に検索語が出てくるあたりを width 文字ほど切り出す（NFKC で揃えた本文から）"""
+    text = unicodedata.normalize("NFKC", text or "")
+    lowered = text.lower()
+    found = [(i, term) for term in terms if (i := lowered.find(term)) >= 0]
+    if not found:
+        return (text[:width] + ("…" if len(text) > width else ""), "", "")
+    start, term = min(found)
+    end = start + len(term)
+    head = max(0, start - width // 3)
+    tail = min(len(text), head + width)
+    return (
+        ("…" if head > 0 else "") + text[head:start],
+        text[start:end],
+        text[end:tail] + ("…" if tail < len(text) else ""),
+    )
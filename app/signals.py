@@ -0,0 +1,381 @@
+# app/signals.py
+"""
+モデル変更に連動する処理（AppConfig.ready() で読み込む）
+"""
+
+from __future__ import annotations
+
+from django.contrib.auth import get_user_model
+from django.db.models import Count, Q, QuerySet
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .models import Checklist, ChecklistItem, Company, Memo, MemoMention, Project, Task
+from . import company_stats, dashboard, mentions, project_rollup, search, task_closure, task_feed
+
+
+def _deleted_directly(origin, model) -> bool:
+    """
+    削除の起点が model 自身か（案件や会社の削除に巻き込まれたカスケードではないか）。
+    カスケード時は親ごと消えるので、版数や墓標を残す意味がない。
+    """
+    if isinstance(origin, QuerySet):
+        return origin.model is model
+    return isinstance(origin, model)
+
+
+# ------------------------------------------------------------
+# タスク（ガント用の版数・墓標）
+# ------------------------------------------------------------
+@receiver(post_save, sender=Task)
+def task_saved(sender, instance: Task, raw=False, **kwargs):
+    if raw:
+        return
+    task_feed.bump_task_version(instance.project_id, [instance.pk])
+
+
+@receiver(pre_delete, sender=Task)
+def task_pre_delete(sender, instance: Task, origin=None, **kwargs):
+    # 削除後は中間テーブルが消えるので、依存線を失う後続タスクを先に控えておく
+    if _deleted_directly(origin, Task):
+        instance._dependent_ids = list(instance.dependents.values_list("id", flat=True))
+
+
+@receiver(post_delete, sender=Task)
+def task_deleted(sender, instance: Task, origin=None, **kwargs):
+    if not _deleted_directly(origin, Task):
+        return
+    task_feed.record_task_deletion(
+        instance.project_id, instance.pk, getattr(instance, "_dependent_ids", ())
+    )
+
+
+@receiver(m2m_changed, sender=Task.dependencies.through)
+def task_dependencies_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == "pre_clear" and reverse:
+        # dependents.clear() は post_clear に pk_set が来ないので先に控えておく
+        instance._cleared_dependent_ids = list(instance.dependents.values_list("id", flat=True))
+        return
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if action == "post_clear" and reverse:
+        pk_set = getattr(instance, "_cleared_dependent_ids", ())
+    if not reverse:
+        # instance.dependencies が変わった → 依存線は instance 側に載っている
+        task_feed.bump_task_version(instance.project_id, [instance.pk])
+    elif pk_set:
+        # instance.dependents 側から変更された → 相手側タスクの依存線が変わった
+        task_feed.bump_task_version(instance.project_id, pk_set)
+
+
+# ------------------------------------------------------------
+# タスク依存の閉包テーブル
+# ------------------------------------------------------------
+@receiver(m2m_changed, sender=Task.dependencies.through)
+def task_closure_on_dependencies(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == "post_add":
+        for other in pk_set or ():
+            pred, succ = (instance.pk, other) if reverse else (other, instance.pk)
+            task_closure.add_edge(instance.project_id, pred, succ)
+    elif action in ("post_remove", "post_clear"):
+        if not reverse:
+            task_closure.dependencies_removed(instance.pk)
+            return
+        # instance.dependents から外された → instance より上流 × 外れた後続より下流
+        if action == "post_clear":
+            pk_set = getattr(instance, "_cleared_dependent_ids", ())
+        task_closure.dependents_removed(instance.pk, pk_set or ())
+
+
+@receiver(pre_delete, sender=Task)
+def task_closure_pre_delete(sender, instance: Task, origin=None, **kwargs):
+    # タスク自身の行はカスケードで消えるが、このタスク経由でつながっていた組は計算し直す
+    if _deleted_directly(origin, Task):
+        instance._closure_ancestors = task_closure.ancestor_ids(instance.pk)
+        instance._closure_descendants = task_closure.descendant_ids(instance.pk)
+
+
+@receiver(post_delete, sender=Task)
+def task_closure_post_delete(sender, instance: Task, origin=None, **kwargs):
+    if not _deleted_directly(origin, Task):
+        return
+    task_closure.remove_paths(
+        getattr(instance, "_closure_ancestors", ()),
+        getattr(instance, "_closure_descendants", ()),
+    )
+
+
+# ------------------------------------------------------------
+# ダッシュボードの会社ごとの集計（変更前の状態を pre_save で控え、差分を post_save で足す）
+# ------------------------------------------------------------
+STATS_TASK_FIELDS = {"project", "project_id", "end_date", "progress"}
+ROLLUP_TASK_FIELDS = {"project", "project_id", "start_date", "end_date", "progress"}
+
+
+def _touches(update_fields, fields) -> bool:
+    return update_fields is None or bool(fields & set(update_fields))
+
+
+def _company_of_task(task: Task) -> int | None:
+    if Task.project.is_cached(task):
+        return task.project.company_id
+    return Project.objects.filter(pk=task.project_id).values_list("company_id", flat=True).first()
+
+
+def _company_of_memo(memo: Memo) -> int | None:
+    if Memo.project.is_cached(memo):
+        return memo.project.company_id
+    return Project.objects.filter(pk=memo.project_id).values_list("company_id", flat=True).first()
+
+
+@receiver(pre_save, sender=Task)
+def task_pre_save_snapshot(sender, instance: Task, raw=False, update_fields=None, **kwargs):
+    # 会社の集計と案件の集計が使う変更前の状態（1 回だけ読む）
+    instance._saved_state = None
+    if raw or instance.pk is None or not _touches(update_fields, STATS_TASK_FIELDS | ROLLUP_TASK_FIELDS):
+        return
+    instance._saved_state = (
+        Task.objects.filter(pk=instance.pk)
+        .values_list("project_id", "project__company_id", "start_date", "end_date", "progress")
+        .first()
+    )
+
+
+@receiver(post_save, sender=Task)
+def task_stats_saved(sender, instance: Task, created=False, raw=False, update_fields=None, **kwargs):
+    if raw or not _touches(update_fields, STATS_TASK_FIELDS):
+        return
+    saved = getattr(instance, "_saved_state", None)
+    before = (saved[1], saved[3], saved[4]) if saved else None
+    after_company = _company_of_task(instance)
+    after = (instance.end_date, instance.progress)
+    if before and before[0] != after_company:
+        company_stats.tasks_changed(before[0], before=[before[1:]])
+        company_stats.tasks_changed(after_company, after=[after])
+    else:
+        company_stats.tasks_changed(after_company, before=[before[1:]] if before else [], after=[after])
+
+
+@receiver(post_delete, sender=Task)
+def task_stats_deleted(sender, instance: Task, origin=None, **kwargs):
+    # 案件ごとの削除は案件側でまとめて数え直す
+    if _deleted_directly(origin, Task):
+        company_stats.tasks_changed(_company_of_task(instance), before=[(instance.end_date, instance.progress)])
+
+
+@receiver(pre_save, sender=Project)
+def project_stats_pre_save(sender, instance: Project, raw=False, update_fields=None, **kwargs):
+    if raw or instance.pk is None or not _touches(update_fields, {"status", "company", "company_id"}):
+        return
+    instance._stats_before = Project.objects.filter(pk=instance.pk).values_list("company_id", "status").first()
+
+
+@receiver(post_save, sender=Project)
+def project_stats_saved(sender, instance: Project, raw=False, update_fields=None, **kwargs):
+    if raw or not _touches(update_fields, {"status", "company", "company_id"}):
+        return
+    before = getattr(instance, "_stats_before", None)
+    instance._stats_before = None
+    if before and before[0] != instance.company_id:
+        # 会社をまたいだ移動はタスクごと動くので両方を数え直す
+        company_stats.refresh(before[0])
+        company_stats.refresh(instance.company_id)
+        return
+    company_stats.project_status_changed(instance.company_id, before[1] if before else None, instance.status)
+
+
+@receiver(post_delete, sender=Project)
+def project_stats_deleted(sender, instance: Project, origin=None, **kwargs):
+    # タスクもカスケードで消えているので数え直す（会社ごとの削除なら集計行も消えるので何もしない）
+    if _deleted_directly(origin, Project):
+        company_stats.refresh(instance.company_id)
+
+
+# ------------------------------------------------------------
+# ダッシュボードのキャッシュ（会社ごと。版数を進めて無効にする）
+# ------------------------------------------------------------
+@receiver(post_save, sender=Task)
+def task_dashboard_saved(sender, instance: Task, raw=False, **kwargs):
+    if not raw:
+        dashboard.invalidate(_company_of_task(instance))
+
+
+@receiver(post_delete, sender=Task)
+def task_dashboard_deleted(sender, instance: Task, origin=None, **kwargs):
+    if _deleted_directly(origin, Task):
+        dashboard.invalidate(_company_of_task(instance))
+
+
+@receiver(post_save, sender=Memo)
+def memo_dashboard_saved(sender, instance: Memo, raw=False, **kwargs):
+    if not raw:
+        dashboard.invalidate(_company_of_memo(instance))
+
+
+@receiver(post_delete, sender=Memo)
+def memo_dashboard_deleted(sender, instance: Memo, origin=None, **kwargs):
+    if _deleted_directly(origin, Memo):
+        dashboard.invalidate(_company_of_memo(instance))
+
+
+@receiver(post_save, sender=Project)
+def project_dashboard_saved(sender, instance: Project, raw=False, **kwargs):
+    if not raw:
+        dashboard.invalidate(instance.company_id)
+
+
+@receiver(post_delete, sender=Project)
+def project_dashboard_deleted(sender, instance: Project, origin=None, **kwargs):
+    # 案件のタスク・メモはカスケードで消えるので、ここでまとめて 1 回だけ無効にする
+    if _deleted_directly(origin, Project):
+        dashboard.invalidate(instance.company_id)
+
+
+# ------------------------------------------------------------
+# メンションの未読数
+# ------------------------------------------------------------
+@receiver(m2m_changed, sender=Memo.mentions.through)
+def memo_mentions_added(sender, instance, action, reverse, pk_set, **kwargs):
+    # 追加は中間テーブルへの bulk_create なので m2m_changed で数える（pk_set は新しく入った分だけ）
+    if action != "post_add" or not pk_set:
+        return
+    if reverse:
+        mentions.add_unread(instance.pk, len(pk_set))
+    else:
+        for user_id in pk_set:
+            mentions.add_unread(user_id, 1)
+
+
+@receiver(post_save, sender=MemoMention)
+def memo_mention_saved(sender, instance: MemoMention, created=False, raw=False, **kwargs):
+    # 管理画面のインラインなど、中間テーブルの行を直接保存した場合
+    if created and not raw and instance.read_at is None:
+        mentions.add_unread(instance.user_id, 1)
+
+
+@receiver(post_delete, sender=MemoMention)
+def memo_mention_deleted(sender, instance: MemoMention, origin=None, **kwargs):
+    # remove / clear / メモの削除はいずれも中間テーブルの行削除として届く。
+    # 利用者（1 人・まとめて）や会社の削除では宛先ごと消え、集計行も先に消えているので数えない
+    # （数え直すと消える利用者の集計行を作ってしまう）
+    if instance.read_at is None and not (
+        _deleted_directly(origin, get_user_model()) or _deleted_directly(origin, Company)
+    ):
+        mentions.add_unread(instance.user_id, -1)
+
+
+# ------------------------------------------------------------
+# 案件一覧用の集計（タスク数・工期で重み付けした進捗・チェック項目の完了数・最終更新日時）
+# ------------------------------------------------------------
+ROLLUP_ITEM_FIELDS = {"checklist", "checklist_id", "is_done"}
+
+
+def _project_of_item(item: ChecklistItem) -> int | None:
+    if ChecklistItem.checklist.is_cached(item):
+        return item.checklist.project_id
+    return Checklist.objects.filter(pk=item.checklist_id).values_list("project_id", flat=True).first()
+
+
+@receiver(post_save, sender=Task)
+def task_rollup_saved(sender, instance: Task, created=False, raw=False, **kwargs):
+    if raw:
+        return
+    saved = getattr(instance, "_saved_state", None)
+    after = (instance.start_date, instance.end_date, instance.progress)
+    if saved and saved[0] != instance.project_id:
+        project_rollup.tasks_changed(saved[0], before=[saved[2:]])
+        project_rollup.tasks_changed(instance.project_id, after=[after])
+    elif saved or created:
+        project_rollup.tasks_changed(instance.project_id, before=[saved[2:]] if saved else [], after=[after])
+    else:
+        project_rollup.touch(instance.project_id)
+
+
+@receiver(post_delete, sender=Task)
+def task_rollup_deleted(sender, instance: Task, origin=None, **kwargs):
+    if _deleted_directly(origin, Task):
+        project_rollup.tasks_changed(
+            instance.project_id, before=[(instance.start_date, instance.end_date, instance.progress)]
+        )
+
+
+@receiver(pre_save, sender=ChecklistItem)
+def checklist_item_rollup_pre_save(sender, instance: ChecklistItem, raw=False, update_fields=None, **kwargs):
+    instance._saved_state = None
+    if raw or instance.pk is None or not _touches(update_fields, ROLLUP_ITEM_FIELDS):
+        return
+    instance._saved_state = (
+        ChecklistItem.objects.filter(pk=instance.pk)
+        .values_list("checklist_id", "checklist__project_id", "is_done")
+        .first()
+    )
+
+
+@receiver(post_save, sender=ChecklistItem)
+def checklist_item_rollup_saved(sender, instance: ChecklistItem, created=False, raw=False, **kwargs):
+    # チェックリストの項目数・完了数と案件の集計を足し引きする
+    if raw:
+        return
+    saved = getattr(instance, "_saved_state", None)
+    project_id = _project_of_item(instance)
+    done = int(instance.is_done)
+    if created or (saved and saved[0] != instance.checklist_id):
+        if saved:
+            project_rollup.checklist_items_changed(saved[0], saved[1], total=-1, done=-saved[2])
+        project_rollup.checklist_items_changed(instance.checklist_id, project_id, total=1, done=done)
+    elif saved:
+        project_rollup.checklist_items_changed(instance.checklist_id, project_id, done=done - saved[2])
+    else:
+        project_rollup.touch(project_id)
+
+
+@receiver(post_delete, sender=ChecklistItem)
+def checklist_item_rollup_deleted(sender, instance: ChecklistItem, origin=None, **kwargs):
+    # チェックリストごとの削除はチェックリスト側でまとめて引く
+    if _deleted_directly(origin, ChecklistItem):
+        project_rollup.checklist_items_changed(
+            instance.checklist_id, _project_of_item(instance), total=-1, done=-int(instance.is_done)
+        )
+
+
+@receiver(pre_delete, sender=Checklist)
+def checklist_rollup_pre_delete(sender, instance: Checklist, origin=None, **kwargs):
+    if _deleted_directly(origin, Checklist):
+        instance._rollup_items = instance.items.aggregate(total=Count("id"), done=Count("id", filter=Q(is_done=True)))
+
+
+@receiver(post_delete, sender=Checklist)
+def checklist_rollup_deleted(sender, instance: Checklist, origin=None, **kwargs):
+    items = getattr(instance, "_rollup_items", None)
+    if items is not None:
+        project_rollup.checklist_items_changed(None, instance.project_id, total=-items["total"], done=-items["done"])
+
+
+@receiver(post_save, sender=Memo)
+def memo_rollup_saved(sender, instance: Memo, raw=False, **kwargs):
+    if not raw:
+        project_rollup.touch(instance.project_id)
+
+# ------------------------------------------------------------
+# 全文検索の索引（文書ごとに入れ替える）
+# ------------------------------------------------------------
+@receiver(post_save, sender=Project)
+@receiver(post_save, sender=Task)
+@receiver(post_save, sender=Memo)
+@receiver(post_save, sender=ChecklistItem)
+def search_document_saved(sender, instance, raw=False, update_fields=None, **kwargs):
+    # チェックの ON/OFF など、本文に関係のない項目だけの保存では索引し直さない
+    if raw or not _touches(update_fields, search.INDEXED_FIELDS[search.KIND_OF_MODEL[sender]]):
+        return
+    search.index_object(instance)
+
+
+@receiver(post_delete, sender=Task)
+@receiver(post_delete, sender=Memo)
+@receiver(post_delete, sender=ChecklistItem)
+def search_document_deleted(sender, instance, origin=None, **kwargs):
+    # 案件・会社ごとの削除なら索引の行もカスケードで消えている（案件自身の削除も同じ）
+    if not isinstance(origin, (Project, Company)) and not (
+        isinstance(origin, QuerySet) and origin.model in (Project, Company)
+    ):
+        search.remove_documents(search.KIND_OF_MODEL[sender], [instance.pk])
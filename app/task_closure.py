@@ -0,0 +1,205 @@
+# app/task_closure.py
+"""
+タスク依存の推移閉包テーブル (TaskClosure) の維持と問い合わせ
+
+- 依存の追加: 上流側の閉包 × 下流側の閉包 から新しい組を作る（INSERT … SELECT 1 回と段数の UPDATE 1 回）
+- 依存の削除・タスク削除: 影響を受けうる組（上流集合 × 下流集合）のうち、
+  外された依存を通る経路しか無かった組だけを 1 回の DELETE で消し、残った組の段数を 1 回の UPDATE で直す
+
+どちらも DB の中で集合として処理するので、閉包の行をアプリ側に読み込まない。
+問い合わせはすべて (ancestor, descendant) / (descendant, ancestor) 索引の 1 クエリ。
+
+依存の削除で残る組の判定:
+外された経路がすべて「上流集合 U のどれか → 下流集合 D のどれか」なら、U × D の外の組は経路を失っていない。
+U × D の組 (a, d) に別の経路があれば、その経路には U から U の外へ出る依存 x → y が必ずあり、
+a ⇝ x（x は U の中）と y ⇝ d（y は U の外）は影響を受けていない組なので、閉包の行をそのまま使って確かめられる。
+"""
+
+from __future__ import annotations
+
+from typing import Iterable
+
+from django.db import connection, transaction
+
+from .models import Task, TaskClosure
+
+
+# ------------------------------------------------------------
+# 問い合わせ
+# ------------------------------------------------------------
+def descendant_ids(task_id: int) -> set[int]:
+    """task_id の下流（後続に連なる）タスクID"""
+    return set(TaskClosure.objects.filter(ancestor_id=task_id).values_list("descendant_id", flat=True))
+
+
+def ancestor_ids(task_id: int) -> set[int]:
+    """task_id の上流（先行に連なる）タスクID"""
+    return set(TaskClosure.objects.filter(descendant_id=task_id).values_list("ancestor_id", flat=True))
+
+
+def is_reachable(ancestor_id: int, descendant_id: int) -> bool:
+    """ancestor_id から依存をたどって descendant_id に到達できるか"""
+    return TaskClosure.objects.filter(ancestor_id=ancestor_id, descendant_id=descendant_id).exists()
+
+
+def impacted_tasks(task_id: int):
+    """task_id が遅れたときに影響を受けるタスク（近い順）"""
+    return (
+        TaskClosure.objects.filter(ancestor_id=task_id)
+        .select_related("descendant")
+        .order_by("depth", "descendant__start_date", "descendant_id")
+    )
+
+
+def cyclic_dependencies(task_id: int, dependency_ids: Iterable[int]) -> set[int]:
+    """task_id の先行に dependency_ids を設定すると循環になるもの（自分自身か下流）"""
+    dependency_ids = set(dependency_ids)
+    cyclic = {task_id} & dependency_ids
+    cyclic |= set(
+        TaskClosure.objects.filter(ancestor_id=task_id, descendant_id__in=dependency_ids)
+        .values_list("descendant_id", flat=True)
+    )
+    return cyclic
+
+
+# ------------------------------------------------------------
+# 維持
+# ------------------------------------------------------------
+def _names() -> dict[str, str]:
+    """SQL に埋め込む表名（DB ごとの引用符つき）"""
+    qn = connection.ops.quote_name
+    return {
+        "closure": qn(TaskClosure._meta.db_table),
+        "edge": qn(Task.dependencies.through._meta.db_table),
+    }
+
+
+def _placeholders(ids) -> str:
+    return ", ".join(["%s"] * len(ids))
+
+
+def add_edge(project_id: int, pred_id: int, succ_id: int) -> None:
+    """依存 pred → succ が追加されたときに閉包へ新しい組を足す（既存の組は段数が縮むときだけ更新）"""
+    # up: pred とその上流（pred からの段数）、down: succ とその下流（succ までの段数）
+    pairs = """
+        WITH up (task_id, depth) AS (
+            SELECT ancestor_id, depth FROM {closure} WHERE descendant_id = %s
+            UNION ALL SELECT %s, 0
+        ),
+        down (task_id, depth) AS (
+            SELECT descendant_id, depth FROM {closure} WHERE ancestor_id = %s
+            UNION ALL SELECT %s, 0
+        )
+    """
+    params = [pred_id, pred_id, succ_id, succ_id]
+    shorter = """
+        (SELECT up.depth + 1 + down.depth FROM up, down
+          WHERE up.task_id = {closure}.ancestor_id AND down.task_id = {closure}.descendant_id)
+    """
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            (pairs + "UPDATE {closure} SET depth = " + shorter + """
+              WHERE ancestor_id IN (SELECT task_id FROM up)
+                AND descendant_id IN (SELECT task_id FROM down)
+                AND depth > """ + shorter).format(**_names()),
+            params,
+        )
+        cursor.execute(
+            (pairs + """
+            INSERT INTO {closure} (project_id, ancestor_id, descendant_id, depth)
+            SELECT %s, up.task_id, down.task_id, up.depth + 1 + down.depth FROM up, down
+             WHERE up.task_id <> down.task_id
+               AND NOT EXISTS (
+                   SELECT 1 FROM {closure} c
+                    WHERE c.ancestor_id = up.task_id AND c.descendant_id = down.task_id
+               )
+            """).format(**_names()),
+            params + [project_id],
+        )
+
+
+def remove_paths(upstream: Iterable[int], downstream: Iterable[int]) -> None:
+    """
+    依存が外された後で、上流集合 × 下流集合の組のうち到達できなくなったものを消し、残る組の段数を直す。
+    呼び出し側は「外された依存を通る経路はすべて upstream から downstream へ向かう」ように集合を渡す
+    （upstream は変更前の閉包から取る。両者は重ならない）。
+    """
+    upstream, downstream = sorted(set(upstream)), sorted(set(downstream))
+    if not upstream or not downstream:
+        return
+    affected = TaskClosure.objects.filter(ancestor_id__in=upstream, descendant_id__in=downstream)
+    # U から U の外へ出る依存（経路が残るなら必ずどれかを通る）
+    exits = list(
+        Task.dependencies.through.objects.filter(to_task_id__in=upstream)
+        .exclude(from_task_id__in=upstream)
+        .values_list("pk", flat=True)
+    )
+    if not exits:
+        affected.delete()
+        return
+
+    # 組 (a, d) について、出口の依存 x → y を通る最短の段数 a ⇝ x → y ⇝ d（a = x・y = d なら 0 段）
+    via_exit = """
+        FROM {edge} e
+        LEFT JOIN {closure} l ON l.ancestor_id = {closure}.ancestor_id AND l.descendant_id = e.to_task_id
+        LEFT JOIN {closure} r ON r.ancestor_id = e.from_task_id AND r.descendant_id = {closure}.descendant_id
+        WHERE e.id IN ({exits})
+          AND (l.id IS NOT NULL OR e.to_task_id = {closure}.ancestor_id)
+          AND (r.id IS NOT NULL OR e.from_task_id = {closure}.descendant_id)
+    """
+    names = _names() | {"exits": _placeholders(exits)}
+    where = "WHERE ancestor_id IN ({}) AND descendant_id IN ({})".format(
+        _placeholders(upstream), _placeholders(downstream)
+    )
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            ("DELETE FROM {closure} " + where + " AND NOT EXISTS (SELECT 1 " + via_exit + ")").format(**names),
+            upstream + downstream + exits,
+        )
+        cursor.execute(
+            ("UPDATE {closure} SET depth = (SELECT MIN(COALESCE(l.depth, 0) + 1 + COALESCE(r.depth, 0)) "
+             + via_exit + ") " + where).format(**names),
+            exits + upstream + downstream,
+        )
+
+
+def dependencies_removed(succ_id: int) -> None:
+    """succ_id の先行が外されたとき（外した先行はすべて変更前の閉包上の上流に含まれる）"""
+    remove_paths(ancestor_ids(succ_id), {succ_id} | descendant_ids(succ_id))
+
+
+def dependents_removed(pred_id: int, succ_ids: Iterable[int]) -> None:
+    """pred_id の後続から succ_ids が外されたとき"""
+    downstream = set()
+    for succ in succ_ids:
+        downstream |= {succ} | descendant_ids(succ)
+    remove_paths({pred_id} | ancestor_ids(pred_id), downstream)
+
+
+def rebuild_project(project_id: int) -> int:
+    """
+    案件の閉包を依存関係から作り直す（一括登録・修復用）。作成した行数を返す。
+    再帰 CTE で到達できる組と最短の段数を DB の中で求めて入れ替える
+    （タスク数・依存数にかかわらず、タスク数 1 回・DELETE 1 回・INSERT … SELECT 1 回と行数の数え直し 1 回）。
+    """
+    sql = """
+        WITH RECURSIVE reach (ancestor_id, descendant_id, depth) AS (
+            SELECT e.to_task_id, e.from_task_id, 1
+              FROM {edge} e JOIN {task} t ON t.id = e.from_task_id
+             WHERE t.project_id = %s
+            UNION
+            SELECT reach.ancestor_id, e.from_task_id, reach.depth + 1
+              FROM reach JOIN {edge} e ON e.to_task_id = reach.descendant_id
+             WHERE reach.depth < %s  -- 依存が循環していても止まるように
+        )
+        INSERT INTO {closure} (project_id, ancestor_id, descendant_id, depth)
+        SELECT %s, ancestor_id, descendant_id, MIN(depth) FROM reach
+         WHERE ancestor_id <> descendant_id
+         GROUP BY ancestor_id, descendant_id
+    """
+    names = _names() | {"task": connection.ops.quote_name(Task._meta.db_table)}
+    with transaction.atomic(), connection.cursor() as cursor:
+        TaskClosure.objects.filter(project_id=project_id).delete()
+        n_tasks = Task.objects.filter(project_id=project_id).count()
+        cursor.execute(sql.format(**names), [project_id, n_tasks, project_id])
+    return TaskClosure.objects.filter(project_id=project_id).count()
@@ -0,0 +1,387 @@
+# app/task_feed.py
+"""
+ガントチャート用タスクデータの変更フィード
+
+案件ごとに「工程データ版数」(Project.task_version) を持ち、タスクや依存関係が
+変わるたびに +1 する。変更されたタスクにはその時点の版数を Task.version として刻み、
+削除されたタスクは TaskTombstone として残す。
+
+これにより tasks.json で
+  - ETag / Last-Modified による 304 応答
+  - ?since=<版数> による差分取得（削除は墓標で通知）
+ができるようになる。
+
+全件の JSON はモデルインスタンスを作らず values_list + iterator で読み、
+StreamingHttpResponse で少しずつ書き出す。大規模案件向けには from/to の期間窓と
+キーセットページングでも取得でき、キーを繰り返さない列指向形式（gzip 済みでキャッシュ）も選べる。
+"""
+
+from __future__ import annotations
+
+import json
+from datetime import date
+from itertools import groupby
+from operator import itemgetter
+from typing import Iterable, Iterator
+
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Count, F, Max, Min, Q
+from django.utils import timezone
+from django.utils.text import compress_string
+
+from .models import Project, Task, TaskTombstone
+
+
+# ------------------------------------------------------------
+# 版数の更新
+# ------------------------------------------------------------
+def bump_task_version(project_id: int, task_ids: Iterable[int] = ()) -> int | None:
+    """
+    案件の工程データ版数を +1 し、指定タスクに新しい版数を刻む。
+    案件が既に存在しない（削除中など）場合は None を返す。
+    """
+    task_ids = [pk for pk in set(task_ids) if pk is not None]
+    with transaction.atomic():
+        # UPDATE で行ロックを取ってから読むので、同時更新でも版数は重複しない
+        updated = Project.objects.filter(pk=project_id).update(
+            task_version=F("task_version") + 1,
+            tasks_modified_at=timezone.now(),
+        )
+        if not updated:
+            return None
+        version = Project.objects.filter(pk=project_id).values_list("task_version", flat=True).get()
+        if task_ids:
+            Task.objects.filter(project_id=project_id, pk__in=task_ids).update(version=version)
+    return version
+
+
+def record_task_deletion(project_id: int, task_id: int, dependent_ids: Iterable[int] = ()) -> int | None:
+    """
+    タスク削除を記録する。
+    削除されたタスクの墓標を残し、依存線を失った後続タスクにも新しい版数を刻む。
+    """
+    with transaction.atomic():
+        version = bump_task_version(project_id, dependent_ids)
+        if version is not None:
+            TaskTombstone.objects.create(project_id=project_id, task_id=task_id, version=version)
+    return version
+
+
+# ------------------------------------------------------------
+# 条件付きリクエスト / 差分取得
+# ------------------------------------------------------------
+def task_etag(project: Project, variant: str = "") -> str:
+    """tasks.json の ETag（案件ID + 工程データ版数。形式ごとに variant で区別する）"""
+    suffix = f"-{variant}" if variant else ""
+    return f'"tasks-{project.pk}-{project.task_version}{suffix}"'
+
+
+def parse_cursor(value: str) -> int:
+    """?since= の値を版数として解釈する（不正なら ValueError）"""
+    cursor = int(value)
+    if cursor < 0:
+        raise ValueError("cursor must be >= 0")
+    return cursor
+
+
+# ------------------------------------------------------------
+# シリアライズ（値ベース / ストリーミング）
+# ------------------------------------------------------------
+# タスク行の読み出し単位（サーバー側カーソルで少しずつ読む）
+STREAM_CHUNK_SIZE = 2000
+
+TASK_FIELDS = ("id", "name", "start_date", "end_date", "progress")
+
+
+def _dependency_lists(project: Project, task_ids: Iterable[int] | None = None, **filters) -> dict[int, list[int]]:
+    """
+    中間テーブルを 1 クエリ（タスクID順）で読み、{タスクID: [依存先ID, ...]} を作る。
+    モデルインスタンスも prefetch も使わないので、1 万件規模でも軽い。
+    filters はタスク側の絞り込み条件（例: version__gt=3）、task_ids は対象タスクの限定。
+    """
+    through = Task.dependencies.through
+    edges = through.objects.filter(from_task__project=project, **{f"from_task__{k}": v for k, v in filters.items()})
+    if task_ids is not None:
+        edges = edges.filter(from_task_id__in=task_ids)
+    rows = (
+        edges.order_by("from_task_id", "to_task_id")
+        .values_list("from_task_id", "to_task_id")
+        .iterator(chunk_size=STREAM_CHUNK_SIZE)
+    )
+    return {
+        task_id: [dep_id for _, dep_id in group]
+        for task_id, group in groupby(rows, key=itemgetter(0))
+    }
+
+
+def _dependency_map(project: Project, task_ids: Iterable[int] | None = None, **filters) -> dict[int, str]:
+    """_dependency_lists() の依存先を Frappe Gantt 形式（"依存先ID,依存先ID"）にしたもの"""
+    return {
+        task_id: ",".join(map(str, dep_ids))
+        for task_id, dep_ids in _dependency_lists(project, task_ids, **filters).items()
+    }
+
+
+def iter_task_dicts(project: Project, **filters) -> Iterator[dict]:
+    """Frappe Gantt ライブラリが要求する形式のタスクを 1 件ずつ返す"""
+    deps = _dependency_map(project, **filters)
+    rows = (
+        Task.objects.filter(project=project, **filters)
+        .order_by("start_date", "end_date", "id")  # ガントチャート表示に適した順序
+        .values_list(*TASK_FIELDS)
+        .iterator(chunk_size=STREAM_CHUNK_SIZE)
+    )
+    for row in rows:
+        yield _task_dict(row, deps)
+
+
+def _task_dict(row: tuple, deps: dict[int, str]) -> dict:
+    pk, name, start, end, progress = row
+    return {
+        "id": str(pk),
+        "name": name or "",  # タスク名 (空の場合も考慮)
+        "start": start.isoformat() if start else None,  # 開始日 (ISO形式)
+        "end": end.isoformat() if end else None,  # 終了日 (ISO形式)
+        "progress": int(progress or 0),  # 進捗率 (整数)
+        "dependencies": deps.get(pk, ""),  # 依存タスクID (カンマ区切り文字列)
+    }
+
+
+def iter_task_json(project: Project, **filters) -> Iterator[bytes]:
+    """
+    タスク一覧の JSON 配列を少しずつ書き出す（StreamingHttpResponse 用）。
+    形式は JsonResponse(list, safe=False) と同じ（依存先はID順に並ぶ）。
+    """
+    encoder = DjangoJSONEncoder()
+    yield b"["
+    buf: list[str] = []
+    first = True
+    for obj in iter_task_dicts(project, **filters):
+        buf.append(encoder.encode(obj) if first else ", " + encoder.encode(obj))
+        first = False
+        if len(buf) >= STREAM_CHUNK_SIZE:
+            yield "".join(buf).encode()
+            buf.clear()
+    if buf:
+        yield "".join(buf).encode()
+    yield b"]"
+
+
+def build_delta(project: Project, since: int) -> dict:
+    """
+    版数 since より後に作成・変更・削除されたタスクだけを返す。
+    変更タスクの dependencies は常に「その時点の全依存先」なので、
+    クライアントは該当タスクの依存線を丸ごと置き換えればよい。
+    """
+    deleted = (
+        TaskTombstone.objects.filter(project=project, version__gt=since)
+        .order_by("version", "id")
+        .values_list("task_id", flat=True)
+    )
+    return {
+        "version": project.task_version,
+        "since": since,
+        "tasks": list(iter_task_dicts(project, version__gt=since)),
+        "deleted": [str(pk) for pk in deleted],
+    }
+
+
+# ------------------------------------------------------------
+# 期間窓 + キーセットページング（大規模案件の表示範囲だけ取得）
+# ------------------------------------------------------------
+DEFAULT_PAGE_SIZE = 500
+MAX_PAGE_SIZE = 2000
+
+
+def encode_page_cursor(start: date, end: date, pk: int) -> str:
+    """並び順 (開始日, 終了日, ID) 上の位置を表すカーソル"""
+    return f"{start.isoformat()}_{end.isoformat()}_{pk}"
+
+
+def decode_page_cursor(value: str) -> tuple[date, date, int]:
+    """encode_page_cursor() の逆（不正なら ValueError）"""
+    start, end, pk = value.split("_")
+    return date.fromisoformat(start), date.fromisoformat(end), int(pk)
+
+
+def _after(cursor: tuple[date, date, int]) -> Q:
+    # (start_date, end_date, id) > cursor を索引順で表す
+    start, end, pk = cursor
+    return (
+        Q(start_date__gt=start)
+        | Q(start_date=start, end_date__gt=end)
+        | Q(start_date=start, end_date=end, id__gt=pk)
+    )
+
+
+def task_span_meta(project: Project) -> dict:
+    """
+    案件全体の期間と件数（クライアントが表示範囲を決めるため）。
+    total は期間窓で返す対象（開始日・終了日が揃ったタスク）の件数で、それ以外は undated に数える。
+    """
+    dated = Q(start_date__isnull=False, end_date__isnull=False)
+    agg = Task.objects.filter(project=project).aggregate(
+        min_start=Min("start_date"),
+        max_end=Max("end_date"),
+        total=Count("id", filter=dated),
+        undated=Count("id", filter=~dated),
+    )
+    return {
+        "min_start": agg["min_start"].isoformat() if agg["min_start"] else None,
+        "max_end": agg["max_end"].isoformat() if agg["max_end"] else None,
+        "total": agg["total"],
+        "undated": agg["undated"],
+    }
+
+
+def _window_rows(
+    project: Project,
+    date_from: date | None,
+    date_to: date | None,
+    after: tuple[date, date, int] | None,
+    limit: int,
+) -> tuple[list[tuple], str | None, int]:
+    """期間窓の 1 ページ分の行・次ページのカーソル・実際の件数上限"""
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    qs = Task.objects.filter(project=project, start_date__isnull=False, end_date__isnull=False)
+    if date_from is not None:
+        qs = qs.filter(end_date__gte=date_from)
+    if date_to is not None:
+        qs = qs.filter(start_date__lte=date_to)
+    if after is not None:
+        qs = qs.filter(_after(after))
+    rows = list(qs.order_by("start_date", "end_date", "id").values_list(*TASK_FIELDS)[: limit + 1])
+
+    if len(rows) <= limit:
+        return rows, None, limit
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_page_cursor(last[2], last[3], last[0]), limit
+
+
+def _window_meta(project: Project, date_from: date | None, date_to: date | None, limit: int) -> dict:
+    return {
+        **task_span_meta(project),
+        "from": date_from.isoformat() if date_from else None,
+        "to": date_to.isoformat() if date_to else None,
+        "limit": limit,
+    }
+
+
+def build_window(
+    project: Project,
+    date_from: date | None = None,
+    date_to: date | None = None,
+    after: tuple[date, date, int] | None = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+) -> dict:
+    """
+    [date_from, date_to] に掛かるタスクを (開始日, 終了日, ID) 順に limit 件返す。
+    日付未設定のタスクはガントに描けないので対象外。
+    続きがあれば next に次ページのカーソルが入る。
+    """
+    rows, next_cursor, limit = _window_rows(project, date_from, date_to, after, limit)
+    deps = _dependency_map(project, task_ids=[row[0] for row in rows]) if rows else {}
+    return {
+        "version": project.task_version,
+        "meta": _window_meta(project, date_from, date_to, limit),
+        "tasks": [_task_dict(row, deps) for row in rows],
+        "next": next_cursor,
+    }
+
+
+# ------------------------------------------------------------
+# 列指向形式（?format=columnar / Accept: application/vnd.fieldnote.tasks+json）
+# ------------------------------------------------------------
+# キーの繰り返しをなくし、項目ごとの並列配列で送る。
+#   - 日付は epoch（案件開始日、未設定ならタスクの開始日・終了日のうち最も早い日）からの日数
+#   - 依存は CSR 形式: i 番目のタスクの依存先IDは
+#     dependencies.indices[offsets[i]:offsets[i+1]]（ページをまたぐ依存も残るようIDで持つ）
+# 圧縮済み（gzip）のバイト列を工程データ版数ごとにキャッシュする。
+COLUMNAR_MEDIA_TYPE = "application/vnd.fieldnote.tasks+json"
+COLUMNAR_CACHE_TIMEOUT = 60 * 60
+
+
+def _epoch(project: Project) -> date | None:
+    """日付の基準日。タスクに日付が 1 つでもあれば None にはならない（終了日だけのタスクもあるため両方を見る）"""
+    if project.start_date is not None:
+        return project.start_date
+    agg = Task.objects.filter(project=project).aggregate(start=Min("start_date"), end=Min("end_date"))
+    return min((d for d in agg.values() if d is not None), default=None)
+
+
+def _columnar(project: Project, rows: list[tuple], deps: dict[int, list[int]]) -> dict:
+    epoch = _epoch(project)
+
+    def offset(d: date | None) -> int | None:
+        return (d - epoch).days if d is not None else None
+
+    ids, names, starts, ends, progresses = [], [], [], [], []
+    offsets, indices = [0], []
+    for pk, name, start, end, progress in rows:
+        ids.append(pk)
+        names.append(name or "")
+        starts.append(offset(start))
+        ends.append(offset(end))
+        progresses.append(int(progress or 0))
+        indices.extend(deps.get(pk, ()))
+        offsets.append(len(indices))
+    return {
+        "format": "columnar",
+        "version": project.task_version,
+        "epoch": epoch.isoformat() if epoch else None,
+        "count": len(ids),
+        "columns": {"id": ids, "name": names, "start": starts, "end": ends, "progress": progresses},
+        "dependencies": {"offsets": offsets, "indices": indices},
+    }
+
+
+def build_columnar(project: Project, window: dict | None = None) -> dict:
+    """
+    全件（window=None）または期間窓の 1 ページ（window は build_window() の引数）を列指向で返す。
+    期間窓では meta / next も build_window() と同じ意味で付く。
+    """
+    if window is None:
+        rows = list(
+            Task.objects.filter(project=project)
+            .order_by("start_date", "end_date", "id")
+            .values_list(*TASK_FIELDS)
+            .iterator(chunk_size=STREAM_CHUNK_SIZE)
+        )
+        return _columnar(project, rows, _dependency_lists(project))
+
+    date_from, date_to = window.get("date_from"), window.get("date_to")
+    rows, next_cursor, limit = _window_rows(
+        project, date_from, date_to, window.get("after"), window.get("limit", DEFAULT_PAGE_SIZE)
+    )
+    deps = _dependency_lists(project, task_ids=[row[0] for row in rows]) if rows else {}
+    data = _columnar(project, rows, deps)
+    data["meta"] = _window_meta(project, date_from, date_to, limit)
+    data["next"] = next_cursor
+    return data
+
+
+def columnar_cache_key(project: Project, window: dict | None = None) -> str:
+    key = f"tasks-columnar:{project.pk}:{project.task_version}"
+    if window:
+        after = window.get("after")
+        key += ":{}:{}:{}:{}".format(
+            window.get("date_from") or "",
+            window.get("date_to") or "",
+            encode_page_cursor(*after) if after else "",
+            window.get("limit", DEFAULT_PAGE_SIZE),
+        )
+    return key
+
+
+def get_columnar_gzip(project: Project, window: dict | None = None) -> bytes:
+    """列指向 JSON を gzip 済みのバイト列で返す（版数が変わるまでキャッシュ）"""
+    key = columnar_cache_key(project, window)
+    body = cache.get(key)
+    if body is None:
+        data = json.dumps(build_columnar(project, window), cls=DjangoJSONEncoder, separators=(",", ":"))
+        body = compress_string(data.encode())
+        cache.set(key, body, COLUMNAR_CACHE_TIMEOUT)
+    return body
@@ -0,0 +1,300 @@
+# app/task_import.py
+"""
+表計算ソフトで作った工程表（CSV / TSV）からタスクを一括登録する
+
+    タスク名, 開始日, 終了日, 進捗, 先行タスク
+    基礎工事, 2025-04-01, 2025-04-10, 0,
+    躯体工事, 2025/04/11, 2025/04/30, 0, 基礎工事
+    内装,     2025-05-01, 2025-05-20, 0, 2;基礎工事
+
+- 1 行目は見出し（日本語・英語どちらの列名でもよい。列の順序は自由）
+- 先行タスクは「ファイル内の何件目か（見出し・空行を除いて 1 始まり）」か「タスク名」を
+  , ; 、 で区切って指定する。タスク名は案件の既存タスクも参照できる
+- ファイルは 1 行ずつ読みながら検証し、すべて正しいときだけ登録する（1 件でも誤りがあれば何も登録しない）
+- 登録はタスク・依存・検索の索引をそれぞれ bulk_create でまとめて入れ、閉包テーブルは INSERT … SELECT 1 回で作るので、
+  クエリ数は行数によらない（SQLite ではバインド変数の上限で bulk_create が数百行ごとに分かれる分だけ増える）
+
+bulk_create はシグナルを送らないので、工程データ版数・閉包テーブル・会社と案件の集計（とダッシュボードのキャッシュ）・
+検索の索引はここで更新する。
+"""
+
+from __future__ import annotations
+
+import csv
+import io
+import math
+import re
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import IO, Iterable, Iterator
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Project, SearchPosting, Task
+from . import company_stats, dashboard, project_rollup, scheduling, search, task_closure, task_feed
+
+
+# 列名（小文字・空白除去後）→ 項目
+COLUMN_ALIASES = {
+    "name": ("name", "task", "タスク名", "タスク", "作業名", "工程"),
+    "start": ("start", "start_date", "開始日", "開始"),
+    "end": ("end", "end_date", "終了日", "終了"),
+    "progress": ("progress", "進捗", "進捗率", "進捗(%)", "進捗率(%)"),
+    "predecessors": ("predecessors", "dependencies", "depends", "先行タスク", "先行", "依存", "依存タスク"),
+}
+DATE_FORMATS = ("%Y-%m-%d", "%Y/%m/%d", "%Y.%m.%d")
+REF_SEPARATORS = re.compile(r"[,;、，；]")
+MAX_ERRORS = 50
+
+
+class TaskImportError(ValueError):
+    """取り込み内容に誤りがある（errors に「N 行目: ...」形式のメッセージ）"""
+
+    def __init__(self, errors: list[str]):
+        super().__init__("\n".join(errors))
+        self.errors = errors
+
+
+@dataclass
+class ImportRow:
+    line: int  # ファイル上の行番号（見出しが 1）
+    name: str
+    start: date | None
+    end: date | None
+    progress: int
+    refs: list[str] = field(default_factory=list)
+
+
+@dataclass
+class ImportResult:
+    created: int
+    dependencies: int
+    version: int | None = None
+
+
+# ------------------------------------------------------------
+# 読み込み
+# ------------------------------------------------------------
+def _normalize_header(value: str) -> str:
+    return re.sub(r"\s+", "", value or "").lower()
+
+
+def _header_map(header: list[str]) -> dict[str, int]:
+    lookup = {alias.lower(): key for key, aliases in COLUMN_ALIASES.items() for alias in aliases}
+    columns: dict[str, int] = {}
+    for i, title in enumerate(header):
+        key = lookup.get(_normalize_header(title))
+        if key and key not in columns:
+            columns[key] = i
+    if "name" not in columns:
+        raise TaskImportError(["1 行目: タスク名の列が見つかりません（見出し行が必要です）"])
+    return columns
+
+
+def _parse_date(value: str) -> date | None:
+    value = value.strip()
+    if not value:
+        return None
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    raise ValueError(f"日付を解釈できません: {value}")
+
+
+def _parse_progress(value: str) -> int:
+    value = value.strip().rstrip("%％")
+    if not value:
+        return 0
+    try:
+        number = float(value)
+    except ValueError:
+        raise ValueError(f"進捗を数値として解釈できません: {value}")
+    # inf・nan（1e999 などの桁あふれを含む）は int() で OverflowError になるので行の誤りにする
+    if not math.isfinite(number):
+        raise ValueError(f"進捗は 0〜100 で指定してください: {value}")
+    progress = int(number)
+    if not 0 <= progress <= 100:
+        raise ValueError(f"進捗は 0〜100 で指定してください: {value}")
+    return progress
+
+
+def _open_text(stream: IO, encoding: str) -> IO[str]:
+    if isinstance(stream, io.TextIOBase):
+        return stream
+    return io.TextIOWrapper(stream, encoding=encoding, newline="")
+
+
+def iter_rows(stream: IO, encoding: str = "utf-8-sig", delimiter: str | None = None) -> Iterator[ImportRow]:
+    """
+    CSV / TSV を 1 行ずつ読み ImportRow を返す（空行は飛ばす）。
+    delimiter を省略すると見出し行にタブがあれば TSV、なければ CSV とみなす。
+    行単位の誤りはまとめて TaskImportError で送出する。
+    """
+    text = _open_text(stream, encoding)
+    first = text.readline()
+    if not first.strip():
+        raise TaskImportError(["1 行目: 見出し行がありません"])
+    if delimiter is None:
+        delimiter = "\t" if "\t" in first else ","
+    reader = csv.reader(_chain_first(first, text), delimiter=delimiter)
+    columns = _header_map(next(reader))
+
+    def cell(values: list[str], key: str) -> str:
+        i = columns.get(key)
+        return values[i].strip() if i is not None and i < len(values) else ""
+
+    errors: list[str] = []
+    for values in reader:
+        line = reader.line_num
+        if not any(v.strip() for v in values):
+            continue
+        try:
+            name = cell(values, "name")
+            if not name:
+                raise ValueError("タスク名が空です")
+            if len(name) > Task._meta.get_field("name").max_length:
+                raise ValueError("タスク名が長すぎます")
+            start = _parse_date(cell(values, "start"))
+            end = _parse_date(cell(values, "end"))
+            if start and end and end < start:
+                raise ValueError("終了日が開始日より前です")
+            row = ImportRow(
+                line=line,
+                name=name,
+                start=start,
+                end=end,
+                progress=_parse_progress(cell(values, "progress")),
+                refs=[r.strip() for r in REF_SEPARATORS.split(cell(values, "predecessors")) if r.strip()],
+            )
+        except ValueError as e:
+            errors.append(f"{line} 行目: {e}")
+            if len(errors) >= MAX_ERRORS:
+                break
+            continue
+        yield row
+    if errors:
+        raise TaskImportError(errors)
+
+
+def _chain_first(first: str, rest: IO[str]) -> Iterator[str]:
+    yield first
+    yield from rest
+
+
+# ------------------------------------------------------------
+# 検証（先行タスクの解決・循環検出）
+# ------------------------------------------------------------
+def resolve_dependencies(rows: list[ImportRow], existing: dict[str, list[int]]) -> tuple[dict[int, set[int]], dict[int, set[int]]]:
+    """
+    先行タスクの参照を解決する。
+    戻り値は ({行の添字: {先行行の添字}}, {行の添字: {既存タスクID}})。
+    existing は案件の既存タスク {タスク名: [ID, ...]}。
+    """
+    by_name: dict[str, list[int]] = {}
+    for i, row in enumerate(rows):
+        by_name.setdefault(row.name, []).append(i)
+
+    new_deps: dict[int, set[int]] = {}
+    old_deps: dict[int, set[int]] = {}
+    errors: list[str] = []
+    for i, row in enumerate(rows):
+        for ref in row.refs:
+            if ref.isdigit():
+                j = int(ref) - 1
+                if not 0 <= j < len(rows):
+                    errors.append(f"{row.line} 行目: 先行タスクの {ref} 件目はファイルにありません")
+                    continue
+                new_deps.setdefault(i, set()).add(j)
+            elif ref in by_name:
+                if len(by_name[ref]) > 1:
+                    errors.append(f"{row.line} 行目: 先行タスク「{ref}」が複数あります（何件目かの番号で指定してください）")
+                    continue
+                new_deps.setdefault(i, set()).add(by_name[ref][0])
+            elif ref in existing:
+                if len(existing[ref]) > 1:
+                    errors.append(f"{row.line} 行目: 既存タスク「{ref}」が複数あります")
+                    continue
+                old_deps.setdefault(i, set()).add(existing[ref][0])
+            else:
+                errors.append(f"{row.line} 行目: 先行タスク「{ref}」が見つかりません")
+        if i in new_deps and i in new_deps[i]:
+            errors.append(f"{row.line} 行目: 自分自身を先行タスクにはできません")
+    if errors:
+        raise TaskImportError(errors[:MAX_ERRORS])
+
+    # 取り込むタスク同士の循環（既存タスクは新しいタスクに依存していないので循環に関わらない）
+    graph = scheduling.TaskGraph()
+    for i, row in enumerate(rows):
+        graph.add_task(i, row.name, row.start, row.end)
+    for i, preds in new_deps.items():
+        for j in sorted(preds):
+            graph.add_edge(j, i)
+    try:
+        scheduling.topological_order(graph)
+    except scheduling.ScheduleCycleError as e:
+        path = " → ".join(f"{rows[i].name}（{rows[i].line} 行目）" for i in e.cycle)
+        raise TaskImportError([f"先行タスクが循環しています: {path}"])
+    return new_deps, old_deps
+
+
+# ------------------------------------------------------------
+# 登録
+# ------------------------------------------------------------
+def import_tasks(project: Project, stream: IO, *, encoding: str = "utf-8-sig",
+                 delimiter: str | None = None, dry_run: bool = False) -> ImportResult:
+    """
+    stream の工程表を検証して project に一括登録する（誤りがあれば TaskImportError）。
+    dry_run なら検証だけ行い、登録予定の件数を返す。
+    """
+    try:
+        rows = list(iter_rows(stream, encoding=encoding, delimiter=delimiter))
+    except UnicodeDecodeError:
+        raise TaskImportError([f"文字コード {encoding} として読めません（UTF-8 / Shift_JIS を選び直してください）"])
+    if not rows:
+        raise TaskImportError(["取り込むタスクがありません"])
+
+    existing: dict[str, list[int]] = {}
+    for pk, name in Task.objects.filter(project=project).order_by("id").values_list("id", "name"):
+        existing.setdefault(name, []).append(pk)
+    new_deps, old_deps = resolve_dependencies(rows, existing)
+    n_edges = sum(map(len, new_deps.values())) + sum(map(len, old_deps.values()))
+    if dry_run:
+        return ImportResult(created=len(rows), dependencies=n_edges)
+
+    with transaction.atomic():
+        version = task_feed.bump_task_version(project.pk)
+        now = timezone.now()
+        tasks = Task.objects.bulk_create(
+            Task(
+                project=project,
+                name=row.name,
+                start_date=row.start,
+                end_date=row.end,
+                progress=row.progress,
+                created_at=now,
+                updated_at=now,
+                version=version,
+            )
+            for row in rows
+        )
+        through = Task.dependencies.through
+        through.objects.bulk_create(_edges(through, tasks, new_deps, old_deps))
+        # 依存の追加はまとめて行ったので、閉包は案件単位で DB の中で作り直す（行を読み書きしない）
+        task_closure.rebuild_project(project.pk)
+        company_stats.tasks_changed(project.company_id, after=[(t.end_date, t.progress) for t in tasks])
+        project_rollup.tasks_changed(project.pk, after=[(t.start_date, t.end_date, t.progress) for t in tasks])
+        dashboard.invalidate(project.company_id)
+        search.index_documents(SearchPosting.KIND_TASK, [t.pk for t in tasks])
+    return ImportResult(created=len(tasks), dependencies=n_edges, version=version)
+
+
+def _edges(through, tasks: list[Task], new_deps: dict[int, set[int]], old_deps: dict[int, set[int]]) -> Iterable:
+    for i, preds in new_deps.items():
+        for j in sorted(preds):
+            yield through(from_task_id=tasks[i].pk, to_task_id=tasks[j].pk)
+    for i, pred_ids in old_deps.items():
+        for pk in sorted(pred_ids):
+            yield through(from_task_id=tasks[i].pk, to_task_id=pk)
@@ -1,3 +1,1176 @@
+import io
+import json
+import os
+import tempfile
+from collections import deque
+from datetime import date, timedelta
+from pathlib import Path
+from unittest import mock
+from urllib.parse import urlencode
+from xml.etree import ElementTree
+
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import (
+    Checklist, ChecklistItem, Company, CompanyStats, CustomUser, Customer, Memo, MentionCounter, PdfJob, Project,
+    SearchPosting, Task, TaskClosure,
+)
+from . import (
+    checklist_toggle, company_stats, dashboard, gantt_svg, mentions, pdf, project_list, project_report, project_tabs,
+    scheduling, search, task_closure, task_import,
+)
+
+
+class FixtureMixin:
+    """会社・スタッフ・案件をひとつずつ用意する"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.company = Company.objects.create(name="テスト工務店")
+        cls.user = CustomUser.objects.create_user(
+            username="boss", password="pw", company=cls.company, is_staff=True
+        )
+        cls.project = Project.objects.create(company=cls.company, name="A邸新築")
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+
+class TaskClosureTests(FixtureMixin, TestCase):
+    """閉包テーブルが依存の追加・削除・タスク削除の後も依存グラフと一致する"""
+
+    def make_tasks(self, n):
+        return [Task.objects.create(project=self.project, name=f"工程{i}") for i in range(n)]
+
+    def expected(self):
+        succs = {}
+        for succ, pred in Task.dependencies.through.objects.values_list("from_task_id", "to_task_id"):
+            succs.setdefault(pred, []).append(succ)
+        pairs = {}
+        for start in Task.objects.filter(project=self.project).values_list("id", flat=True):
+            queue = deque((s, 1) for s in succs.get(start, ()))
+            while queue:
+                cur, depth = queue.popleft()
+                if (start, cur) not in pairs:
+                    pairs[start, cur] = depth
+                    queue.extend((s, depth + 1) for s in succs.get(cur, ()))
+        return pairs
+
+    def actual(self):
+        rows = TaskClosure.objects.filter(project=self.project)
+        return {(a, d): depth for a, d, depth in rows.values_list("ancestor_id", "descendant_id", "depth")}
+
+    def test_chain_and_shortcut(self):
+        a, b, c, d = self.make_tasks(4)
+        b.dependencies.add(a)
+        c.dependencies.add(b)
+        d.dependencies.add(c)
+        self.assertEqual(self.actual()[a.pk, d.pk], 3)
+        d.dependencies.add(a)
+        self.assertEqual(self.actual()[a.pk, d.pk], 1)
+        self.assertEqual(self.actual(), self.expected())
+
+    def test_remove_edge_keeps_other_paths(self):
+        # a → b → d と a → c → d の菱形から b → d を外しても a → d は c 経由で残る
+        a, b, c, d = self.make_tasks(4)
+        b.dependencies.add(a)
+        c.dependencies.add(a)
+        d.dependencies.add(b, c)
+        d.dependencies.remove(b)
+        closure = self.actual()
+        self.assertNotIn((b.pk, d.pk), closure)
+        self.assertEqual(closure[a.pk, d.pk], 2)
+        self.assertEqual(closure, self.expected())
+
+    def test_remove_edge_updates_depth(self):
+        # a → d の近道を外すと、a → b → c → d の段数に戻る
+        a, b, c, d = self.make_tasks(4)
+        b.dependencies.add(a)
+        c.dependencies.add(b)
+        d.dependencies.add(c, a)
+        self.assertEqual(self.actual()[a.pk, d.pk], 1)
+        d.dependencies.remove(a)
+        self.assertEqual(self.actual()[a.pk, d.pk], 3)
+        self.assertEqual(self.actual(), self.expected())
+
+    def test_clear_and_reverse_removal(self):
+        tasks = self.make_tasks(6)
+        for i in range(1, 6):
+            tasks[i].dependencies.add(tasks[i - 1])
+        tasks[4].dependencies.add(tasks[1])
+        tasks[3].dependencies.clear()
+        self.assertEqual(self.actual(), self.expected())
+        tasks[1].dependents.clear()
+        self.assertEqual(self.actual(), self.expected())
+        self.assertFalse(task_closure.is_reachable(tasks[0].pk, tasks[5].pk))
+
+    def test_delete_task_in_the_middle(self):
+        a, b, c, d = self.make_tasks(4)
+        b.dependencies.add(a)
+        c.dependencies.add(b)
+        d.dependencies.add(b, c)
+        c.delete()
+        self.assertEqual(self.actual(), self.expected())
+        b.delete()
+        self.assertEqual(self.actual(), {})
+
+    def test_rebuild_matches_incremental(self):
+        tasks = self.make_tasks(8)
+        for i in range(1, 8):
+            tasks[i].dependencies.add(tasks[i - 1])
+            if i >= 3:
+                tasks[i].dependencies.add(tasks[i - 3])
+        incremental = self.actual()
+        task_closure.rebuild_project(self.project.pk)
+        self.assertEqual(self.actual(), incremental)
+        self.assertEqual(incremental, self.expected())
+
+
+class TaskImportTests(FixtureMixin, TestCase):
+    """工程表の一括取り込み"""
+
+    HEADER = "タスク名,開始日,終了日,進捗,先行タスク\n"
+
+    def run_import(self, body):
+        return task_import.import_tasks(self.project, io.StringIO(self.HEADER + body))
+
+    def test_import_with_dependencies(self):
+        result = self.run_import(
+            "基礎工事,2025-04-01,2025-04-10,0,\n"
+            "躯体工事,2025/04/11,2025/04/30,50%,基礎工事\n"
+            "内装,2025-05-01,2025-05-20,0,2\n"
+        )
+        self.assertEqual((result.created, result.dependencies), (3, 2))
+        tasks = {t.name: t for t in Task.objects.filter(project=self.project)}
+        self.assertEqual(tasks["躯体工事"].progress, 50)
+        self.assertTrue(task_closure.is_reachable(tasks["基礎工事"].pk, tasks["内装"].pk))
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.task_count, 3)
+
+    def test_error_rows_register_nothing(self):
+        with self.assertRaises(task_import.TaskImportError) as ctx:
+            self.run_import(
+                "基礎工事,2025-04-01,2025-04-10,0,\n"
+                ",2025-04-01,2025-04-10,0,\n"
+                "躯体工事,2025-04-11,2025-04-01,0,\n"
+                "内装,2025-13-01,,0,\n"
+                "外構,,,inf,\n"
+                "足場,,,1e999,\n"
+                "塗装,,,nan,\n"
+                "清掃,,,abc,\n"
+                "検査,,,120,\n"
+            )
+        lines = [e.split(" ", 1)[0] for e in ctx.exception.errors]
+        self.assertEqual(lines, ["3", "4", "5", "6", "7", "8", "9", "10"])
+        self.assertFalse(Task.objects.filter(project=self.project).exists())
+
+    def test_cycle_is_rejected(self):
+        with self.assertRaises(task_import.TaskImportError):
+            self.run_import("A,,,0,2\nB,,,0,1\n")
+        self.assertFalse(Task.objects.filter(project=self.project).exists())
+
+    def test_view_reports_inf_progress_as_row_error(self):
+        upload = SimpleUploadedFile("schedule.csv", (self.HEADER + "外構,,,inf,\n").encode())
+        response = self.client.post(
+            reverse("task_import", args=[self.project.pk]), {"file": upload, "encoding": "utf-8-sig"}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("2 行目", response.context["import_errors"][0])
+
+    def test_query_count_does_not_grow_with_rows(self):
+        def body(n, prefix):
+            return "".join(f"{prefix}{i},,,0,{i if i else ''}\n" for i in range(n))
+
+        self.run_import(body(1, "準備工事"))  # 初回だけ作られる会社の集計行などを先に作っておく
+        with CaptureQueriesContext(connection) as small:
+            self.run_import(body(5, "基礎工事"))
+        with CaptureQueriesContext(connection) as large:
+            self.run_import(body(40, "内装工事"))
+        # SQLite では bulk_create の INSERT だけがバインド変数の上限で分かれるので、それ以外を比べる
+        def count(ctx):
+            return sum(1 for q in ctx.captured_queries if not q["sql"].startswith("INSERT"))
+
+        self.assertEqual(count(large), count(small))
+
+
+class TaskFeedTests(FixtureMixin, TestCase):
+    """工程データの JSON（全件・期間窓・列指向）"""
+
+    def url(self, **params):
+        return reverse("project_tasks_json", args=[self.project.pk]) + ("?" + urlencode(params) if params else "")
+
+    def test_columnar_without_any_start_date(self):
+        # 案件にもタスクにも開始日が無く、終了日だけがあるタスクでも基準日が決まる
+        Task.objects.create(project=self.project, name="検査", end_date=date(2025, 6, 10))
+        Task.objects.create(project=self.project, name="引渡し", end_date=date(2025, 6, 20))
+        Task.objects.create(project=self.project, name="未定")
+        response = self.client.get(self.url(format="columnar"))
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.content)
+        self.assertEqual(data["epoch"], "2025-06-10")
+        self.assertEqual(sorted(e for e in data["columns"]["end"] if e is not None), [0, 10])
+        self.assertEqual(data["columns"]["start"], [None, None, None])
+
+    def test_columnar_without_any_date(self):
+        Task.objects.create(project=self.project, name="未定")
+        data = json.loads(self.client.get(self.url(format="columnar")).content)
+        self.assertIsNone(data["epoch"])
+
+    def test_unchanged_project_is_not_modified(self):
+        Task.objects.create(project=self.project, name="基礎工事")
+        response = self.client.get(self.url())
+        self.assertEqual(response.status_code, 200)
+        etag = response["ETag"]
+        self.assertEqual(self.client.get(self.url(), HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        # タスクを変えると版数が上がり、同じ ETag では 304 にならない
+        Task.objects.create(project=self.project, name="躯体工事")
+        response = self.client.get(self.url(), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_delta_returns_changes_and_deletions_since_version(self):
+        a = Task.objects.create(project=self.project, name="基礎工事")
+        b = Task.objects.create(project=self.project, name="躯体工事")
+        self.project.refresh_from_db()
+        since = self.project.task_version
+
+        c = Task.objects.create(project=self.project, name="内装")
+        c.dependencies.add(a)
+        deleted_id = b.pk
+        b.delete()
+        data = json.loads(self.client.get(self.url(since=since)).content)
+        self.project.refresh_from_db()
+        self.assertEqual(data["version"], self.project.task_version)
+        self.assertEqual([t["id"] for t in data["tasks"]], [str(c.pk)])
+        self.assertEqual(data["tasks"][0]["dependencies"], str(a.pk))
+        self.assertEqual(data["deleted"], [str(deleted_id)])
+
+        # 最新の版数からの差分は空
+        data = json.loads(self.client.get(self.url(since=data["version"])).content)
+        self.assertEqual((data["tasks"], data["deleted"]), ([], []))
+
+    def walk_window(self, **params):
+        pages, after = [], None
+        while True:
+            query = dict(params, **({"after": after} if after else {}))
+            response = self.client.get(self.url(**query))
+            self.assertEqual(response.status_code, 200)
+            data = json.loads(response.content)
+            pages.append(data)
+            after = data["next"]
+            if after is None:
+                return pages
+
+    def test_window_pages_cover_dated_tasks_in_order(self):
+        spans = [
+            (date(2025, 4, 1), date(2025, 4, 10)),
+            (date(2025, 4, 1), date(2025, 4, 5)),
+            (date(2025, 4, 1), date(2025, 4, 5)),
+            (date(2025, 4, 20), date(2025, 5, 10)),
+            (date(2025, 6, 1), date(2025, 6, 30)),
+        ]
+        tasks = [Task.objects.create(project=self.project, name="工程", start_date=s, end_date=e) for s, e in spans]
+        Task.objects.create(project=self.project, name="開始日のみ", start_date=date(2025, 4, 2))
+        Task.objects.create(project=self.project, name="未定")
+        expected = sorted(tasks, key=lambda t: (t.start_date, t.end_date, t.pk))
+
+        pages = self.walk_window(limit=2)
+        self.assertEqual([len(p["tasks"]) for p in pages], [2, 2, 1])
+        self.assertEqual([t["id"] for p in pages for t in p["tasks"]], [str(t.pk) for t in expected])
+        meta = pages[0]["meta"]
+        self.assertEqual((meta["total"], meta["undated"], meta["limit"]), (5, 2, 2))
+        self.assertEqual((meta["min_start"], meta["max_end"]), ("2025-04-01", "2025-06-30"))
+
+        # 期間に掛かるタスクだけ（窓の端に掛かるものを含む）
+        pages = self.walk_window(**{"from": "2025-04-06", "to": "2025-05-01", "limit": 1})
+        self.assertEqual(
+            [t["id"] for p in pages for t in p["tasks"]], [str(tasks[0].pk), str(tasks[3].pk)]
+        )
+
+    def test_invalid_window_cursor_is_a_bad_request(self):
+        for after in ("2025-04-01_2025-04-05", "2025-04-01_2025-04-05_x", "2025-04-01_2025-13-05_1"):
+            with self.subTest(after=after):
+                self.assertEqual(self.client.get(self.url(after=after, limit=2)).status_code, 400)
+
+    def test_invalid_cursors_are_bad_requests(self):
+        for params in ({"since": "abc"}, {"since": "-1"}, {"after": "not-a-cursor"}, {"from": "2025-13-01"}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get(self.url(**params)).status_code, 400)
+
+
+class MentionInboxTests(FixtureMixin, TestCase):
+    """メンションの受信箱と未読数（MentionCounter）"""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.worker = CustomUser.objects.create_user(username="genba", password="pw", company=cls.company)
+
+    def post_memo(self, content):
+        self.client.post(reverse("memo_create", args=[self.project.pk]), {"content": content})
+        return Memo.objects.latest("pk")
+
+    def unread(self):
+        return mentions.unread_count(self.worker)
+
+    def test_unread_count_follows_mentions(self):
+        memos = [self.post_memo(f"@genba 配筋写真{i}をお願いします") for i in range(3)]
+        self.post_memo("@boss 自分宛ては数えない")
+        self.assertEqual(self.unread(), 3)
+
+        # 本文からメンションを消す・既読にする・メモを消す
+        self.client.post(reverse("memo_edit", args=[memos[0].pk]), {"content": "確認済み"})
+        mentions.mark_read(self.worker, [memos[1].pk])
+        memos[2].delete()
+        self.assertEqual(self.unread(), 0)
+        self.assertEqual(mentions.recount(self.worker.pk), 0)
+
+        self.post_memo("@genba 追加の依頼")
+        self.assertEqual(self.unread(), 1)
+        self.assertEqual(mentions.recount(self.worker.pk), 1)
+
+    def test_inbox_pages_by_memo_id(self):
+        memos = [self.post_memo(f"@genba 依頼{i}") for i in range(5)]
+        rows, cursor = mentions.inbox_page(self.worker, limit=2)
+        self.assertEqual([r.memo_id for r in rows], [memos[4].pk, memos[3].pk])
+        rows, cursor = mentions.inbox_page(self.worker, cursor, limit=2)
+        self.assertEqual([r.memo_id for r in rows], [memos[2].pk, memos[1].pk])
+        rows, cursor = mentions.inbox_page(self.worker, cursor, limit=2)
+        self.assertEqual(([r.memo_id for r in rows], cursor), ([memos[0].pk], None))
+
+        mentions.mark_read(self.worker, [memos[4].pk])
+        rows, _ = mentions.inbox_page(self.worker, unread_only=True)
+        self.assertNotIn(memos[4].pk, [r.memo_id for r in rows])
+
+    def test_deleting_users_with_unread_mentions(self):
+        self.post_memo("@genba 配筋写真をお願いします")
+        other = CustomUser.objects.create_user(username="kanri", password="pw", company=self.company)
+        self.post_memo("@kanri 請求書の確認")
+        CustomUser.objects.filter(username="kanri").delete()
+        connection.check_constraints()  # 消えた利用者の集計行を作っていない
+        self.assertFalse(MentionCounter.objects.filter(user_id=other.pk).exists())
+        self.assertEqual(self.unread(), 1)
+
+    def test_deleting_a_company_with_unread_mentions(self):
+        self.post_memo("@genba 配筋写真をお願いします")
+        self.company.delete()
+        connection.check_constraints()
+        self.assertFalse(MentionCounter.objects.exists())
+
+    def test_invalid_inbox_cursor_is_a_bad_request(self):
+        self.client.force_login(self.worker)
+        url = reverse("mention_inbox")
+        self.assertEqual(self.client.get(url, {"before": "abc"}).status_code, 400)
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+
+class SearchTests(FixtureMixin, TestCase):
+    """会社ごとの全文検索と転置索引の保守"""
+
+    def found(self, query, company=None):
+        page = search.search((company or self.company).pk, query)
+        return [(hit.kind, hit.object_id) for hit in page.hits]
+
+    def postings(self):
+        return sorted(
+            SearchPosting.objects.values_list("company_id", "kind", "object_id", "term", "weight")
+        )
+
+    def test_compound_noun_and_index_updates(self):
+        task = Task.objects.create(project=self.project, name="2階分電盤交換")
+        memo = Memo.objects.create(project=self.project, author=self.user, content="分電盤の型番を施主に確認する")
+        self.assertEqual(
+            set(self.found("分電盤")), {(SearchPosting.KIND_TASK, task.pk), (SearchPosting.KIND_MEMO, memo.pk)}
+        )
+        self.assertEqual(self.found("分電盤 型番"), [(SearchPosting.KIND_MEMO, memo.pk)])
+
+        task.name = "照明器具取付"
+        task.save()
+        self.assertEqual(self.found("分電盤"), [(SearchPosting.KIND_MEMO, memo.pk)])
+        memo.delete()
+        self.assertEqual(self.found("分電盤"), [])
+        self.assertEqual(self.found("照明"), [(SearchPosting.KIND_TASK, task.pk)])
+
+    def test_other_companies_are_not_searched(self):
+        other = Company.objects.create(name="別の工務店")
+        project = Project.objects.create(company=other, name="C邸外構")
+        task = Task.objects.create(project=project, name="外構フェンス設置")
+        self.assertEqual(self.found("外構"), [])
+        self.assertEqual(
+            set(self.found("外構", other)), {(SearchPosting.KIND_PROJECT, project.pk), (SearchPosting.KIND_TASK, task.pk)}
+        )
+
+    def test_rebuild_matches_incremental_index(self):
+        Task.objects.create(project=self.project, name="基礎配筋検査")
+        checklist = Checklist.objects.create(project=self.project, title="配筋検査")
+        ChecklistItem.objects.create(checklist=checklist, title="かぶり厚さの確認")
+        incremental = self.postings()
+        search.rebuild(self.company.pk)
+        self.assertEqual(self.postings(), incremental)
+
+    def test_invalid_page_is_a_bad_request(self):
+        url = reverse("search")
+        self.assertEqual(self.client.get(url, {"q": "検査", "page": "abc"}).status_code, 400)
+        self.assertEqual(self.client.get(url, {"q": "検査"}).status_code, 200)
+
+
+class ScheduleTests(FixtureMixin, TestCase):
+    """依存関係からの最早/最遅日程とクリティカルパス"""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()  # 結果は (案件ID, 版数) でキャッシュされ、テストごとに同じキーになる
+        self.a = Task.objects.create(
+            project=self.project, name="基礎工事", start_date=date(2025, 4, 1), end_date=date(2025, 4, 10)
+        )
+        self.b = Task.objects.create(
+            project=self.project, name="躯体工事", start_date=date(2025, 4, 11), end_date=date(2025, 4, 20)
+        )
+        self.c = Task.objects.create(
+            project=self.project, name="設備配管", start_date=date(2025, 4, 11), end_date=date(2025, 4, 13)
+        )
+        self.d = Task.objects.create(
+            project=self.project, name="内装", start_date=date(2025, 4, 21), end_date=date(2025, 4, 25)
+        )
+        self.b.dependencies.add(self.a)
+        self.c.dependencies.add(self.a)
+        self.d.dependencies.add(self.b, self.c)
+        self.url = reverse("project_schedule_json", args=[self.project.pk])
+
+    def test_critical_path_and_slack(self):
+        data = json.loads(self.client.get(self.url).content)
+        self.assertEqual(data["critical_path"], [str(self.a.pk), str(self.b.pk), str(self.d.pk)])
+        self.assertEqual((data["epoch"], data["finish"], data["duration"]), ("2025-04-01", "2025-04-25", 25))
+        tasks = {t["id"]: t for t in data["tasks"]}
+        c = tasks[str(self.c.pk)]
+        self.assertEqual((c["slack"], c["critical"]), (7, False))
+        self.assertEqual((c["latest_start"], c["latest_finish"]), ("2025-04-18", "2025-04-20"))
+
+    def test_result_follows_task_changes(self):
+        response = self.client.get(self.url)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=response["ETag"]).status_code, 304)
+        # 設備配管が延びると、躯体工事の代わりにクリティカルパスに入る
+        self.c.end_date = date(2025, 4, 25)
+        self.c.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.content)
+        self.assertEqual(data["critical_path"], [str(self.a.pk), str(self.c.pk), str(self.d.pk)])
+
+    def test_task_with_only_a_start_date_takes_one_day(self):
+        late = Task.objects.create(project=self.project, name="引渡し", start_date=date(2025, 5, 1))
+        data = json.loads(self.client.get(self.url).content)
+        self.assertEqual((data["finish"], data["duration"]), ("2025-05-01", 31))
+        self.assertEqual(data["critical_path"], [str(late.pk)])
+        tasks = {t["id"]: t for t in data["tasks"]}
+        self.assertEqual(
+            (tasks[str(late.pk)]["duration"], tasks[str(late.pk)]["earliest_finish"]), (1, "2025-05-01")
+        )
+        for task in data["tasks"]:
+            self.assertLessEqual(task["latest_finish"], data["finish"])
+            self.assertLessEqual(task["earliest_finish"], data["finish"])
+
+    def test_task_with_only_an_end_date_sits_on_that_day(self):
+        inspection = Task.objects.create(project=self.project, name="完了検査", end_date=date(2025, 3, 31))
+        data = json.loads(self.client.get(self.url).content)
+        self.assertEqual(data["epoch"], "2025-03-31")
+        task = next(t for t in data["tasks"] if t["id"] == str(inspection.pk))
+        self.assertEqual((task["earliest_start"], task["earliest_finish"]), ("2025-03-31", "2025-03-31"))
+
+    def test_cycle_is_reported(self):
+        graph = scheduling.load_graph(self.project)
+        graph.add_edge(self.d.pk, self.a.pk)
+        with self.assertRaises(scheduling.ScheduleCycleError) as ctx:
+            scheduling.compute_schedule(graph)
+        self.assertEqual(set(ctx.exception.cycle) & {self.a.pk, self.d.pk}, {self.a.pk, self.d.pk})
+
+
+class PdfCacheTests(FixtureMixin, TestCase):
+    """描画した HTML の内容をキーにした PDF キャッシュ（WeasyPrint の呼び出しは差し替える）"""
+
+    def setUp(self):
+        super().setUp()
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        patchers = [
+            mock.patch.object(pdf, "PDF_CACHE_DIR", Path(tmp.name)),
+            mock.patch.object(pdf, "write_pdf", side_effect=lambda html, base_url=None: b"%PDF-" + html.encode()),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_same_html_is_rendered_once(self):
+        first = pdf.cached_pdf_path("<p>A邸</p>")
+        second = pdf.cached_pdf_path("<p>A邸</p>")
+        self.assertEqual(first, second)
+        self.assertEqual(pdf.write_pdf.call_count, 1)
+        self.assertNotEqual(pdf.cached_pdf_path("<p>B邸</p>"), first)
+        self.assertEqual(pdf.write_pdf.call_count, 2)
+
+    def test_eviction_keeps_recently_used_files(self):
+        paths = [pdf.cached_pdf_path(f"<p>{i}</p>") for i in range(3)]
+        for i, path in enumerate(paths):
+            os.utime(path, (1000 + i, 1000 + i))
+        pdf.cached_pdf_path("<p>0</p>")  # 参照すると最後に使われたものになる
+        size = paths[0].stat().st_size
+        self.assertEqual(pdf.evict_pdf_cache(max_bytes=size * 2), 1)
+        self.assertEqual([p.exists() for p in paths], [True, False, True])
+
+    def test_view_answers_not_modified_without_rendering(self):
+        url = reverse("project_pdf", args=[self.project.pk])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(b"".join(response.streaming_content).startswith(b"%PDF-"))
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"]).status_code, 304)
+        self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertEqual(pdf.write_pdf.call_count, 1)
+
+
+class GanttSvgTests(FixtureMixin, TestCase):
+    """サーバー側で描く工程表 SVG とそのキャッシュ"""
+
+    SVG = "{http://www.w3.org/2000/svg}"
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def render(self, view_mode=gantt_svg.DEFAULT_VIEW_MODE, today=date(2025, 4, 7)):
+        rows, edges = gantt_svg.load_rows(self.project)
+        return gantt_svg.render_gantt_svg(rows, edges, view_mode, today)
+
+    def parse(self, svg):
+        return ElementTree.fromstring(svg)
+
+    def by_class(self, root, tag, cls):
+        return [el for el in root.iter(self.SVG + tag) if el.get("class") == cls]
+
+    def test_empty_project(self):
+        self.assertIn("工程タスクが登録されていません", self.render())
+        Task.objects.create(project=self.project, name="未定")  # 日付の無いタスクは描かない
+        self.assertIn("工程タスクが登録されていません", self.render())
+
+    def test_bars_names_and_arrows(self):
+        a = Task.objects.create(
+            project=self.project, name='<基礎> & "配筋"', start_date=date(2025, 4, 1), end_date=date(2025, 4, 10)
+        )
+        b = Task.objects.create(
+            project=self.project, name="外構", start_date=date(2025, 4, 11), end_date=date(2025, 4, 20), progress=50
+        )
+        Task.objects.create(project=self.project, name="開始日のみ", start_date=date(2025, 4, 2))
+        b.dependencies.add(a)
+
+        root = self.parse(self.render())  # 名前の < & " がエスケープされていなければ解析に失敗する
+        names = [el.text for el in self.by_class(root, "text", "gantt-left-item")]
+        self.assertEqual(names, ['<基礎> & "配筋"', "外構"])
+        bar_ids = [g.get("data-id") for g in self.by_class(root, "g", "bar-wrapper")]
+        self.assertEqual(bar_ids, [str(a.pk), str(b.pk)])
+        self.assertEqual(len(self.by_class(root, "path", "arrow")), 1)
+        self.assertEqual(len(self.by_class(root, "rect", "today-marker")), 1)
+        bars = self.by_class(root, "rect", "bar")
+        progress = self.by_class(root, "rect", "bar-progress")
+        self.assertEqual(float(progress[1].get("width")), float(bars[1].get("width")) / 2)
+
+    def test_view_modes(self):
+        Task.objects.create(project=self.project, name="躯体", start_date=date(2025, 4, 1), end_date=date(2025, 5, 31))
+        widths = {}
+        for view_mode, px in gantt_svg.VIEW_MODES.items():
+            root = self.parse(self.render(view_mode))
+            bar = self.by_class(root, "rect", "bar")[0]
+            self.assertEqual(float(bar.get("width")), 61 * px)
+            widths[view_mode] = int(root.get("width"))
+        self.assertGreater(widths["Day"], widths["Week"])
+        self.assertGreater(widths["Week"], widths["Month"])
+        self.assertEqual(self.render("Hour"), self.render(gantt_svg.DEFAULT_VIEW_MODE))
+
+    def test_cache_key_covers_data_view_and_today(self):
+        task = Task.objects.create(
+            project=self.project, name="躯体", start_date=date(2025, 4, 1), end_date=date(2025, 4, 30)
+        )
+        render = mock.Mock(wraps=gantt_svg.render_gantt_svg)
+        with mock.patch.object(gantt_svg, "render_gantt_svg", render):
+            gantt_svg.gantt_svg_for_project(self.project)
+            gantt_svg.gantt_svg_for_project(self.project)
+            self.assertEqual(render.call_count, 1)
+            gantt_svg.gantt_svg_for_project(self.project, "Day")
+            self.assertEqual(render.call_count, 2)
+            with mock.patch.object(gantt_svg.timezone, "localdate", return_value=date(2030, 1, 1)):
+                gantt_svg.gantt_svg_for_project(self.project)
+            self.assertEqual(render.call_count, 3)
+            task.progress = 40
+            task.save()
+            gantt_svg.gantt_svg_for_project(self.project)
+            self.assertEqual(render.call_count, 4)
+
+
+class ProjectReportTests(FixtureMixin, TestCase):
+    """案件サマリーのスナップショット（ProjectReport）"""
+
+    def fill(self, project, n):
+        for i in range(n):
+            Task.objects.create(
+                project=project, name=f"工程{i}", start_date=date(2025, 4, 1) + timedelta(days=i), progress=i * 10 % 100
+            )
+            Memo.objects.create(project=project, author=self.user, content=f"申し送り{i}")
+            checklist = Checklist.objects.create(project=project, title=f"検査{i}")
+            ChecklistItem.objects.create(checklist=checklist, title="確認", is_done=bool(i % 2))
+
+    def test_round_trip_through_json(self):
+        self.project.customer = Customer.objects.create(company=self.company, name="山田様")
+        self.project.start_date = date(2025, 4, 1)
+        self.project.save()
+        self.fill(self.project, 3)
+        report = project_report.build_report(self.project)
+        self.assertEqual(report.customer, "山田様")
+        self.assertEqual((report.checklist_done, report.checklist_total), (1, 3))
+
+        data = json.loads(json.dumps(report.to_dict()))
+        self.assertEqual(data["start_date"], "2025-04-01")
+        restored = project_report.ProjectReport.from_dict(data)
+        self.assertEqual(restored, report)
+        self.assertEqual(restored.task_progress, report.task_progress)
+
+    def test_query_count_does_not_depend_on_size(self):
+        other = Project.objects.create(company=self.company, name="B邸改修")
+        self.fill(other, project_report.RECENT_MEMOS + 5)
+        with self.assertNumQueries(4):
+            report = project_report.build_report(self.project)
+        self.assertEqual((report.tasks, report.memos, report.checklists), ([], [], []))
+        with self.assertNumQueries(4):
+            report = project_report.build_report(other)
+        self.assertEqual(len(report.tasks), project_report.RECENT_MEMOS + 5)
+        self.assertEqual(len(report.memos), project_report.RECENT_MEMOS)
+        self.assertEqual(report.memos[0].content, f"申し送り{project_report.RECENT_MEMOS + 4}")
+        with self.assertNumQueries(4):
+            reports = project_report.build_reports([self.project.pk, other.pk])
+        self.assertEqual([r.id for r in reports], [self.project.pk, other.pk])
+
+
+class PdfJobRecoveryTests(FixtureMixin, TestCase):
+    """止まったジョブの判定は開始日時ではなく最後の応答で行う"""
+
+    def running_job(self, started, heartbeat):
+        now = timezone.now()
+        return PdfJob.objects.create(
+            company=self.company,
+            project=self.project,
+            kind=PdfJob.KIND_PROJECT,
+            status=PdfJob.STATUS_RUNNING,
+            started_at=now - started,
+            heartbeat_at=now - heartbeat if heartbeat is not None else None,
+        )
+
+    def test_long_job_with_recent_heartbeat_is_left_running(self):
+        job = self.running_job(started=timedelta(hours=2), heartbeat=timedelta(seconds=20))
+        self.assertEqual(pdf.recover_stale_jobs(), 0)
+        job.refresh_from_db()
+        self.assertEqual(job.status, PdfJob.STATUS_RUNNING)
+
+    def test_silent_job_is_requeued(self):
+        job = self.running_job(started=timedelta(hours=2), heartbeat=pdf.JOB_STALE_AFTER * 2)
+        legacy = self.running_job(started=pdf.JOB_STALE_AFTER * 2, heartbeat=None)
+        self.assertEqual(pdf.recover_stale_jobs(), 2)
+        for j in (job, legacy):
+            j.refresh_from_db()
+            self.assertEqual((j.status, j.attempts), (PdfJob.STATUS_QUEUED, 1))
+
+    def test_heartbeat_only_touches_running_jobs(self):
+        job = self.running_job(started=timedelta(hours=1), heartbeat=timedelta(hours=1))
+        done = PdfJob.objects.create(company=self.company, kind=PdfJob.KIND_BATCH, status=PdfJob.STATUS_DONE)
+        self.assertEqual(pdf.heartbeat([job.pk, done.pk], progress_done=3, progress_total=10), 1)
+        job.refresh_from_db()
+        self.assertGreater(job.heartbeat_at, timezone.now() - timedelta(minutes=1))
+        self.assertEqual((job.progress_done, job.progress_total), (3, 10))
+
+
+class PdfJobClaimTests(FixtureMixin, TestCase):
+    """一括出力ジョブはワーカーが空いているときにそれだけを取り出す"""
+
+    def queue(self, kind):
+        return PdfJob.objects.create(
+            company=self.company, kind=kind, project=None if kind == PdfJob.KIND_BATCH else self.project
+        )
+
+    def test_batch_is_claimed_alone_by_an_idle_worker(self):
+        batch = self.queue(PdfJob.KIND_BATCH)
+        self.queue(PdfJob.KIND_PROJECT)
+        self.assertEqual(pdf.claim_jobs(4, "w"), [(batch.pk, PdfJob.KIND_BATCH)])
+
+    def test_busy_worker_waits_for_a_batch_at_the_head(self):
+        single = self.queue(PdfJob.KIND_PROJECT)
+        batch = self.queue(PdfJob.KIND_BATCH)
+        self.queue(PdfJob.KIND_PROJECT)
+        self.assertEqual(pdf.claim_jobs(4, "w"), [(single.pk, PdfJob.KIND_PROJECT)])
+        self.assertEqual(pdf.claim_jobs(3, "w", busy=True), [])
+        batch.refresh_from_db()
+        self.assertEqual(batch.status, PdfJob.STATUS_QUEUED)
+
+
+class TaskRescheduleTests(FixtureMixin, TestCase):
+    """タスクのリスケジュール（後続への波及と日数の検証）"""
+
+    def setUp(self):
+        super().setUp()
+        self.first = Task.objects.create(
+            project=self.project, name="基礎工事", start_date=date(2025, 4, 1), end_date=date(2025, 4, 10)
+        )
+        self.second = Task.objects.create(
+            project=self.project, name="躯体工事", start_date=date(2025, 4, 11), end_date=date(2025, 4, 30)
+        )
+        self.second.dependencies.add(self.first)
+
+    def post(self, task, days):
+        return self.client.post(reverse("task_reschedule", args=[task.pk]), {"days": days})
+
+    def test_shift_pushes_successor(self):
+        response = self.post(self.first, 3)
+        self.assertEqual(response.status_code, 200)
+        self.second.refresh_from_db()
+        self.assertEqual((self.second.start_date, self.second.end_date), (date(2025, 4, 14), date(2025, 5, 3)))
+
+    def test_out_of_range_days_are_bad_requests(self):
+        for days in ("99999999", "-99999999", str(scheduling.MAX_RESCHEDULE_DAYS + 1), "abc"):
+            with self.subTest(days=days):
+                self.assertEqual(self.post(self.first, days).status_code, 400)
+        self.first.refresh_from_db()
+        self.assertEqual(self.first.start_date, date(2025, 4, 1))
+
+    def test_date_overflow_is_a_bad_request(self):
+        Task.objects.filter(pk=self.second.pk).update(start_date=date(9999, 1, 1), end_date=date(9999, 6, 1))
+        self.assertEqual(self.post(self.second, scheduling.MAX_RESCHEDULE_DAYS).status_code, 400)
+
+
+class CounterAssertions:
+    """保守している件数が、数え直し（reconcile_* コマンド）の結果と一致することを確かめる"""
+
+    def assertCountsMatchRecount(self):
+        out = io.StringIO()
+        call_command("reconcile_checklist_counts", "--dry-run", stdout=out)
+        self.assertIn("ずれを 0 件", out.getvalue())
+        out = io.StringIO()
+        call_command("reconcile_project_rollups", stdout=out)
+        self.assertIn("（ずれ 0 件）", out.getvalue())
+        out = io.StringIO()
+        call_command("reconcile_company_stats", stdout=out)
+        self.assertIn("（ずれ 0 社）", out.getvalue())
+
+
+class ChecklistCountTests(CounterAssertions, FixtureMixin, TestCase):
+    """Checklist.items_total / items_done の保守"""
+
+    def setUp(self):
+        super().setUp()
+        self.checklist = Checklist.objects.create(project=self.project, title="配筋検査")
+        self.items = [ChecklistItem.objects.create(checklist=self.checklist, title=f"項目{i}") for i in range(3)]
+
+    def counts(self, checklist=None):
+        checklist = checklist or self.checklist
+        checklist.refresh_from_db()
+        return checklist.items_done, checklist.items_total
+
+    def test_save_toggle_delete_and_move(self):
+        self.assertEqual(self.counts(), (0, 3))
+        self.items[0].is_done = True
+        self.items[0].save()
+        self.assertEqual(self.counts(), (1, 3))
+        self.items[1].delete()
+        self.assertEqual(self.counts(), (1, 2))
+        other = Checklist.objects.create(project=self.project, title="仕上げ検査")
+        self.items[0].checklist = other
+        self.items[0].save()
+        self.assertEqual(self.counts(), (0, 1))
+        self.assertEqual(self.counts(other), (1, 1))
+        self.assertCountsMatchRecount()
+        other.delete()
+        self.assertCountsMatchRecount()
+
+    def test_editing_a_stale_checklist_keeps_counts(self):
+        stale = Checklist.objects.get(pk=self.checklist.pk)
+        ChecklistItem.objects.create(checklist=self.checklist, title="追加", is_done=True)
+        stale.title = "配筋検査（2 回目）"
+        stale.save()
+        self.assertEqual(self.counts(), (1, 4))
+        self.assertEqual(self.checklist.title, "配筋検査（2 回目）")
+        self.assertCountsMatchRecount()
+
+    def test_edit_view_keeps_counts(self):
+        checklist_toggle.toggle_items(self.company.pk, {self.items[0].pk: True})
+        response = self.client.post(reverse("checklist_edit", args=[self.checklist.pk]), {"title": "配筋検査 A"})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.counts(), (1, 3))
+        self.assertCountsMatchRecount()
+
+    def test_single_toggle_json(self):
+        url = reverse("item_toggle_json", args=[self.items[0].pk])
+        data = self.client.post(url).json()
+        self.assertEqual(data["items"], [{"id": self.items[0].pk, "done": True, "changed": True}])
+        self.assertEqual(data["checklists"][0]["items_done"], 1)
+        self.assertEqual(data["projects"][0]["checklist_items_done"], 1)
+
+        # 既に完了の項目を完了にしても数は変わらない（二重押し）
+        data = self.client.post(url, {"done": "1"}).json()
+        self.assertEqual(data["items"][0]["changed"], False)
+        self.assertEqual(self.counts(), (1, 3))
+
+        data = self.client.post(url).json()
+        self.assertEqual(data["items"][0]["done"], False)
+        self.assertEqual(self.counts(), (0, 3))
+        self.assertCountsMatchRecount()
+
+        self.assertEqual(self.client.post(url, {"done": "maybe"}).status_code, 400)
+        self.assertEqual(self.client.get(url).status_code, 405)
+
+    def toggle_while_another_request_wins(self, first, second):
+        """second の UPDATE の直前に、別のリクエストの first が先に終わる（同時押し）"""
+        update = checklist_toggle._update
+
+        def racing(pks, target, now):
+            with mock.patch.object(checklist_toggle, "_update", update):
+                checklist_toggle.toggle_items(self.company.pk, first)
+            return update(pks, target, now)
+
+        with mock.patch.object(checklist_toggle, "_update", racing):
+            return checklist_toggle.toggle_items(self.company.pk, second)
+
+    def test_concurrent_toggles_are_counted_once(self):
+        pk = self.items[0].pk
+        result = self.toggle_while_another_request_wins({pk: True}, {pk: True})
+        self.assertEqual((result.items[pk], result.changed), (True, set()))
+        self.assertEqual(self.counts(), (1, 3))
+        self.assertCountsMatchRecount()
+
+        # 反転どうしは両方とも効く（元に戻る）
+        result = self.toggle_while_another_request_wins({pk: None}, {pk: None})
+        self.assertEqual((result.items[pk], result.changed), (True, {pk}))
+        self.assertEqual(self.counts(), (1, 3))
+        self.assertCountsMatchRecount()
+
+    def test_batch_toggle_with_unknown_id_changes_nothing(self):
+        unknown = max(item.pk for item in self.items) + 100
+        body = {"items": [{"id": self.items[0].pk, "done": True}, {"id": unknown, "done": True}]}
+        response = self.client.post(
+            reverse("items_toggle_batch"), json.dumps(body), content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json()["ids"], [unknown])
+        self.assertFalse(ChecklistItem.objects.filter(is_done=True).exists())
+        self.assertEqual(self.counts(), (0, 3))
+        self.assertCountsMatchRecount()
+
+    def test_batch_toggle_updates_counts(self):
+        body = {"items": [{"id": self.items[0].pk, "done": True}, {"id": self.items[1].pk}]}
+        response = self.client.post(
+            reverse("items_toggle_batch"), json.dumps(body), content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["checklists"][0]["items_done"], 2)
+        self.assertEqual(self.counts(), (2, 3))
+        self.assertCountsMatchRecount()
+
+    def test_batch_toggle_rejects_other_companies_items(self):
+        other_company = Company.objects.create(name="他社")
+        other_project = Project.objects.create(company=other_company, name="他社案件")
+        other_item = ChecklistItem.objects.create(
+            checklist=Checklist.objects.create(project=other_project), title="他社の項目"
+        )
+        body = {"items": [{"id": self.items[0].pk}, {"id": other_item.pk}]}
+        response = self.client.post(
+            reverse("items_toggle_batch"), json.dumps(body), content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(self.counts(), (0, 3))
+
+    def test_invalid_checklist_cursor_is_a_bad_request(self):
+        url = reverse("project_checklist_list", args=[self.project.pk])
+        self.assertEqual(self.client.get(url, {"before": "abc"}).status_code, 400)
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+
+class ProjectRollupTests(CounterAssertions, FixtureMixin, TestCase):
+    """案件一覧用の集計（Project の rollup 項目）の保守"""
+
+    def rollup(self, project=None):
+        project = project or self.project
+        project.refresh_from_db()
+        return project.task_count, project.task_days_total, project.task_progress_total
+
+    def make_task(self, project=None, **fields):
+        return Task.objects.create(project=project or self.project, name="工程", **fields)
+
+    def test_task_save_delete_and_move(self):
+        a = self.make_task(start_date=date(2025, 4, 1), end_date=date(2025, 4, 10), progress=50)
+        b = self.make_task(progress=100)  # 日付なしは 1 日として数える
+        self.assertEqual(self.rollup(), (2, 11, 600))
+        self.assertEqual(self.project.task_progress, 55)
+        a.progress = 100
+        a.save()
+        self.assertEqual(self.rollup(), (2, 11, 1100))
+        other = Project.objects.create(company=self.company, name="B邸改修")
+        b.project = other
+        b.save()
+        self.assertEqual(self.rollup(), (1, 10, 1000))
+        self.assertEqual(self.rollup(other), (1, 1, 100))
+        a.delete()
+        self.assertEqual(self.rollup(), (0, 0, 0))
+        self.assertCountsMatchRecount()
+
+    def test_checklist_items_roll_up_to_project(self):
+        checklist = Checklist.objects.create(project=self.project, title="竣工検査")
+        items = [ChecklistItem.objects.create(checklist=checklist, title=f"項目{i}") for i in range(4)]
+        checklist_toggle.toggle_items(self.company.pk, {items[0].pk: True, items[1].pk: True})
+        items[2].delete()
+        self.project.refresh_from_db()
+        self.assertEqual((self.project.checklist_items_done, self.project.checklist_items_total), (2, 3))
+        checklist.delete()
+        self.project.refresh_from_db()
+        self.assertEqual((self.project.checklist_items_done, self.project.checklist_items_total), (0, 0))
+        self.assertCountsMatchRecount()
+
+    def test_editing_a_stale_project_keeps_rollups_and_version(self):
+        stale = Project.objects.get(pk=self.project.pk)
+        self.make_task(start_date=date(2025, 4, 1), end_date=date(2025, 4, 5), progress=20)
+        self.project.refresh_from_db()
+        version = self.project.task_version
+        self.assertGreater(version, stale.task_version)
+        stale.status = "進行中"
+        stale.save()
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.status, "進行中")
+        self.assertEqual(self.project.task_version, version)
+        self.assertEqual(self.rollup(), (1, 5, 100))
+        self.assertCountsMatchRecount()
+
+    def test_edit_view_keeps_rollups(self):
+        self.make_task(start_date=date(2025, 4, 1), end_date=date(2025, 4, 5), progress=20)
+        response = self.client.post(
+            reverse("project_edit", args=[self.project.pk]),
+            {"name": "A邸新築（改）", "status": "進行中", "start_date": "", "end_date": "", "description": ""},
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.rollup(), (1, 5, 100))
+        self.assertEqual(self.project.name, "A邸新築（改）")
+        self.assertCountsMatchRecount()
+
+    def test_import_and_reschedule_keep_rollups(self):
+        task_import.import_tasks(
+            self.project,
+            io.StringIO("タスク名,開始日,終了日,進捗,先行タスク\n基礎,2025-04-01,2025-04-10,0,\n躯体,2025-04-11,2025-04-20,0,1\n"),
+        )
+        first = Task.objects.get(project=self.project, name="基礎")
+        scheduling.reschedule_task(first, 5)
+        self.assertEqual(self.rollup()[:2], (2, 20))
+        self.assertCountsMatchRecount()
+
+
+class CompanyStatsTests(CounterAssertions, FixtureMixin, TestCase):
+    """ダッシュボード用の会社ごとの集計（CompanyStats）の保守"""
+
+    def stats(self):
+        stats = CompanyStats.objects.get(company=self.company)
+        return stats.in_progress_projects, stats.open_tasks, stats.due_soon_tasks, stats.overdue_tasks
+
+    def test_counts_follow_project_and_task_changes(self):
+        today = timezone.localdate()
+        company_stats.get_stats(self.company.pk)
+        self.assertEqual(self.stats(), (0, 0, 0, 0))
+
+        self.project.status = company_stats.IN_PROGRESS_STATUS
+        self.project.save()
+        soon = Task.objects.create(project=self.project, name="検査", end_date=today + timedelta(days=3))
+        late = Task.objects.create(project=self.project, name="是正", end_date=today - timedelta(days=1))
+        Task.objects.create(project=self.project, name="清掃")
+        self.assertEqual(self.stats(), (1, 3, 1, 1))
+
+        soon.progress = 100
+        soon.save()
+        late.end_date = today + timedelta(days=7)
+        late.save()
+        self.assertEqual(self.stats(), (1, 2, 1, 0))
+        self.assertCountsMatchRecount()
+
+        other = Project.objects.create(company=self.company, name="B邸改修", status=company_stats.IN_PROGRESS_STATUS)
+        late.project = other
+        late.save()
+        self.project.delete()
+        self.assertEqual(self.stats(), (1, 1, 1, 0))
+        self.assertCountsMatchRecount()
+
+    def test_stale_day_is_recounted(self):
+        Task.objects.create(project=self.project, name="検査", end_date=timezone.localdate())
+        CompanyStats.objects.filter(company=self.company).update(
+            as_of=timezone.localdate() - timedelta(days=1), due_soon_tasks=0
+        )
+        self.assertEqual(company_stats.get_stats(self.company.pk).due_soon_tasks, 1)
+
+
+class DashboardCacheTests(FixtureMixin, TestCase):
+    """ホーム画面のキャッシュ（CompanyStats.version による無効化と、組み立てのロック）"""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        company_stats.get_stats(self.company.pk)
+
+    def version(self):
+        return CompanyStats.objects.get(company=self.company).version
+
+    def home(self):
+        return self.client.get(reverse("home")).content.decode()
+
+    def test_changes_bump_version_on_commit(self):
+        today = timezone.localdate()
+        steps = [
+            lambda: Task.objects.create(project=self.project, name="配筋検査", end_date=today),
+            lambda: Memo.objects.create(project=self.project, author=self.user, content="鉄筋の搬入は明朝"),
+            lambda: Project.objects.filter(pk=self.project.pk).get().save(),
+            lambda: Task.objects.get(name="配筋検査").delete(),
+            lambda: Memo.objects.get().delete(),
+        ]
+        for step in steps:
+            before = self.version()
+            with self.captureOnCommitCallbacks() as callbacks:
+                step()
+            self.assertEqual(self.version(), before)  # コミットまでは進めない
+            for callback in callbacks:
+                callback()
+            self.assertGreater(self.version(), before)
+
+    def test_home_shows_changes(self):
+        self.assertNotIn("配筋検査", self.home())
+        with self.captureOnCommitCallbacks(execute=True):
+            task = Task.objects.create(project=self.project, name="配筋検査", end_date=timezone.localdate())
+            Memo.objects.create(project=self.project, author=self.user, content="鉄筋の搬入は明朝")
+        page = self.home()
+        self.assertIn("配筋検査", page)
+        self.assertIn("鉄筋の搬入は明朝", page)
+        with self.captureOnCommitCallbacks(execute=True):
+            task.delete()
+        self.assertNotIn("配筋検査", self.home())
+
+    def test_cache_hit_reads_only_the_stats_row(self):
+        dashboard.get_context(self.company.pk)
+        with self.assertNumQueries(1):
+            dashboard.get_context(self.company.pk)
+
+    def test_held_lock_serves_last_content(self):
+        build = mock.Mock(return_value={"recent_memos": ["新しい内容"]})
+        cache.set("dashboard:test:last", {"recent_memos": ["直前の内容"]})
+        cache.add("dashboard:test:2:lock", 1)
+        data = dashboard._get_or_build("dashboard:test:2", "dashboard:test:last", build)
+        self.assertEqual(data, {"recent_memos": ["直前の内容"]})
+        build.assert_not_called()
+
+        cache.delete("dashboard:test:2:lock")
+        data = dashboard._get_or_build("dashboard:test:2", "dashboard:test:last", build)
+        self.assertEqual(data, {"recent_memos": ["新しい内容"]})
+        self.assertEqual(cache.get("dashboard:test:last"), data)
+        self.assertFalse(cache.get("dashboard:test:2:lock"))
+
+
+class DueTaskListTests(FixtureMixin, TestCase):
+    """期限が近い・期限切れの未完了タスク一覧（(終了日, ID) のキーセットページング）"""
+
+    def test_pages_cover_open_due_tasks_in_order(self):
+        today = timezone.localdate()
+        expected = []
+        for offset in (-3, 0, 0, 2, 7):
+            task = Task.objects.create(project=self.project, name="検査", end_date=today + timedelta(days=offset))
+            expected.append(task.pk)
+        Task.objects.create(project=self.project, name="完了済み", end_date=today, progress=100)
+        Task.objects.create(project=self.project, name="先の工程", end_date=today + timedelta(days=8))
+        Task.objects.create(project=self.project, name="未定")
+
+        seen, cursor = [], None
+        while True:
+            tasks, next_cursor = dashboard.due_tasks_page(self.company.pk, today, cursor, limit=2)
+            seen.extend(t["pk"] for t in tasks)
+            if next_cursor is None:
+                break
+            cursor = dashboard.decode_due_cursor(next_cursor)
+        self.assertEqual(seen, expected)
+
+    def test_invalid_cursor_is_a_bad_request(self):
+        url = reverse("due_task_list")
+        for after in ("abc", "2025-13-01_1", "2025-04-01_x", "2025-04-01_1_2"):
+            with self.subTest(after=after):
+                self.assertEqual(self.client.get(url, {"after": after}).status_code, 400)
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+
+class ProjectListTests(FixtureMixin, TestCase):
+    """案件一覧の並び替えとキーセットページング"""
+
+    def walk(self, sort):
+        qs = Project.objects.filter(company=self.company)
+        seen, cursor = [], None
+        while True:
+            projects, cursor = project_list.page(qs, sort, cursor, limit=2)
+            seen.extend(p.pk for p in projects)
+            if cursor is None:
+                return seen
+
+    def test_pages_follow_each_sort_with_nulls_last(self):
+        for name, end in (("B邸", date(2025, 6, 1)), ("C邸", None), ("D邸", date(2025, 5, 1)), ("E邸", date(2025, 6, 1))):
+            Project.objects.create(company=self.company, name=name, end_date=end)
+        projects = list(Project.objects.filter(company=self.company))
+
+        def by(key):
+            return [p.pk for p in sorted(projects, key=key)]
+
+        def end_key(p, desc=False):
+            pk = -p.pk if desc else p.pk
+            if p.end_date is None:
+                return (1, 0, pk)
+            ordinal = p.end_date.toordinal()
+            return (0, -ordinal if desc else ordinal, pk)
+
+        self.assertEqual(self.walk("new"), by(lambda p: -p.pk))
+        self.assertEqual(self.walk("old"), by(lambda p: p.pk))
+        self.assertEqual(self.walk("end"), by(end_key))
+        self.assertEqual(self.walk("-end"), by(lambda p: end_key(p, desc=True)))
+        self.assertEqual(self.walk("name"), by(lambda p: (p.name, p.pk)))
+
+    def test_invalid_cursor_is_a_bad_request(self):
+        url = reverse("project_list")
+        cursors = ("!!!", "bm90LWpzb24", project_list.encode_cursor(123, 1))
+        for after in cursors:
+            with self.subTest(after=after):
+                self.assertEqual(self.client.get(url, {"sort": "name", "after": after}).status_code, 400)
+        bad_date = project_list.encode_cursor("x", 1)
+        self.assertEqual(self.client.get(url, {"sort": "end", "after": bad_date}).status_code, 400)
+        self.assertEqual(self.client.get(url, {"sort": "name"}).status_code, 200)
+
+
+class ProjectTabTests(FixtureMixin, TestCase):
+    """案件詳細の共有メモ・チェックリストのタブ（ID のカーソルで次ページ）"""
+
+    def test_memo_pages_walk_newest_first(self):
+        memos = [Memo.objects.create(project=self.project, author=self.user, content=f"申し送り{i}") for i in range(5)]
+        seen, cursor = [], None
+        while True:
+            page, cursor = project_tabs.memo_page(self.project, cursor, limit=2)
+            seen.extend(m.pk for m in page)
+            if cursor is None:
+                break
+        self.assertEqual(seen, [m.pk for m in reversed(memos)])
+
+    def test_checklist_pages_walk_newest_first(self):
+        checklists = [Checklist.objects.create(project=self.project, title=f"検査{i}") for i in range(3)]
+        page, cursor = project_tabs.checklist_page(self.project, limit=2)
+        self.assertEqual([c.pk for c in page], [checklists[2].pk, checklists[1].pk])
+        page, cursor = project_tabs.checklist_page(self.project, cursor, limit=2)
+        self.assertEqual(([c.pk for c in page], cursor), ([checklists[0].pk], None))
 
-# Create your tests here.
+    def test_invalid_memo_cursor_is_a_bad_request(self):
+        url = reverse("project_memo_list", args=[self.project.pk])
+        self.assertEqual(self.client.get(url, {"before": "abc"}).status_code, 400)
+        self.assertEqual(self.client.get(url).status_code, 200)
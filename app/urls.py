@@ -24,13 +24,23 @@ from .views import (
     AcceptInvitationView,
     MemberDeleteView,
     InvitationDeleteView,
-
-    # ガント/タスク JSON
-    ProjectTaskJSONView,
 )
 
+# ガント/タスク JSON は分割ファイルから
+from .views_gantt import ProjectTaskJSONView, ProjectScheduleJSONView
+
+# PDF 生成ジョブは分割ファイルから
+from .views_pdf import PdfJobCreateView, PdfBatchCreateView, PdfJobStatusView, PdfJobDownloadView
+
 # 共有メモは分割ファイルから
-from .views_memo import MemoCreateView, MemoUpdateView
+from .views_memo import (
+    MemoCreateView,
+    MemoUpdateView,
+    MentionInboxView,
+    MentionReadView,
+    MentionReadAllView,
+    ProjectMemoListView,
+)
 
 # チェックリストは分割ファイルから
 from .views_checklist import (
@@ -39,10 +49,23 @@ from .views_checklist import (
     ChecklistItemCreateView,
     ChecklistItemUpdateView,
     ChecklistItemToggleView,
+    ChecklistItemToggleJSONView,
+    ChecklistItemBatchToggleView,
+    ProjectChecklistListView,
 )
 
 # タスクは分割ファイルから
-from .views_task import TaskCreateView, TaskUpdateView, TaskDeleteView
+from .views_task import (
+    TaskCreateView,
+    TaskUpdateView,
+    TaskDeleteView,
+    TaskRescheduleView,
+    TaskImportView,
+    DueTaskListView,
+)
+
+# 全文検索は分割ファイルから
+from .views_search import SearchView
 
 
 urlpatterns = [
@@ -64,11 +87,22 @@ urlpatterns = [
     path("projects/<int:pk>/pdf/", ProjectPDFView.as_view(), name="project_pdf"),
     path("projects/<int:pk>/gantt_pdf/", GanttPDFView.as_view(), name="project_gantt_pdf"),
 
+    # PDF 生成ジョブ（バックグラウンド生成）
+    path("projects/<int:pk>/pdf/jobs/", PdfJobCreateView.as_view(), name="pdf_job_create"),
+    path("pdf/batch/", PdfBatchCreateView.as_view(), name="pdf_batch_create"),
+    path("pdf/jobs/<int:pk>/", PdfJobStatusView.as_view(), name="pdf_job_status"),
+    path("pdf/jobs/<int:pk>/download/", PdfJobDownloadView.as_view(), name="pdf_job_download"),
+
     # 共有メモ
+    path("projects/<int:pk>/memos/", ProjectMemoListView.as_view(), name="project_memo_list"),
     path("projects/<int:pk>/memos/create/", MemoCreateView.as_view(), name="memo_create"),
     path("memos/<int:pk>/edit/", MemoUpdateView.as_view(), name="memo_edit"),
+    path("mentions/", MentionInboxView.as_view(), name="mention_inbox"),
+    path("mentions/<int:pk>/read/", MentionReadView.as_view(), name="mention_read"),
+    path("mentions/read-all/", MentionReadAllView.as_view(), name="mention_read_all"),
 
     # チェックリスト
+    path("projects/<int:pk>/checklists/", ProjectChecklistListView.as_view(), name="project_checklist_list"),
     path("projects/<int:pk>/checklists/create/", ChecklistCreateView.as_view(), name="checklist_create"),
     path("checklist/<int:pk>/edit/", ChecklistUpdateView.as_view(), name="checklist_edit"),
 
@@ -76,6 +110,8 @@ urlpatterns = [
     path("checklist/<int:pk>/item/create/", ChecklistItemCreateView.as_view(), name="item_create"),
     path("item/<int:pk>/edit/", ChecklistItemUpdateView.as_view(), name="item_edit"),
     path("item/<int:pk>/toggle/", ChecklistItemToggleView.as_view(), name="item_toggle"),
+    path("item/<int:pk>/toggle.json", ChecklistItemToggleJSONView.as_view(), name="item_toggle_json"),
+    path("items/toggle.json", ChecklistItemBatchToggleView.as_view(), name="items_toggle_batch"),
 
     # メンバー管理/招待
     path("members/", MemberManagementView.as_view(), name="member_management"),
@@ -85,7 +121,14 @@ urlpatterns = [
 
     # ガント/タスク
     path("projects/<int:pk>/tasks.json", ProjectTaskJSONView.as_view(), name="project_tasks_json"),
+    path("projects/<int:pk>/schedule.json", ProjectScheduleJSONView.as_view(), name="project_schedule_json"),
     path("projects/<int:pk>/task/create/", TaskCreateView.as_view(), name="task_create"),
+    path("projects/<int:pk>/task/import/", TaskImportView.as_view(), name="task_import"),
     path("task/<int:pk>/edit/", TaskUpdateView.as_view(), name="task_edit"),
     path("task/<int:pk>/delete/", TaskDeleteView.as_view(), name="task_delete"),
+    path("task/<int:pk>/reschedule/", TaskRescheduleView.as_view(), name="task_reschedule"),
+    path("tasks/due/", DueTaskListView.as_view(), name="due_task_list"),
+
+    # 全文検索
+    path("search/", SearchView.as_view(), name="search"),
 ]
\ No newline at end of file
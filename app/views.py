@@ -6,11 +6,13 @@ from django.conf import settings
 from django.contrib.auth import login
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.contrib.auth.views import LoginView, LogoutView
+from django.core.exceptions import BadRequest
 from django.core.mail import send_mail
 from django.db import transaction
-from django.http import JsonResponse, HttpResponse
+from django.http import FileResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse, reverse_lazy
+from django.utils.cache import get_conditional_response, patch_cache_control
 from django.views import View
 from django.views.generic import (
     ListView,
@@ -20,19 +22,15 @@ from django.views.generic import (
     UpdateView,
     TemplateView,
 )
-from django.utils import timezone # ダッシュボード機能のために追加
 
-# PDF生成ライブラリをインポート
-from django.template.loader import render_to_string
-from weasyprint import HTML
+# PDF生成（WeasyPrint）は pdf モジュールにまとめている
+from . import dashboard, gantt_svg, pdf, project_list
 
 from .models import (
     Company,
     CustomUser,
     Project,
     Task,
-    Memo,
-    Checklist,
     ChecklistItem,
     Invitation,
 )
@@ -41,11 +39,9 @@ from .forms import (
     SignUpForm,
     CustomAuthenticationForm,
     ProjectForm,
+    ProjectFilterForm,
     MemoCreateForm,
-    ChecklistCreateForm,
-    ChecklistItemForm,
     InvitationForm,
-    TaskForm,
     MemoUpdateForm,
     ChecklistUpdateForm,
     ChecklistItemUpdateForm,
@@ -118,40 +114,13 @@ class HomeView(LoginRequiredMixin, View):
     template_name = "app/home.html"
 
     def get(self, request, *args, **kwargs):
-        company = request.user.company # ログインユーザーの所属会社を取得
-
-        # --- ダッシュボード用のデータを取得 ---
-
-        # 1. 進行中の案件数を取得
-        project_count = Project.objects.filter(company=company, status="進行中").count()
-
-        # 2. 期限切れ or 7日以内に期限が来る未完了タスクを取得
-        today = timezone.now().date()
-        due_date_limit = today + timezone.timedelta(days=7)
-        overdue_tasks = Task.objects.filter(
-            project__company=company,   # ログインユーザーの会社のタスク
-            end_date__lte=due_date_limit, # 期限が7日以内または過去
-            progress__lt=100            # 未完了 (進捗100%未満)
-        ).select_related('project').order_by('end_date') # プロジェクト情報も取得し、期限日でソート
-
-        # 期限が近いタスクの件数を取得
-        overdue_task_count = overdue_tasks.count()
-
-        # 3. 最近共有されたメモを5件取得
-        recent_memos = (
-            Memo.objects.filter(project__company=company) # ログインユーザーの会社のメモ
-            .select_related("project", "author") # プロジェクトと作成者の情報も取得
-            .order_by("-id")[:5] # 新しい順に5件
-        )
-
-        # テンプレートに渡すコンテキストデータを作成
-        context = {
-            "project_count": project_count,
-            "overdue_task_count": overdue_task_count,
-            "overdue_tasks": overdue_tasks,
-            "recent_memos": recent_memos,
-            "today": today, # テンプレートで今日の日付を使うため
-        }
+        # 件数（会社ごとの集計）と「期限が近いタスク」「最近の共有メモ」は会社で共通なので、
+        # 会社ごとにキャッシュした内容を使う（dashboard を参照）
+        context = dashboard.get_context(request.user.company_id)
+        context.update({
+            "project_count": context["stats"].in_progress_projects,
+            "overdue_task_count": context["stats"].due_tasks,
+        })
 
         # テンプレートを描画して返す
         return render(request, self.template_name, context)
@@ -169,13 +138,38 @@ class HowToUseView(LoginRequiredMixin, TemplateView):
 # プロジェクト関連ビュー
 # ------------------------------------------------------------
 class ProjectListView(LoginRequiredMixin, ListView):
-    """プロジェクト一覧ビュー"""
+    """
+    プロジェクト一覧ビュー
+    ステータス・顧客・終了予定日で絞り込み、並び替えてキーセットページングで表示する（project_list を参照）
+    """
     template_name = "app/project_list.html"
     context_object_name = "projects" # テンプレートでの変数名
 
     def get_queryset(self):
-        # ログインユーザーの会社のプロジェクトを新しい順に取得
-        return Project.objects.filter(company=self.request.user.company).order_by("-id")
+        # ログインユーザーの会社のプロジェクトを、絞り込み・並び替えて 1 ページ分だけ取得
+        company = self.request.user.company
+        self.filter_form = ProjectFilterForm(self.request.GET, company=company)
+        filters = self.filter_form.filters()
+        qs = project_list.filter_projects(Project.objects.filter(company=company), filters)
+        self.sort = filters.get("sort", project_list.DEFAULT_SORT)
+        try:
+            projects, self.next_cursor = project_list.page(qs, self.sort, self.request.GET.get("after"))
+        except ValueError:
+            raise BadRequest("after が不正です")
+        return projects
+
+    def get_context_data(self, **kwargs):
+        ctx = super().get_context_data(**kwargs)
+        # 一括PDF出力の絞り込み用（空の選択肢は除く）
+        ctx["status_choices"] = [c for c in ProjectForm.STATUS_CHOICES if c[0]]
+        ctx["filter_form"] = self.filter_form
+        ctx["next_cursor"] = self.next_cursor
+        ctx["is_first_page"] = not self.request.GET.get("after")
+        # ページ送りのリンクに絞り込み条件を引き継ぐ
+        params = self.request.GET.copy()
+        params.pop("after", None)
+        ctx["filter_query"] = params.urlencode()
+        return ctx
 
 
 class ProjectCreateView(AdminRequiredMixin, CreateView):
@@ -207,27 +201,10 @@ class ProjectDetailView(LoginRequiredMixin, DetailView):
         return Project.objects.filter(company=self.request.user.company)
 
     def get_context_data(self, **kwargs):
-        # 詳細ページで表示する追加情報をコンテキストに追加
+        # 最初に見えるのは工程表（JSON を別途取得）だけなので、ここでは何も読まない。
+        # チェックリストと共有メモはタブを開いたときに断片を読み込む（views_checklist / views_memo）
         ctx = super().get_context_data(**kwargs)
-        project: Project = self.object # 現在表示しているプロジェクトオブジェクト
-        # 関連するメモを新しい順に取得 (作成者情報も)
-        ctx["memos"] = (
-            Memo.objects.filter(project=project)
-            .select_related("author")
-            .prefetch_related("mentions") # パフォーマンス改善: メンション情報を先読み
-            .order_by("-id")
-        )
-        # 関連するチェックリストを新しい順に取得 (アイテム情報も)
-        ctx["checklists"] = (
-            Checklist.objects.filter(project=project)
-            .prefetch_related("items") # パフォーマンス改善: アイテム情報を先読み
-            .order_by("-id")
-        )
-        # 各種作成フォームをコンテキストに追加
-        ctx["task_form"] = TaskForm(project=project) # タスクフォームにはプロジェクト情報が必要
-        ctx["checklist_item_form"] = ChecklistItemForm()
         ctx["memo_form"] = MemoCreateForm()
-        ctx["checklist_form"] = ChecklistCreateForm()
         return ctx
 
 
@@ -389,45 +366,31 @@ class InvitationDeleteView(AdminRequiredMixin, View):
 
 
 # ------------------------------------------------------------
-# ガントチャート用 JSON ビュー
+# PDF出力ビュー
 # ------------------------------------------------------------
-class ProjectTaskJSONView(LoginRequiredMixin, View):
-    """特定のプロジェクトのタスク情報をJSON形式で返すビュー (ガントチャートライブラリ用)"""
-
-    def get(self, request, *args, **kwargs):
-        project = get_object_or_404(Project, pk=self.kwargs["pk"], company=request.user.company)
-        tasks_qs = (
-            Task.objects.filter(project=project)
-            .prefetch_related("dependencies") # パフォーマンス改善: 依存タスク情報を先読み
-            .order_by("start_date", "end_date", "id") # ガントチャート表示に適した順序
-        )
-
-        # Frappe Gantt ライブラリが要求する形式にデータを変換
-        data = []
-        for t in tasks_qs:
-            deps = []
-            # 依存タスクIDのリストを作成
-            if hasattr(t, "dependencies"):
-                deps = [str(d.id) for d in t.dependencies.all()]
-            data.append(
-                {
-                    "id": str(t.id),
-                    "name": getattr(t, "name", "") or "", # タスク名 (空の場合も考慮)
-                    "start": (t.start_date.isoformat() if getattr(t, "start_date", None) else None), # 開始日 (ISO形式)
-                    "end": (t.end_date.isoformat() if getattr(t, "end_date", None) else None), # 終了日 (ISO形式)
-                    "progress": int(getattr(t, "progress", 0) or 0), # 進捗率 (整数)
-                    "dependencies": ",".join(deps), # 依存タスクID (カンマ区切り文字列)
-                }
-            )
-        # JSONレスポンスとして返す (リストなので safe=False)
-        return JsonResponse(data, safe=False)
+def _pdf_file_response(request, html_string: str, filename: str):
+    """
+    HTML に対応する PDF を返す。
+    内容ハッシュを ETag にしているので、同じ内容なら 304（WeasyPrint も呼ばない）、
+    キャッシュ済みならファイルをそのまま送る。
+    """
+    digest = pdf.html_digest(html_string)
+    etag = pdf.pdf_etag(digest)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        path = pdf.cached_pdf_path(html_string, base_url=request.build_absolute_uri())
+        # ダウンロード時のファイル名を指定
+        response = FileResponse(path.open("rb"), as_attachment=True, filename=filename, content_type="application/pdf")
+    response["ETag"] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
 
 
-# ------------------------------------------------------------
-# PDF出力ビュー
-# ------------------------------------------------------------
 class ProjectPDFView(LoginRequiredMixin, View):
-    """案件サマリーをPDFで出力するビュー"""
+    """
+    案件サマリーをPDFで出力するビュー（リクエスト内で生成する同期版）
+    通常の画面からは PDF 生成ジョブ（views_pdf）を使い、ワーカーが無いときだけこちらに戻る
+    """
 
     def get(self, request, *args, **kwargs):
         project = get_object_or_404(
@@ -435,40 +398,30 @@ class ProjectPDFView(LoginRequiredMixin, View):
             pk=self.kwargs["pk"],
             company=request.user.company
         )
-        # PDF生成用のHTMLテンプレートを描画
-        context = {"project": project}
-        html_string = render_to_string("app/project_pdf.html", context)
-        # WeasyPrint を使ってHTMLからPDFを生成
-        pdf_file = HTML(string=html_string, base_url=request.build_absolute_uri()).write_pdf()
-        # PDFファイルをHttpResponseとして返す
-        response = HttpResponse(pdf_file, content_type="application/pdf")
-        # ダウンロード時のファイル名を指定
-        response["Content-Disposition"] = f'attachment; filename="project_{project.pk}_{project.name}.pdf"'
-        return response
+        # PDF生成用のHTMLテンプレートを描画（PDF はこの HTML の内容でキャッシュされる）
+        html_string = pdf.render_project_html(project)
+        return _pdf_file_response(request, html_string, pdf.project_filename(project))
 
 
 class GanttPDFView(LoginRequiredMixin, View):
-    """工程表（ガントチャート）をPDFで出力するビュー"""
+    """
+    工程表（ガントチャート）をPDFで出力するビュー（リクエスト内で生成する同期版）
+    SVG はサーバー側でタスクから描画する（?view=Day/Week/Month で表示モードを指定）
+    """
 
-    def post(self, request, *args, **kwargs):
+    def get(self, request, *args, **kwargs):
         project = get_object_or_404(
             Project,
             pk=self.kwargs["pk"],
             company=request.user.company
         )
-        # JavaScriptから送られてきたSVGデータを取得
-        svg_data = request.POST.get('svg_data', '')
-        # PDF生成用のHTMLテンプレートを描画
-        context = {
-            "project": project,
-            "svg_data": svg_data, # SVGデータをテンプレートに渡す
-        }
-        html_string = render_to_string("app/gantt_pdf.html", context)
-        # WeasyPrint を使ってHTMLからPDFを生成
-        pdf_file = HTML(string=html_string, base_url=request.build_absolute_uri()).write_pdf()
-        # PDFファイルをHttpResponseとして返す
-        response = HttpResponse(pdf_file, content_type="application/pdf")
-        # ダウンロード時のファイル名を指定
-        response["Content-Disposition"] = f'attachment; filename="gantt_{project.pk}_{project.name}.pdf"'
-        return response
+        view_mode = request.GET.get("view", gantt_svg.DEFAULT_VIEW_MODE)
+        # PDF生成用のHTMLテンプレート（サーバー側で描画したSVG入り）を描画
+        html_string = pdf.render_gantt_html(project, view_mode)
+        return _pdf_file_response(request, html_string, pdf.gantt_filename(project))
 
+    def post(self, request, *args, **kwargs):
+        # 旧画面（SVG を POST していた版）からの呼び出し互換。送られた SVG は使わない
+        request.GET = request.GET.copy()
+        request.GET.setdefault("view", request.POST.get("view", gantt_svg.DEFAULT_VIEW_MODE))
+        return self.get(request, *args, **kwargs)
@@ -1,9 +1,15 @@
+import json
+
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.core.exceptions import BadRequest
+from django.db import transaction
+from django.http import Http404, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.views import View
 
 from .forms import ChecklistItemForm, ChecklistCreateForm, ChecklistUpdateForm
 from .models import Checklist, ChecklistItem, Project
+from . import checklist_toggle, project_tabs
 
 
 class ChecklistCreateView(LoginRequiredMixin, View):
@@ -92,7 +98,9 @@ class ChecklistItemCreateView(LoginRequiredMixin, View):
         if form.is_valid():
             item = form.save(commit=False)
             item.checklist = checklist
-            item.save()
+            # 案件の集計（シグナルで足し引き）も同じトランザクションで更新する
+            with transaction.atomic():
+                item.save()
             return redirect("project_detail", pk=checklist.project_id)
         return render(
             request,
@@ -120,7 +128,8 @@ class ChecklistItemUpdateView(LoginRequiredMixin, View):
         item = self.get_object(pk)
         form = ChecklistItemForm(request.POST, instance=item)
         if form.is_valid():
-            form.save()
+            with transaction.atomic():
+                form.save()
             return redirect("project_detail", pk=item.checklist.project_id)
         return render(
             request,
@@ -131,10 +140,84 @@ class ChecklistItemUpdateView(LoginRequiredMixin, View):
 
 class ChecklistItemToggleView(LoginRequiredMixin, View):
     """
-    チェックのON/OFF切り替え（POST専用）
+    チェックのON/OFF切り替え（POST専用。JavaScript が無いとき用で、切り替えたら案件詳細へ戻る）
+    """
+    def post(self, request, pk, *args, **kwargs):
+        try:
+            result = checklist_toggle.toggle_items(request.user.company_id, {pk: None})
+        except checklist_toggle.ItemNotFound:
+            raise Http404("チェック項目が見つかりません")
+        return redirect("project_detail", pk=result.projects[0]["id"])
+
+
+def _parse_done(value) -> bool | None:
+    """done の指定（省略・null なら反転）"""
+    if value is None or value == "":
+        return None
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.lower() in ("1", "true", "yes", "on", "0", "false", "no", "off"):
+        return value.lower() in ("1", "true", "yes", "on")
+    raise ValueError(f"done には true / false を指定してください: {value!r}")
+
+
+class ChecklistItemToggleJSONView(LoginRequiredMixin, View):
+    """
+    チェック項目 1 件の切り替え（POST専用・JSON を返す）
+      done : "1" / "0"（省略すると反転）
+    返り値は切り替え後の状態と、チェックリスト・案件の完了数 / 項目数
     """
     def post(self, request, pk, *args, **kwargs):
-        item = get_object_or_404(ChecklistItem, pk=pk)
-        item.is_done = not item.is_done
-        item.save(update_fields=["is_done", "updated_at"])
-        return redirect("project_detail", pk=item.checklist.project_id)
\ No newline at end of file
+        try:
+            changes = {pk: _parse_done(request.POST.get("done"))}
+            result = checklist_toggle.toggle_items(request.user.company_id, changes)
+        except checklist_toggle.ItemNotFound as e:
+            return JsonResponse({"error": str(e), "ids": e.ids}, status=404)
+        except ValueError as e:
+            return JsonResponse({"error": str(e)}, status=400)
+        return JsonResponse(result.to_json())
+
+
+class ChecklistItemBatchToggleView(LoginRequiredMixin, View):
+    """
+    チェック項目をまとめて切り替える（POST専用・1 トランザクション・JSON を返す）
+      本文: {"items": [{"id": 12, "done": true}, {"id": 13}, ...]}（done を省略すると反転。同じ項目は後の指定が優先）
+    見つからない項目が 1 件でもあれば何も変えずに 404 を返す
+    """
+    def post(self, request, *args, **kwargs):
+        try:
+            body = json.loads(request.body or b"{}")
+            items = body.get("items") if isinstance(body, dict) else None
+            if not isinstance(items, list):
+                raise ValueError("items にチェック項目の配列を指定してください")
+            changes = {}
+            for item in items:
+                if not isinstance(item, dict) or isinstance(item.get("id"), bool) or not isinstance(item.get("id"), int):
+                    raise ValueError(f"チェック項目の指定が不正です: {item!r}")
+                changes[item["id"]] = _parse_done(item.get("done"))
+            result = checklist_toggle.toggle_items(request.user.company_id, changes)
+        except checklist_toggle.ItemNotFound as e:
+            return JsonResponse({"error": str(e), "ids": e.ids}, status=404)
+        except ValueError as e:  # JSONDecodeError も ValueError
+            return JsonResponse({"error": str(e)}, status=400)
+        return JsonResponse(result.to_json())
+
+
+class ProjectChecklistListView(LoginRequiredMixin, View):
+    """案件詳細の「チェックリスト」タブの中身（HTML 断片。新しい順に ?before=チェックリストID で次ページ）"""
+    template_name = "app/project_checklist_list.html"
+
+    def get(self, request, pk):
+        project = get_object_or_404(Project, pk=pk, company=request.user.company)
+        before = request.GET.get("before") or None
+        if before is not None:
+            try:
+                before = int(before)
+            except ValueError:
+                raise BadRequest("before が不正です")
+        checklists, next_cursor = project_tabs.checklist_page(project, before)
+        return render(
+            request,
+            self.template_name,
+            {"project": project, "checklists": checklists, "next_cursor": next_cursor, "is_first_page": before is None},
+        )
@@ -0,0 +1,161 @@
+# app/views_gantt.py
+
+from __future__ import annotations
+
+import calendar
+import gzip
+import re
+from datetime import date
+
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+from django.views import View
+
+from .models import Project
+from . import scheduling, task_feed
+
+# django.middleware.gzip と同じ判定
+_ACCEPTS_GZIP = re.compile(r"\bgzip\b")
+
+
+def _last_modified_ts(project: Project) -> int | None:
+    if project.tasks_modified_at is None:
+        return None
+    return calendar.timegm(project.tasks_modified_at.utctimetuple())
+
+
+def _set_validators(response, etag: str, last_modified: int | None):
+    """ETag / Last-Modified を付与し、毎回再検証させる（304 で転送量を抑える）"""
+    response["ETag"] = etag
+    if last_modified is not None:
+        response["Last-Modified"] = http_date(last_modified)
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+# ------------------------------------------------------------
+# ガントチャート用 JSON ビュー
+# ------------------------------------------------------------
+class ProjectTaskJSONView(LoginRequiredMixin, View):
+    """
+    特定のプロジェクトのタスク情報をJSON形式で返すビュー (ガントチャートライブラリ用)
+
+    - 工程データ版数を ETag にしているので、変更がなければ 304 を返す
+    - ?since=<版数> を付けると、それ以降の変更分だけを返す
+        {"version": 現在の版数, "since": ..., "tasks": [...], "deleted": ["タスクID", ...]}
+    - ?from=YYYY-MM-DD&to=YYYY-MM-DD&limit=N&after=<カーソル> を付けると、期間に掛かる
+      タスクをページ単位で返す（案件全体の期間・件数を meta に含む）
+        {"version": ..., "meta": {...}, "tasks": [...], "next": 次ページのカーソル or null}
+    - ?format=columnar または Accept: application/vnd.fieldnote.tasks+json で列指向形式になる
+      （全件・期間窓のどちらでも。gzip 済みのキャッシュをそのまま返す）
+    """
+
+    WINDOW_PARAMS = ("from", "to", "limit", "after")
+
+    def get(self, request, *args, **kwargs):
+        project = get_object_or_404(Project, pk=self.kwargs["pk"], company=request.user.company)
+        since = request.GET.get("since")
+        columnar = since is None and self._wants_columnar(request)
+
+        etag = task_feed.task_etag(project, "columnar" if columnar else "")
+        last_modified = _last_modified_ts(project)
+        not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if not_modified is not None:
+            return self._finish(not_modified, project, etag, last_modified)
+
+        window = None
+        if since is None and any(p in request.GET for p in self.WINDOW_PARAMS):
+            try:
+                window = self._window_params(request.GET)
+            except ValueError:
+                return JsonResponse(
+                    {"error": "from/to は YYYY-MM-DD、limit は整数、after は前ページの next を指定してください"},
+                    status=400,
+                )
+
+        if since is not None:
+            try:
+                cursor = task_feed.parse_cursor(since)
+            except ValueError:
+                return JsonResponse({"error": "since には版数（0以上の整数）を指定してください"}, status=400)
+            response = JsonResponse(task_feed.build_delta(project, cursor))
+        elif columnar:
+            response = self._columnar_response(request, project, window)
+        elif window is not None:
+            response = JsonResponse(task_feed.build_window(project, **window))
+        else:
+            # 全件はモデルを組み立てずに値だけを読み、少しずつ書き出す（大規模案件でもメモリが増えない）
+            response = StreamingHttpResponse(
+                task_feed.iter_task_json(project), content_type="application/json"
+            )
+        return self._finish(response, project, etag, last_modified)
+
+    @staticmethod
+    def _finish(response, project, etag, last_modified):
+        # 全件取得後の差分取得の起点として版数をヘッダーでも返す
+        response["X-Task-Version"] = str(project.task_version)
+        # 同じ URL でも Accept で形式が、Accept-Encoding で圧縮有無が変わる
+        patch_vary_headers(response, ("Accept", "Accept-Encoding"))
+        return _set_validators(response, etag, last_modified)
+
+    @staticmethod
+    def _wants_columnar(request) -> bool:
+        if request.GET.get("format") == "columnar":
+            return True
+        return task_feed.COLUMNAR_MEDIA_TYPE in request.headers.get("Accept", "")
+
+    @staticmethod
+    def _columnar_response(request, project, window):
+        body = task_feed.get_columnar_gzip(project, window)
+        if _ACCEPTS_GZIP.search(request.headers.get("Accept-Encoding", "")):
+            response = HttpResponse(body, content_type=task_feed.COLUMNAR_MEDIA_TYPE)
+            response["Content-Encoding"] = "gzip"
+        else:
+            response = HttpResponse(gzip.decompress(body), content_type=task_feed.COLUMNAR_MEDIA_TYPE)
+        return response
+
+    @staticmethod
+    def _window_params(params) -> dict:
+        """期間窓 / ページングのクエリを解釈する（不正なら ValueError）"""
+        window = {
+            "date_from": date.fromisoformat(params["from"]) if params.get("from") else None,
+            "date_to": date.fromisoformat(params["to"]) if params.get("to") else None,
+            "after": task_feed.decode_page_cursor(params["after"]) if params.get("after") else None,
+        }
+        if params.get("limit"):
+            window["limit"] = int(params["limit"])
+        return window
+
+
+# ------------------------------------------------------------
+# 工程スケジュール（クリティカルパス）JSON ビュー
+# ------------------------------------------------------------
+class ProjectScheduleJSONView(LoginRequiredMixin, View):
+    """
+    依存関係から計算した最早/最遅日程・余裕日数・クリティカルパスを返すビュー。
+    計算結果は工程データ版数ごとにキャッシュされる。
+    """
+
+    def get(self, request, *args, **kwargs):
+        project = get_object_or_404(Project, pk=self.kwargs["pk"], company=request.user.company)
+
+        etag = f'"schedule-{project.pk}-{project.task_version}"'
+        last_modified = _last_modified_ts(project)
+        not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if not_modified is not None:
+            return _set_validators(not_modified, etag, last_modified)
+
+        try:
+            data = scheduling.get_schedule_data(project)
+        except scheduling.ScheduleCycleError as e:
+            # 既存データに循環が残っている場合（フォームでは登録できない）
+            return JsonResponse(
+                {"error": "依存関係が循環しています", "cycle": [str(pk) for pk in e.cycle]},
+                status=409,
+            )
+        response = JsonResponse(data)
+        response["X-Task-Version"] = str(project.task_version)
+        return _set_validators(response, etag, last_modified)
@@ -1,12 +1,14 @@
 # app/views_memo.py
 
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.core.exceptions import BadRequest
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse
 from django.views import View
 
-from .models import Project, Memo
+from .models import Project, Memo, MemoMention
 from .forms import MemoCreateForm  # Updateも同フォームを使う
+from . import mentions, project_tabs
 
 
 class MemoCreateView(LoginRequiredMixin, View):
@@ -32,6 +34,7 @@ class MemoCreateView(LoginRequiredMixin, View):
             memo.author = request.user
             memo.save()
             form.save_m2m()  # 将来 mentions をフォーム化した場合の保険
+            mentions.sync_mentions(memo)  # 本文の @ユーザー名 をメンションとして登録
             return redirect("project_detail", pk=project.pk)
 
         dummy = Memo(project=project, author=request.user, content="")
@@ -60,6 +63,7 @@ class MemoUpdateView(LoginRequiredMixin, View):
         form = MemoCreateForm(request.POST, instance=memo)
         if form.is_valid():
             form.save()
+            mentions.sync_mentions(memo)
             return redirect("project_detail", pk=memo.project.pk)
 
         return render(
@@ -67,3 +71,65 @@ class MemoUpdateView(LoginRequiredMixin, View):
             self.template_name,
             {"form": form, "project": memo.project, "object": memo, "mode": "edit"},
         )
+
+
+class MentionInboxView(LoginRequiredMixin, View):
+    """自分宛てのメンション（新しいメモ順。?before=メモID で次ページ、?unread=1 で未読のみ）"""
+    template_name = "app/mention_inbox.html"
+
+    def get(self, request):
+        before = request.GET.get("before") or None
+        if before is not None:
+            try:
+                before = int(before)
+            except ValueError:
+                raise BadRequest("before が不正です")
+        unread_only = request.GET.get("unread") == "1"
+        rows, next_cursor = mentions.inbox_page(request.user, before, unread_only=unread_only)
+        return render(
+            request,
+            self.template_name,
+            {
+                "mentions": rows,
+                "next_cursor": next_cursor,
+                "is_first_page": before is None,
+                "unread_only": unread_only,
+            },
+        )
+
+
+class MentionReadView(LoginRequiredMixin, View):
+    """メンションを既読にしてメモの案件を開く（pk はメモID）"""
+
+    def post(self, request, pk):
+        link = get_object_or_404(MemoMention.objects.select_related("memo"), memo_id=pk, user=request.user)
+        mentions.mark_read(request.user, [pk])
+        return redirect(reverse("project_detail", args=[link.memo.project_id]) + f"#memo-{pk}")
+
+
+class MentionReadAllView(LoginRequiredMixin, View):
+    """自分宛てのメンションをすべて既読にする"""
+
+    def post(self, request):
+        mentions.mark_read(request.user)
+        return redirect("mention_inbox")
+
+
+class ProjectMemoListView(LoginRequiredMixin, View):
+    """案件詳細の「共有メモ」タブの中身（HTML 断片。新しい順に ?before=メモID で次ページ）"""
+    template_name = "app/project_memo_list.html"
+
+    def get(self, request, pk):
+        project = get_object_or_404(Project, pk=pk, company=request.user.company)
+        before = request.GET.get("before") or None
+        if before is not None:
+            try:
+                before = int(before)
+            except ValueError:
+                raise BadRequest("before が不正です")
+        memos, next_cursor = project_tabs.memo_page(project, before)
+        return render(
+            request,
+            self.template_name,
+            {"project": project, "memos": memos, "next_cursor": next_cursor, "is_first_page": before is None},
+        )
@@ -0,0 +1,98 @@
+# app/views_pdf.py
+"""
+PDF 生成ジョブの登録・状態確認・ダウンロード
+
+    POST projects/<pk>/pdf/jobs/   kind=project|gantt, view=Week  → 202 {"id", "status", "status_url"}
+    POST pdf/batch/                status=進行中（省略可）→ 202（会社の案件サマリーを ZIP に一括出力）
+    GET  pdf/jobs/<id>/            → {"id", "status", "progress", "error", "download_url"}
+    GET  pdf/jobs/<id>/download/   → PDF / ZIP（完了後のみ）
+
+生成は pdf_worker コマンドが行う。ワーカーを動かしていない場合でも、
+従来の同期ビュー（project_pdf / project_gantt_pdf）はそのまま使える。
+"""
+
+from __future__ import annotations
+
+from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
+from django.http import FileResponse, Http404, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.views import View
+
+from .models import PdfJob, Project
+from . import gantt_svg, pdf
+
+
+def _job_json(job: PdfJob) -> dict:
+    data = {
+        "id": job.pk,
+        "kind": job.kind,
+        "status": job.status,
+        "status_url": reverse("pdf_job_status", args=[job.pk]),
+        "progress": {"done": job.progress_done, "total": job.progress_total},
+        "error": job.error or None,
+        "download_url": None,
+    }
+    if job.status == PdfJob.STATUS_DONE:
+        data["download_url"] = reverse("pdf_job_download", args=[job.pk])
+    return data
+
+
+class PdfJobCreateView(LoginRequiredMixin, View):
+    """PDF 生成ジョブを登録する（POST専用）"""
+
+    def post(self, request, *args, **kwargs):
+        project = get_object_or_404(Project, pk=self.kwargs["pk"], company=request.user.company)
+        kind = request.POST.get("kind", PdfJob.KIND_PROJECT)
+        if kind == PdfJob.KIND_GANTT:
+            view_mode = request.POST.get("view", gantt_svg.DEFAULT_VIEW_MODE)
+            if view_mode not in gantt_svg.VIEW_MODES:
+                return JsonResponse({"error": "view には Day / Week / Month / Year を指定してください"}, status=400)
+            params = {"view": view_mode}
+        elif kind == PdfJob.KIND_PROJECT:
+            params = {}
+        else:
+            return JsonResponse({"error": "kind には project / gantt を指定してください"}, status=400)
+
+        job = pdf.enqueue(project, kind, params, user=request.user, base_url=request.build_absolute_uri("/"))
+        return JsonResponse(_job_json(job), status=202)
+
+
+class PdfBatchCreateView(LoginRequiredMixin, UserPassesTestMixin, View):
+    """会社の案件サマリーを一括で ZIP に出力するジョブを登録する（管理者のみ・POST専用）"""
+
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def post(self, request, *args, **kwargs):
+        status = request.POST.get("status", "").strip()
+        job = pdf.enqueue_batch(
+            request.user.company, status, user=request.user, base_url=request.build_absolute_uri("/")
+        )
+        return JsonResponse(_job_json(job), status=202)
+
+
+class PdfJobStatusView(LoginRequiredMixin, View):
+    """ジョブの状態（画面側で数秒おきに確認する）"""
+
+    def get(self, request, *args, **kwargs):
+        job = get_object_or_404(PdfJob, pk=self.kwargs["pk"], company=request.user.company)
+        response = JsonResponse(_job_json(job))
+        response["Cache-Control"] = "no-store"
+        return response
+
+
+class PdfJobDownloadView(LoginRequiredMixin, View):
+    """生成済み PDF（一括出力は ZIP）のダウンロード"""
+
+    def get(self, request, *args, **kwargs):
+        job = get_object_or_404(PdfJob, pk=self.kwargs["pk"], company=request.user.company)
+        if job.status != PdfJob.STATUS_DONE or not job.file:
+            raise Http404("PDF はまだ生成されていません")
+        is_zip = job.kind == PdfJob.KIND_BATCH
+        return FileResponse(
+            job.file.open("rb"),
+            as_attachment=True,
+            filename=job.filename or f"{job.pk}.{'zip' if is_zip else 'pdf'}",
+            content_type="application/zip" if is_zip else "application/pdf",
+        )
@@ -0,0 +1,24 @@
+# app/views_search.py
+
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.core.exceptions import BadRequest
+from django.shortcuts import render
+from django.views import View
+
+from . import search
+
+
+class SearchView(LoginRequiredMixin, View):
+    """自社の案件・タスク・共有メモ・チェック項目の全文検索（?q=検索語&page=ページ番号）"""
+    template_name = "app/search.html"
+
+    def get(self, request):
+        query = request.GET.get("q", "").strip()
+        try:
+            page = int(request.GET.get("page") or 1)
+        except ValueError:
+            raise BadRequest("page が不正です")
+        result = None
+        if query:
+            result = search.search(request.user.company_id, query, page)
+        return render(request, self.template_name, {"query": query, "result": result})
@@ -1,12 +1,18 @@
 # app/views_task.py
 
+from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.core.exceptions import BadRequest
+from django.db import transaction
+from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse
+from django.utils import timezone
 from django.views import View
 
 from .models import Project, Task
-from .forms import TaskForm
+from .forms import TaskForm, TaskImportForm
+from . import company_stats, dashboard, scheduling, task_import
 
 
 class TaskCreateView(LoginRequiredMixin, View):
@@ -33,8 +39,10 @@ class TaskCreateView(LoginRequiredMixin, View):
         if form.is_valid():
             task = form.save(commit=False)
             task.project = project
-            task.save()
-            form.save_m2m()  # dependencies
+            # 案件の集計（シグナルで足し引き）も同じトランザクションで更新する
+            with transaction.atomic():
+                task.save()
+                form.save_m2m()  # dependencies
             return redirect("project_detail", pk=project.pk)
 
         dummy = Task(project=project, name="", progress=0)
@@ -61,7 +69,8 @@ class TaskUpdateView(LoginRequiredMixin, View):
         task = get_object_or_404(Task, pk=pk)
         form = TaskForm(request.POST, instance=task, project=task.project)
         if form.is_valid():
-            form.save()
+            with transaction.atomic():
+                form.save()
             return redirect("project_detail", pk=task.project.pk)
 
         return render(
@@ -75,5 +84,112 @@ class TaskDeleteView(LoginRequiredMixin, View):
     def post(self, request, pk):
         task = get_object_or_404(Task, pk=pk)
         project_pk = task.project.pk
-        task.delete()
-        return redirect("project_detail", pk=project_pk)
\ No newline at end of file
+        with transaction.atomic():
+            task.delete()
+        return redirect("project_detail", pk=project_pk)
+
+
+class TaskRescheduleView(LoginRequiredMixin, View):
+    """
+    タスクを N 日ずらし、後続タスクを終了→開始の制約に合わせて一括で後ろへ送る（POST専用）
+      days    : ずらす日数（負数で前倒し。前後 scheduling.MAX_RESCHEDULE_DAYS 日まで）
+      dry_run : "1" / "true" なら保存せずに差分だけ返す
+    """
+    def post(self, request, pk):
+        task = get_object_or_404(Task, pk=pk, project__company=request.user.company)
+        try:
+            days = int(request.POST.get("days", ""))
+        except ValueError:
+            return JsonResponse({"error": "days には日数（整数）を指定してください"}, status=400)
+        if abs(days) > scheduling.MAX_RESCHEDULE_DAYS:
+            return JsonResponse(
+                {"error": f"days は -{scheduling.MAX_RESCHEDULE_DAYS}〜{scheduling.MAX_RESCHEDULE_DAYS} で指定してください"},
+                status=400,
+            )
+        dry_run = request.POST.get("dry_run", "").lower() in ("1", "true", "yes", "on")
+
+        try:
+            result = scheduling.reschedule_task(task, days, dry_run=dry_run)
+        except scheduling.ScheduleCycleError as e:
+            return JsonResponse(
+                {"error": "依存関係が循環しています", "cycle": [str(pk) for pk in e.cycle]},
+                status=409,
+            )
+        except ValueError as e:
+            return JsonResponse({"error": str(e)}, status=400)
+        return JsonResponse(result)
+
+
+class TaskImportView(LoginRequiredMixin, View):
+    """工程表（CSV / TSV）からタスクを一括登録する（誤りが 1 件でもあれば何も登録しない）"""
+    template_name = "app/task_import.html"
+
+    def get(self, request, pk):
+        project = get_object_or_404(Project, pk=pk, company=request.user.company)
+        return render(request, self.template_name, {"form": TaskImportForm(), "project": project})
+
+    def post(self, request, pk):
+        project = get_object_or_404(Project, pk=pk, company=request.user.company)
+        form = TaskImportForm(request.POST, request.FILES)
+        import_errors = []
+        if form.is_valid():
+            upload = form.cleaned_data["file"]
+            delimiter = "\t" if upload.name.lower().endswith(".tsv") else None
+            try:
+                result = task_import.import_tasks(
+                    project,
+                    upload.file,
+                    encoding=form.cleaned_data["encoding"],
+                    delimiter=delimiter,
+                    dry_run=form.cleaned_data["dry_run"],
+                )
+            except task_import.TaskImportError as e:
+                import_errors = e.errors
+            else:
+                if form.cleaned_data["dry_run"]:
+                    messages.info(
+                        request,
+                        f"確認のみ: タスク {result.created} 件・依存 {result.dependencies} 件を登録できます。",
+                    )
+                    return render(request, self.template_name, {"form": TaskImportForm(), "project": project})
+                messages.success(
+                    request, f"タスク {result.created} 件・依存 {result.dependencies} 件を取り込みました。"
+                )
+                return redirect("project_detail", pk=project.pk)
+
+        return render(
+            request,
+            self.template_name,
+            {"form": form, "project": project, "import_errors": import_errors},
+        )
+
+
+class DueTaskListView(LoginRequiredMixin, View):
+    """
+    期限切れ・期限が近い未完了タスクの一覧（会社全体）。
+    ダッシュボードには先頭だけを出し、全件はここで (終了日, ID) のキーセットページングで見る（?after=カーソル）。
+    """
+    template_name = "app/due_task_list.html"
+
+    def get(self, request):
+        after = request.GET.get("after") or None
+        if after is not None:
+            try:
+                after = dashboard.decode_due_cursor(after)
+            except ValueError:
+                raise BadRequest("after が不正です")
+        company_id = request.user.company_id
+        stats = company_stats.get_stats(company_id)
+        today = stats.as_of or timezone.localdate()
+        tasks, next_cursor = ([], None) if company_id is None else dashboard.due_tasks_page(company_id, today, after)
+        return render(
+            request,
+            self.template_name,
+            {
+                "tasks": tasks,
+                "next_cursor": next_cursor,
+                "is_first_page": after is None,
+                "stats": stats,
+                "today": today,
+            },
+        )